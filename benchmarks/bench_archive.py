@@ -0,0 +1,53 @@
+"""
+Compare per-blob API fetching with streaming tarball extraction, served by
+the local FakeForge stand-in from a generated repository.
+
+    python benchmarks/bench_archive.py --files 2000 --latency 0.02
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_forge import FakeForge, GITHUB_REPO, GITLAB_PROJECT
+from bench_remote_fetch import make_files
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    with FakeForge({'master': make_files(args.files)}, latency=args.latency) as forge:
+        os.environ.setdefault('GITHUB_TOKEN', 'fake')
+        os.environ.setdefault('GITLAB_TOKEN', 'fake')
+        os.environ['GITHUB_API_URL'] = forge.github_url
+        os.environ['GITLAB_URL'] = forge.gitlab_url
+        from repo2llm import GithubRepo2Txt, GitlabRepo2Txt
+
+        targets = [
+            ('github', GithubRepo2Txt, f"https://github.com/{GITHUB_REPO}"),
+            ('gitlab', GitlabRepo2Txt, f"{forge.gitlab_url}/{GITLAB_PROJECT}"),
+        ]
+        for name, cls, url in targets:
+            for mode in ('api', 'archive'):
+                before = forge.stats()
+                start = time.perf_counter()
+                with contextlib.redirect_stderr(io.StringIO()):
+                    _, content = cls(fetch_workers=args.workers).process_repo(url, 'master', mode=mode)
+                elapsed = time.perf_counter() - start
+                after = forge.stats()
+                print(f"{name:<6} mode={mode:<7} {elapsed:7.2f}s "
+                      f"requests={after['requests'] - before['requests']:<6} "
+                      f"bytes={after['bytes_sent'] - before['bytes_sent']:<10} output={len(content)}")
+
+
+if __name__ == '__main__':
+    main()
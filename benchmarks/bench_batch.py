@@ -0,0 +1,64 @@
+"""
+Render many repositories with run_batch against the local FakeForge
+stand-in, serially and with growing numbers of concurrent jobs, to show
+throughput scaling until the per-host budget is the bottleneck.
+
+    python benchmarks/bench_batch.py --repos 16 --latency 0.05 --jobs 1 4 16
+    python benchmarks/bench_batch.py --host-concurrency 8 --host-rps 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_forge import FakeForge, GITHUB_REPO
+
+
+def make_files(count, seed):
+    files = {'README.md': b'# demo %d\n' % seed}
+    for i in range(count):
+        files[f"src/pkg{i % 10}/module{i}.py"] = (b"value = %d\n" % (seed * count + i)) * 20
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repos', type=int, default=12)
+    parser.add_argument('--files', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 4, 12])
+    parser.add_argument('--host-concurrency', type=int, default=16)
+    parser.add_argument('--host-rps', type=float, default=0)
+    args = parser.parse_args()
+
+    # Every repository is one branch of the forge's single repository
+    refs = {f"repo{i}": make_files(args.files, i) for i in range(args.repos)}
+    with FakeForge(refs, latency=args.latency) as forge:
+        os.environ.setdefault('GITHUB_TOKEN', 'fake')
+        os.environ['GITHUB_API_URL'] = forge.github_url
+        # Blobs must be downloaded on every run for the timings to compare
+        os.environ['REPO2LLM_BLOB_CACHE_MB'] = '0'
+        from repo2llm.batch import make_job, run_batch
+        from repo2llm.scheduler import FetchScheduler
+
+        jobs = [make_job('github', f"https://github.com/{GITHUB_REPO}", ref, 'api') for ref in refs]
+        for max_jobs in args.jobs:
+            scheduler = FetchScheduler(args.host_concurrency, args.host_rps)
+            before = forge.stats()['requests']
+            start = time.perf_counter()
+            with contextlib.redirect_stderr(io.StringIO()):
+                results = list(run_batch(jobs, max_jobs=max_jobs, scheduler=scheduler))
+            elapsed = time.perf_counter() - start
+            host, = scheduler.stats().values()
+            print(f"jobs={max_jobs:<3} seconds={elapsed:.2f} repos/s={len(results) / elapsed:.2f} "
+                  f"failed={sum(result.error is not None for result in results)} "
+                  f"requests={forge.stats()['requests'] - before} peak_in_flight={host['peak']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Measure what .gitignore pruning saves on a tree dominated by a large
+node_modules directory: walk time, entries listed, and bytes read, with
+ignore rules off (the previous behaviour) and on.
+
+    python benchmarks/bench_ignore.py --packages 2000 --files-per-package 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from repo2llm.localrepo2txt import LocalRepo2Txt
+
+
+def make_tree(root, packages, files_per_package, source_files):
+    with open(os.path.join(root, '.gitignore'), 'w') as fh:
+        fh.write("node_modules/\ndist/\n")
+    for i in range(source_files):
+        path = os.path.join(root, 'src', f"mod{i % 20}")
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, f"file{i}.ts"), 'w') as fh:
+            fh.write("export const value = 1;\n" * 40)
+    for p in range(packages):
+        path = os.path.join(root, 'node_modules', f"pkg{p}", 'lib')
+        os.makedirs(path, exist_ok=True)
+        for f in range(files_per_package):
+            with open(os.path.join(path, f"index{f}.js"), 'w') as fh:
+                fh.write("module.exports = function () { return 42; };\n" * 40)
+
+
+class ReadCounter:
+    """Sum the sizes of the files a processor actually reads."""
+
+    def __init__(self, processor):
+        self.bytes = 0
+        self.files = 0
+        read = processor._read_local_file
+
+        def counting_read(entry):
+            self.bytes += entry.size
+            self.files += 1
+            return read(entry)
+
+        processor._read_local_file = counting_read
+
+
+def run(root, use_gitignore):
+    processor = LocalRepo2Txt(read_workers=1, use_index=False, use_gitignore=use_gitignore)
+    counter = ReadCounter(processor)
+
+    start = time.perf_counter()
+    manifest = processor._scan_local_repo(root)
+    walk_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in processor.iter_repo(root):
+        pass
+    total_time = time.perf_counter() - start
+    return len(manifest), walk_time, counter.files, counter.bytes, total_time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--packages', type=int, default=2000)
+    parser.add_argument('--files-per-package', type=int, default=10)
+    parser.add_argument('--source-files', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, args.packages, args.files_per_package, args.source_files)
+        for label, use_gitignore in (('no ignore rules', False), ('.gitignore', True)):
+            entries, walk_time, files, read_bytes, total_time = run(root, use_gitignore)
+            print(f"{label + ':':<17} walk {walk_time:.3f}s over {entries} entries, "
+                  f"read {files} files / {read_bytes / 1024 / 1024:.1f} MB, full dump {total_time:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Compare the system calls of the single-pass local scan (directory listings,
+stats and opens) against the previous two-walk traversal (one walk for the
+structure, one for contents).
+
+    python benchmarks/bench_local_scan.py --dirs 2000 --files-per-dir 20
+"""
+import argparse
+import builtins
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from repo2llm.localrepo2txt import LocalRepo2Txt
+
+
+class CallCounter:
+    """Count calls to a function in a module namespace while active."""
+
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+        self.calls = 0
+
+    def __enter__(self):
+        self.original = getattr(self.module, self.name)
+
+        def wrapper(*args, **kwargs):
+            self.calls += 1
+            return self.original(*args, **kwargs)
+
+        setattr(self.module, self.name, wrapper)
+        return self
+
+    def __exit__(self, *exc):
+        setattr(self.module, self.name, self.original)
+
+
+class CountedEntry:
+    """A DirEntry whose stat() calls, each one a system call, are counted."""
+
+    def __init__(self, entry, counter):
+        self.entry = entry
+        self.counter = counter
+        self.name = entry.name
+        self.path = entry.path
+
+    def is_dir(self, **kwargs):
+        return self.entry.is_dir(**kwargs)
+
+    def is_file(self, **kwargs):
+        return self.entry.is_file(**kwargs)
+
+    def is_symlink(self):
+        return self.entry.is_symlink()
+
+    def stat(self, **kwargs):
+        self.counter.calls += 1
+        return self.entry.stat(**kwargs)
+
+
+class SyscallCounter:
+    """
+    Count the directory listings, stats and opens of a scan: os.scandir,
+    DirEntry.stat, os.stat, os.lstat and open.
+    """
+
+    def __init__(self):
+        self.counters = {name: CallCounter(module, name) for module, name in
+                         ((os, 'scandir'), (os, 'stat'), (os, 'lstat'), (builtins, 'open'))}
+        self.entry_stats = CallCounter(None, None)
+
+    def __enter__(self):
+        for counter in self.counters.values():
+            counter.__enter__()
+        counted_scandir = os.scandir
+        entry_stats = self.entry_stats
+
+        class Listing:
+            def __init__(self, path):
+                self.listing = counted_scandir(path)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self.listing.close()
+
+            def __iter__(self):
+                return (CountedEntry(entry, entry_stats) for entry in self.listing)
+
+        os.scandir = Listing
+        return self
+
+    def __exit__(self, *exc):
+        os.scandir = self.counters['scandir'].original
+        for name, counter in self.counters.items():
+            if name != 'scandir':
+                counter.__exit__()
+
+    @property
+    def stats(self):
+        return self.entry_stats.calls + self.counters['stat'].calls + self.counters['lstat'].calls
+
+    @property
+    def total(self):
+        return self.counters['scandir'].calls + self.stats + self.counters['open'].calls
+
+    def describe(self):
+        return (f"{self.counters['scandir'].calls} scandir, {self.stats} stat, "
+                f"{self.counters['open'].calls} open = {self.total} calls")
+
+
+def make_tree(root, dirs, files_per_dir):
+    for d in range(dirs):
+        path = os.path.join(root, f"pkg{d % 50}", f"mod{d}")
+        os.makedirs(path, exist_ok=True)
+        for f in range(files_per_dir):
+            with open(os.path.join(path, f"file{f}.py"), 'w') as fh:
+                fh.write("print('hello')\n")
+
+
+def legacy_two_walks(processor, repo_path):
+    """The walk pattern used before the manifest: two full scandir traversals."""
+    for _ in range(2):
+        dirs_to_visit = [repo_path]
+        while dirs_to_visit:
+            current_path = dirs_to_visit.pop()
+            for entry in os.scandir(current_path):
+                if entry.is_dir() and entry.name not in processor.ignore_dirs:
+                    dirs_to_visit.append(entry.path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dirs', type=int, default=2000)
+    parser.add_argument('--files-per-dir', type=int, default=20)
+    args = parser.parse_args()
+
+    processor = LocalRepo2Txt()
+    with tempfile.TemporaryDirectory() as root:
+        make_tree(root, args.dirs, args.files_per_dir)
+
+        with SyscallCounter() as legacy:
+            start = time.perf_counter()
+            legacy_two_walks(processor, root)
+            legacy_time = time.perf_counter() - start
+
+        with SyscallCounter() as single:
+            start = time.perf_counter()
+            manifest = processor._scan_local_repo(root)
+            single_time = time.perf_counter() - start
+
+    print(f"entries:             {len(manifest)}")
+    print(f"two-walk:            {legacy.describe()}, {legacy_time:.3f}s")
+    print(f"single-pass:         {single.describe()}, {single_time:.3f}s")
+    print(f"scandir ratio:       {single.counters['scandir'].calls / legacy.counters['scandir'].calls:.2f}")
+    print(f"total calls ratio:   {single.total / legacy.total:.2f}")
+    # The single pass also stats every readable file: the sizes and mtimes the
+    # fingerprint, the index, the budget and the size caps need, which the two
+    # walks never collected
+
+
+if __name__ == '__main__':
+    main()
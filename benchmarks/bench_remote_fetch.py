@@ -0,0 +1,70 @@
+"""
+Compare serial and concurrent blob fetching for the GitHub and GitLab
+processors against the local FakeForge stand-in, with injected latency,
+rate limits and transient failures.
+
+    python benchmarks/bench_remote_fetch.py --files 500 --latency 0.05 --workers 1 8
+    python benchmarks/bench_remote_fetch.py --rate-limit 200 --rate-window 5 --failure-rate 0.05
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_forge import FakeForge, GITHUB_REPO, GITLAB_PROJECT
+
+
+def make_files(count):
+    files = {'README.md': b'# demo\n'}
+    for i in range(count):
+        files[f"src/pkg{i % 20}/module{i}.py"] = (b"value = %d\n" % i) * 20
+    return files
+
+
+def run(processor, url, forge):
+    before = forge.stats()
+    start = time.perf_counter()
+    with contextlib.redirect_stderr(io.StringIO()):
+        _, content = processor.process_repo(url, 'master')
+    elapsed = time.perf_counter() - start
+    after = forge.stats()
+    return {
+        'seconds': round(elapsed, 3),
+        'requests': after['requests'] - before['requests'],
+        'rate_limited': after['rate_limited'] - before['rate_limited'],
+        'errors': content.count('Skipped due to download error'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--rate-limit', type=int, default=0)
+    parser.add_argument('--rate-window', type=float, default=60.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8])
+    args = parser.parse_args()
+
+    forge = FakeForge({'master': make_files(args.files)}, latency=args.latency, rate_limit=args.rate_limit,
+                      rate_window=args.rate_window, failure_rate=args.failure_rate)
+    with forge:
+        os.environ.setdefault('GITHUB_TOKEN', 'fake')
+        os.environ.setdefault('GITLAB_TOKEN', 'fake')
+        os.environ['GITHUB_API_URL'] = forge.github_url
+        os.environ['GITLAB_URL'] = forge.gitlab_url
+        from repo2llm import GithubRepo2Txt, GitlabRepo2Txt
+
+        for workers in args.workers:
+            github = run(GithubRepo2Txt(fetch_workers=workers), f"https://github.com/{GITHUB_REPO}", forge)
+            gitlab = run(GitlabRepo2Txt(fetch_workers=workers), f"{forge.gitlab_url}/{GITLAB_PROJECT}", forge)
+            print(f"workers={workers:<3} github={github} gitlab={gitlab}")
+
+
+if __name__ == '__main__':
+    main()
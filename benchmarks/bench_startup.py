@@ -0,0 +1,76 @@
+"""
+Track cold start in milliseconds: each snippet runs in a fresh interpreter,
+and the median wall time over several runs is reported together with
+whether the GitHub/GitLab SDKs got loaded. Also times constructing a
+processor once the shared clients are warm.
+
+    python benchmarks/bench_startup.py --runs 7
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+REPORT = "import sys; print('github' in sys.modules, 'gitlab' in sys.modules)"
+
+SNIPPETS = [
+    ('import repo2llm', "import repo2llm"),
+    ('local processor', "from repo2llm import LocalRepo2Txt; LocalRepo2Txt()"),
+    ('github processor', "from repo2llm import GithubRepo2Txt; GithubRepo2Txt()"),
+    ('gitlab processor', "from repo2llm import GitlabRepo2Txt; GitlabRepo2Txt()"),
+    ('mcp server module', "import importlib.util as u; "
+                          "s = u.spec_from_file_location('server', 'mcp-repo2llm-server.py'); "
+                          "s.loader.exec_module(u.module_from_spec(s))"),
+]
+
+
+def cold_start(code, runs):
+    env = dict(os.environ, GITHUB_TOKEN=os.environ.get('GITHUB_TOKEN', 'bench'),
+               GITLAB_TOKEN=os.environ.get('GITLAB_TOKEN', 'bench'))
+    times = []
+    loaded = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', f"{code}; {REPORT}"], cwd=ROOT, env=env,
+                                capture_output=True, text=True)
+        times.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        loaded = result.stdout.split()
+    return statistics.median(times), loaded
+
+
+def warm_construction(runs):
+    os.environ.setdefault('GITHUB_TOKEN', 'bench')
+    from repo2llm import GithubRepo2Txt
+    GithubRepo2Txt()
+    start = time.perf_counter()
+    for _ in range(runs):
+        GithubRepo2Txt()
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=7)
+    args = parser.parse_args()
+
+    baseline, _ = cold_start("pass", args.runs)
+    print(f"{'interpreter':<18} {baseline:7.1f} ms")
+    for label, code in SNIPPETS:
+        elapsed, loaded = cold_start(code, args.runs)
+        if elapsed is None:
+            print(f"{label:<18} failed: {loaded}")
+            continue
+        print(f"{label:<18} {elapsed:7.1f} ms (+{elapsed - baseline:.1f}), "
+              f"github loaded: {loaded[0]}, gitlab loaded: {loaded[1]}")
+    print(f"{'warm processor':<18} {warm_construction(100):7.3f} ms per GithubRepo2Txt()")
+
+
+if __name__ == '__main__':
+    main()
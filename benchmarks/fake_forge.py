@@ -0,0 +1,553 @@
+"""
+A local stand-in for the parts of the GitHub REST and GitLab v4 APIs that the
+remote processors use, serving synthetic repositories from memory.
+
+Latency, rate limits and transient failures can be injected so the fetch
+paths can be exercised without touching the real services:
+
+    server = FakeForge({'master': {'README.md': b'hi', 'src/a.py': b'x = 1'}},
+                       latency=0.02, rate_limit=500)
+    server.start()
+    os.environ['GITHUB_API_URL'] = server.github_url
+    ...
+    server.stop()
+"""
+import base64
+import hashlib
+import io
+import json
+import posixpath
+import random
+import tarfile
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+GITHUB_REPO = 'octo/demo'
+GITLAB_PROJECT_ID = 1
+GITLAB_PROJECT = 'group/demo'
+
+# A submodule: give one as the value of a path instead of the file's bytes
+Gitlink = namedtuple('Gitlink', ['sha'])
+
+
+def git_blob_sha(data):
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+class Snapshot:
+    """One ref of a fake repository: files plus derived trees and SHAs."""
+
+    def __init__(self, ref, files):
+        self.ref = ref
+        self.gitlinks = {path: data.sha for path, data in sorted(files.items()) if isinstance(data, Gitlink)}
+        self.files = {path: data for path, data in sorted(files.items()) if not isinstance(data, Gitlink)}
+        self.blobs = {git_blob_sha(data): data for data in self.files.values()}
+        dirs = set()
+        for path in [*self.files, *self.gitlinks]:
+            parent = posixpath.dirname(path)
+            while parent:
+                dirs.add(parent)
+                parent = posixpath.dirname(parent)
+        self.dirs = sorted(dirs)
+        digest = hashlib.sha1()
+        for path, data in self.files.items():
+            digest.update(path.encode() + b'\0' + git_blob_sha(data).encode())
+        for path, sha in self.gitlinks.items():
+            digest.update(path.encode() + b'\0' + sha.encode())
+        self.commit_sha = digest.hexdigest()
+        self.tree_shas = {'': hashlib.sha1(b'tree:' + self.commit_sha.encode()).hexdigest()}
+        for d in self.dirs:
+            self.tree_shas[d] = hashlib.sha1(f'tree:{self.commit_sha}:{d}'.encode()).hexdigest()
+        self.trees_by_sha = {sha: path for path, sha in self.tree_shas.items()}
+
+    def children(self, path):
+        """Direct children of directory ``path`` in git tree order."""
+        names = {}
+        prefix = f"{path}/" if path else ""
+        for d in self.dirs:
+            if d.startswith(prefix) and '/' not in d[len(prefix):]:
+                names[d[len(prefix):]] = ('tree', d)
+        for f in self.files:
+            if f.startswith(prefix) and '/' not in f[len(prefix):]:
+                names[f[len(prefix):]] = ('blob', f)
+        for f in self.gitlinks:
+            if f.startswith(prefix) and '/' not in f[len(prefix):]:
+                names[f[len(prefix):]] = ('commit', f)
+        return [(name, kind, full) for name, (kind, full) in sorted(names.items())]
+
+    def tree_item(self, name_or_path, kind, full):
+        if kind == 'tree':
+            return {'path': name_or_path, 'mode': '040000', 'type': 'tree', 'sha': self.tree_shas[full]}
+        if kind == 'commit':
+            return {'path': name_or_path, 'mode': '160000', 'type': 'commit', 'sha': self.gitlinks[full]}
+        data = self.files[full]
+        return {'path': name_or_path, 'mode': '100644', 'type': 'blob', 'sha': git_blob_sha(data), 'size': len(data)}
+
+    def recursive_tree(self):
+        items = []
+
+        def visit(path):
+            for name, kind, full in self.children(path):
+                items.append(self.tree_item(full, kind, full))
+                if kind == 'tree':
+                    visit(full)
+        visit("")
+        return items
+
+    def tarball(self, prefix, compress=True):
+        buffer = io.BytesIO()
+        mode = 'w:gz' if compress else 'w'
+        with tarfile.open(fileobj=buffer, mode=mode) as tar:
+            for d in self.dirs:
+                info = tarfile.TarInfo(f"{prefix}/{d}")
+                info.type = tarfile.DIRTYPE
+                tar.addfile(info)
+            for path, data in self.files.items():
+                info = tarfile.TarInfo(f"{prefix}/{path}")
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+            # Like git archive, a submodule is an empty directory
+            for path in self.gitlinks:
+                info = tarfile.TarInfo(f"{prefix}/{path}")
+                info.type = tarfile.DIRTYPE
+                tar.addfile(info)
+        return buffer.getvalue()
+
+
+class FakeForge:
+    """
+    Serve synthetic repositories over a GitHub-like and a GitLab-like API.
+
+    Args:
+        refs (dict): ref name -> {path: bytes}
+        latency (float): seconds to sleep before answering each request
+        rate_limit (int): requests allowed per ``rate_window`` seconds, 0 for unlimited
+        rate_window (float): length of the rate-limit window in seconds
+        failure_rate (float): probability of answering with a transient 502
+    """
+
+    def __init__(self, refs, latency=0.0, rate_limit=0, rate_window=60.0, failure_rate=0.0,
+                 default_branch='master', truncate_trees=False, seed=0):
+        self.snapshots = {ref: Snapshot(ref, files) for ref, files in refs.items()}
+        self.default_branch = default_branch
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.failure_rate = failure_rate
+        self.truncate_trees = truncate_trees
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window_start = time.time()
+        self.window_count = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self.rate_limited = 0
+        self.paths = {}
+        self.server = None
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self):
+        forge = self
+
+        class Handler(_Handler):
+            pass
+        Handler.forge = forge
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def github_url(self):
+        return self.base_url
+
+    @property
+    def gitlab_url(self):
+        return self.base_url
+
+    def stats(self):
+        with self.lock:
+            return {'requests': self.requests, 'bytes_sent': self.bytes_sent,
+                    'rate_limited': self.rate_limited, 'paths': dict(self.paths)}
+
+    # -- helpers ---------------------------------------------------------------
+
+    def snapshot(self, ref):
+        if ref in self.snapshots:
+            return self.snapshots[ref]
+        for snapshot in self.snapshots.values():
+            if ref and snapshot.commit_sha.startswith(ref):
+                return snapshot
+        return None
+
+    def snapshot_for_tree(self, sha):
+        for snapshot in self.snapshots.values():
+            if sha in snapshot.trees_by_sha:
+                return snapshot, snapshot.trees_by_sha[sha]
+        return None, None
+
+    def blob(self, sha):
+        for snapshot in self.snapshots.values():
+            if sha in snapshot.blobs:
+                return snapshot.blobs[sha]
+        return None
+
+    def admit(self):
+        """Account for one request; returns (allowed, remaining, reset)."""
+        with self.lock:
+            self.requests += 1
+            now = time.time()
+            if now - self.window_start >= self.rate_window:
+                self.window_start = now
+                self.window_count = 0
+            reset = self.window_start + self.rate_window
+            if not self.rate_limit:
+                return True, 5000, reset
+            if self.window_count >= self.rate_limit:
+                self.rate_limited += 1
+                return False, 0, reset
+            self.window_count += 1
+            return True, self.rate_limit - self.window_count, reset
+
+
+class _Handler(BaseHTTPRequestHandler):
+    forge = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        forge = self.forge
+        if forge.latency:
+            time.sleep(forge.latency)
+        allowed, remaining, reset = forge.admit()
+        url = urlsplit(self.path)
+        route = url.path
+        with forge.lock:
+            key = route.split('/')[-2] if route.count('/') > 2 else route
+            forge.paths[key] = forge.paths.get(key, 0) + 1
+        self.rate_headers = {
+            'X-RateLimit-Limit': str(forge.rate_limit or 5000),
+            'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Reset': str(int(reset) + 1),
+            'RateLimit-Limit': str(forge.rate_limit or 5000),
+            'RateLimit-Remaining': str(remaining),
+            'RateLimit-Reset': str(int(reset) + 1),
+        }
+        if not allowed:
+            retry_after = max(1, int(reset - time.time()) + 1)
+            if route.startswith('/api/v4/'):
+                return self.send_json({'message': '429 Too Many Requests'}, 429, {'Retry-After': str(retry_after)})
+            return self.send_json({'message': 'API rate limit exceeded'}, 403)
+        if forge.failure_rate and forge.random.random() < forge.failure_rate:
+            return self.send_json({'message': 'Bad Gateway'}, 502)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if route.startswith('/api/v4/'):
+                return self.gitlab(route[len('/api/v4'):], query)
+            return self.github(route, query)
+        except BrokenPipeError:
+            pass
+
+    # -- responses -------------------------------------------------------------
+
+    def send_body(self, body, status=200, content_type='application/json', headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        range_header = self.headers.get('Range')
+        if status == 200 and range_header and range_header.startswith('bytes='):
+            body, status, content_range = self.apply_range(body, range_header[6:])
+            headers = dict(headers or {}, **{'Content-Range': content_range})
+        self.send_response(status)
+        for name, value in self.rate_headers.items():
+            self.send_header(name, value)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+            with self.forge.lock:
+                self.forge.bytes_sent += len(body)
+
+    @staticmethod
+    def apply_range(body, spec):
+        start, _, end = spec.partition('-')
+        size = len(body)
+        if start == '':
+            first = max(0, size - int(end))
+            last = size - 1
+        else:
+            first = int(start)
+            last = min(size - 1, int(end)) if end else size - 1
+        return body[first:last + 1], 206, f"bytes {first}-{last}/{size}"
+
+    def send_json(self, data, status=200, headers=None):
+        body = json.dumps(data)
+        etag = '"%s"' % hashlib.sha1(body.encode()).hexdigest()
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            return self.send_body(b'', 304, headers={'ETag': etag})
+        self.send_body(body, status, headers=dict(headers or {}, ETag=etag))
+
+    def not_found(self):
+        self.send_json({'message': 'Not Found'}, 404)
+
+    # -- GitHub ----------------------------------------------------------------
+
+    def github(self, route, query):
+        forge = self.forge
+        base = forge.base_url
+        prefix = f"/repos/{GITHUB_REPO}"
+        if route in (prefix, prefix + '/'):
+            return self.send_json({
+                'id': 1, 'name': GITHUB_REPO.split('/')[1], 'full_name': GITHUB_REPO,
+                'url': base + prefix, 'default_branch': forge.default_branch,
+            })
+        if not route.startswith(prefix + '/'):
+            return self.not_found()
+        rest = unquote(route[len(prefix) + 1:])
+
+        if rest.startswith('commits/'):
+            snapshot = forge.snapshot(rest[len('commits/'):])
+            if snapshot is None:
+                return self.not_found()
+            if 'sha' in self.headers.get('Accept', ''):
+                etag = f'"{snapshot.commit_sha}"'
+                if self.headers.get('If-None-Match') == etag:
+                    return self.send_body(b'', 304, headers={'ETag': etag})
+                return self.send_body(snapshot.commit_sha, content_type='text/plain', headers={'ETag': etag})
+            tree_sha = snapshot.tree_shas['']
+            return self.send_json({
+                'sha': snapshot.commit_sha, 'url': f"{base}{prefix}/commits/{snapshot.commit_sha}",
+                'commit': {'tree': {'sha': tree_sha, 'url': f"{base}{prefix}/git/trees/{tree_sha}"}},
+                'files': [],
+            })
+        if rest.startswith('branches/'):
+            snapshot = forge.snapshot(rest[len('branches/'):])
+            if snapshot is None:
+                return self.not_found()
+            return self.send_json({'name': snapshot.ref, 'commit': {'sha': snapshot.commit_sha}})
+        if rest.startswith('git/trees/'):
+            sha = rest[len('git/trees/'):]
+            snapshot, path = forge.snapshot_for_tree(sha)
+            if snapshot is None:
+                snapshot = forge.snapshot(sha)
+                path = ''
+            if snapshot is None:
+                return self.not_found()
+            if query.get('recursive') and not forge.truncate_trees:
+                items = snapshot.recursive_tree()
+                truncated = False
+            else:
+                items = [snapshot.tree_item(name, kind, full) for name, kind, full in snapshot.children(path)]
+                truncated = bool(query.get('recursive'))
+            return self.send_json({'sha': snapshot.tree_shas[path], 'url': f"{base}{prefix}/git/trees/{sha}",
+                                   'tree': items, 'truncated': truncated})
+        if rest.startswith('git/blobs/'):
+            sha = rest[len('git/blobs/'):]
+            data = forge.blob(sha)
+            if data is None:
+                return self.not_found()
+            if 'raw' in self.headers.get('Accept', ''):
+                return self.send_body(data, content_type='application/octet-stream')
+            return self.send_json({'sha': sha, 'size': len(data), 'encoding': 'base64',
+                                   'content': base64.b64encode(data).decode('ascii'),
+                                   'url': f"{base}{prefix}/git/blobs/{sha}"})
+        if rest.startswith('tarball'):
+            ref = rest[len('tarball/'):] or forge.default_branch
+            snapshot = forge.snapshot(ref)
+            if snapshot is None:
+                return self.not_found()
+            name = f"{GITHUB_REPO.replace('/', '-')}-{snapshot.commit_sha[:7]}"
+            return self.send_body(snapshot.tarball(name), content_type='application/x-gzip')
+        if rest.startswith('compare/'):
+            base_ref, _, head_ref = rest[len('compare/'):].partition('...')
+            return self.github_compare(forge.snapshot(base_ref), forge.snapshot(head_ref))
+        if rest.startswith('contents'):
+            path = rest[len('contents'):].strip('/')
+            snapshot = forge.snapshot(query.get('ref', forge.default_branch))
+            if snapshot is None:
+                return self.not_found()
+            if path in snapshot.files:
+                data = snapshot.files[path]
+                return self.send_json(self.github_content(snapshot, path, data, with_content=True))
+            if path and path not in snapshot.dirs:
+                return self.not_found()
+            return self.send_json([
+                self.github_content(snapshot, full, snapshot.files.get(full), kind=kind)
+                for name, kind, full in snapshot.children(path)
+            ])
+        return self.not_found()
+
+    def github_content(self, snapshot, path, data, with_content=False, kind='blob'):
+        base = self.forge.base_url
+        if kind == 'commit':
+            return {'type': 'submodule', 'name': posixpath.basename(path), 'path': path,
+                    'sha': snapshot.gitlinks[path], 'size': 0,
+                    'url': f"{base}/repos/{GITHUB_REPO}/contents/{path}?ref={snapshot.ref}"}
+        item = {
+            'type': 'dir' if kind == 'tree' else 'file', 'name': posixpath.basename(path), 'path': path,
+            'sha': snapshot.tree_shas.get(path) if kind == 'tree' else git_blob_sha(data),
+            'size': 0 if data is None else len(data),
+            'url': f"{base}/repos/{GITHUB_REPO}/contents/{path}?ref={snapshot.ref}",
+        }
+        if with_content:
+            item['encoding'] = 'base64'
+            item['content'] = base64.b64encode(data).decode('ascii')
+        return item
+
+    def github_compare(self, base, head):
+        if base is None or head is None:
+            return self.not_found()
+        files = []
+        for change in diff_snapshots(base, head):
+            status, path, old_path, data = change
+            item = {'filename': path, 'status': status,
+                    'sha': git_blob_sha(data) if data is not None else None}
+            if old_path:
+                item['previous_filename'] = old_path
+            files.append(item)
+        return self.send_json({'status': 'ahead', 'files': files, 'commits': [],
+                               'base_commit': {'sha': base.commit_sha},
+                               'merge_base_commit': {'sha': base.commit_sha}})
+
+    # -- GitLab ----------------------------------------------------------------
+
+    def gitlab(self, route, query):
+        forge = self.forge
+        parts = route.strip('/').split('/')
+        if len(parts) < 2 or parts[0] != 'projects':
+            return self.not_found()
+        project = unquote(parts[1])
+        if project not in (str(GITLAB_PROJECT_ID), GITLAB_PROJECT):
+            return self.not_found()
+        rest = '/'.join(parts[2:])
+        if not rest:
+            return self.send_json({
+                'id': GITLAB_PROJECT_ID, 'path_with_namespace': GITLAB_PROJECT, 'name': GITLAB_PROJECT.split('/')[1],
+                'path': GITLAB_PROJECT.split('/')[1], 'default_branch': forge.default_branch,
+                'http_url_to_repo': f"{forge.base_url}/{GITLAB_PROJECT}.git",
+            })
+        if rest == 'repository/tree':
+            snapshot = forge.snapshot(query.get('ref', forge.default_branch))
+            if snapshot is None:
+                return self.not_found()
+            path = query.get('path', '').strip('/')
+            if query.get('recursive') in ('true', 'True', '1'):
+                items = [self.gitlab_tree_item(snapshot, item['path'], item['type'])
+                         for item in snapshot.recursive_tree()]
+            else:
+                items = [self.gitlab_tree_item(snapshot, full, kind) for name, kind, full in snapshot.children(path)]
+            return self.send_paginated(items, query)
+        if rest.startswith('repository/blobs/') and rest.endswith('/raw'):
+            data = forge.blob(rest[len('repository/blobs/'):-len('/raw')])
+            if data is None:
+                return self.not_found()
+            return self.send_body(data, content_type='application/octet-stream')
+        if rest.startswith('repository/files/'):
+            path = unquote(rest[len('repository/files/'):])
+            raw = path.endswith('/raw')
+            if raw:
+                path = path[:-len('/raw')]
+            snapshot = forge.snapshot(query.get('ref', forge.default_branch))
+            if snapshot is None or path not in snapshot.files:
+                return self.not_found()
+            data = snapshot.files[path]
+            if raw:
+                return self.send_body(data, content_type='application/octet-stream')
+            return self.send_json({'file_name': posixpath.basename(path), 'file_path': path, 'size': len(data),
+                                   'encoding': 'base64', 'content': base64.b64encode(data).decode('ascii'),
+                                   'ref': snapshot.ref, 'blob_id': git_blob_sha(data),
+                                   'commit_id': snapshot.commit_sha})
+        if rest.startswith('repository/commits/'):
+            snapshot = forge.snapshot(unquote(rest[len('repository/commits/'):]))
+            if snapshot is None:
+                return self.not_found()
+            return self.send_json({'id': snapshot.commit_sha, 'short_id': snapshot.commit_sha[:8]})
+        if rest.startswith('repository/archive'):
+            snapshot = forge.snapshot(query.get('sha', forge.default_branch))
+            if snapshot is None:
+                return self.not_found()
+            name = f"demo-{snapshot.ref}-{snapshot.commit_sha}"
+            return self.send_body(snapshot.tarball(name), content_type='application/x-gzip')
+        if rest == 'repository/compare':
+            base, head = forge.snapshot(query.get('from')), forge.snapshot(query.get('to'))
+            if base is None or head is None:
+                return self.not_found()
+            diffs = []
+            for status, path, old_path, data in diff_snapshots(base, head):
+                diffs.append({'old_path': old_path or path, 'new_path': path,
+                              'new_file': status == 'added', 'deleted_file': status == 'removed',
+                              'renamed_file': status == 'renamed', 'diff': ''})
+            return self.send_json({'commit': {'id': head.commit_sha}, 'commits': [], 'diffs': diffs})
+        return self.not_found()
+
+    @staticmethod
+    def gitlab_tree_item(snapshot, path, kind):
+        if kind == 'tree':
+            sha, mode = snapshot.tree_shas[path], '040000'
+        elif kind == 'commit':
+            sha, mode = snapshot.gitlinks[path], '160000'
+        else:
+            sha, mode = git_blob_sha(snapshot.files[path]), '100644'
+        return {'id': sha, 'name': posixpath.basename(path), 'type': kind, 'path': path, 'mode': mode}
+
+    def send_paginated(self, items, query):
+        per_page = int(query.get('per_page', 20))
+        page = int(query.get('page', 1))
+        total_pages = max(1, -(-len(items) // per_page))
+        chunk = items[(page - 1) * per_page:page * per_page]
+        headers = {'X-Page': str(page), 'X-Per-Page': str(per_page), 'X-Total': str(len(items)),
+                   'X-Total-Pages': str(total_pages)}
+        if page < total_pages:
+            url = urlsplit(self.path)
+            params = dict(query, page=str(page + 1), per_page=str(per_page))
+            next_url = f"{self.forge.base_url}{url.path}?" + '&'.join(f"{k}={v}" for k, v in params.items())
+            headers['X-Next-Page'] = str(page + 1)
+            headers['Link'] = f'<{next_url}>; rel="next"'
+        self.send_json(chunk, headers=headers)
+
+
+def diff_snapshots(base, head):
+    """Yield (status, path, old_path, data) changes from ``base`` to ``head``."""
+    removed = {path: data for path, data in base.files.items() if path not in head.files}
+    by_content = {git_blob_sha(data): path for path, data in removed.items()}
+    for path, data in head.files.items():
+        if path not in base.files:
+            old_path = by_content.pop(git_blob_sha(data), None)
+            if old_path is not None:
+                removed.pop(old_path, None)
+                yield 'renamed', path, old_path, data
+            else:
+                yield 'added', path, None, data
+        elif base.files[path] != data:
+            yield 'modified', path, None, data
+    for path in removed:
+        yield 'removed', path, None, None
@@ -0,0 +1,181 @@
+"""
+End-to-end benchmark suite: generate a synthetic repository, serve it through
+FakeForge, and run every processor on it, each in a fresh interpreter with an
+empty cache. Reports wall time, peak RSS, API requests and bytes transferred
+as JSON, and compares against an earlier result file to spot regressions.
+
+    python benchmarks/run_suite.py --files 2000 --latency 0.02 --output results.json
+    python benchmarks/run_suite.py --files 2000 --latency 0.02 --compare results.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_forge import FakeForge, GITHUB_REPO, GITLAB_PROJECT
+from synthetic_repo import describe, make_files, write_files
+
+SCENARIOS = ['local', 'github-api', 'github-archive', 'gitlab-api', 'gitlab-archive', 'github-mirror']
+
+# Metrics where a larger value is worse, with the relative increase reported as a regression
+REGRESSION_METRICS = ('seconds', 'peak_rss_mb', 'requests', 'bytes_transferred')
+
+
+def run_child(scenario, target):
+    """Run one scenario in this process and return its measurements."""
+    from repo2llm import GithubRepo2Txt, GitlabRepo2Txt, LocalRepo2Txt
+    start = time.perf_counter()
+    with contextlib.redirect_stderr(io.StringIO()):
+        if scenario == 'local':
+            _, content = LocalRepo2Txt().process_repo(target)
+        else:
+            source, mode = scenario.split('-')
+            processor = GithubRepo2Txt() if source == 'github' else GitlabRepo2Txt()
+            _, content = processor.process_repo(target, 'master', mode)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+    return {
+        'seconds': round(elapsed, 3),
+        'peak_rss_mb': round(rss_mb, 1),
+        'output_bytes': len(content.encode('utf-8', 'surrogateescape')),
+        'files_rendered': content.count('\nFile: ') + content.startswith('File: '),
+    }
+
+
+def run_scenario(scenario, target, forge):
+    before = forge.stats()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, REPO2LLM_CACHE_DIR=cache_dir,
+                   GITHUB_TOKEN='bench', GITLAB_TOKEN='bench',
+                   GITHUB_API_URL=forge.github_url, GITLAB_URL=forge.gitlab_url)
+        result = subprocess.run([sys.executable, __file__, '--child', scenario, target],
+                                cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'}
+    measurements = json.loads(result.stdout.strip().splitlines()[-1])
+    after = forge.stats()
+    measurements['requests'] = after['requests'] - before['requests']
+    measurements['rate_limited'] = after['rate_limited'] - before['rate_limited']
+    measurements['bytes_transferred'] = after['bytes_sent'] - before['bytes_sent']
+    return measurements
+
+
+def make_git_remote(root, work_tree):
+    """Commit ``work_tree`` and return a file:// URL of a bare clone, the remote of the mirror scenario."""
+    def git(*args):
+        subprocess.run(['git', *args], check=True, capture_output=True)
+    git('-C', work_tree, 'init', '-q', '-b', 'master')
+    git('-C', work_tree, 'add', '-A')
+    git('-C', work_tree, '-c', 'user.name=bench', '-c', 'user.email=bench@example.com', 'commit', '-q', '-m', 'bench')
+    bare = os.path.join(root, 'synthetic.git')
+    git('clone', '-q', '--bare', work_tree, bare)
+    git('-C', bare, 'config', 'uploadpack.allowFilter', 'true')
+    # The working tree is rendered by the local scenario, without the repository metadata
+    shutil.rmtree(os.path.join(work_tree, '.git'))
+    return f"file://{bare}"
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """List metrics that grew by more than ``threshold`` (a fraction) over ``baseline``."""
+    regressions = []
+    for scenario, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(scenario)
+        if not previous or 'error' in current or 'error' in previous:
+            continue
+        for metric in REGRESSION_METRICS:
+            old, new = previous.get(metric), current.get(metric)
+            if old and new is not None and (new - old) / old > threshold:
+                regressions.append(f"{scenario}.{metric}: {old} -> {new} (+{(new - old) / old:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--child', nargs=2, metavar=('SCENARIO', 'TARGET'), help=argparse.SUPPRESS)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--median-size', type=int, default=2048)
+    parser.add_argument('--max-size', type=int, default=4 * 1024 * 1024)
+    parser.add_argument('--binary-ratio', type=float, default=0.1)
+    parser.add_argument('--latin1-ratio', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=0)
+    parser.add_argument('--rate-window', type=float, default=60.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative increase reported as a regression")
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(*args.child)))
+        return
+
+    repo = dict(files=args.files, depth=args.depth, median_size=args.median_size, max_size=args.max_size,
+                binary_ratio=args.binary_ratio, latin1_ratio=args.latin1_ratio, seed=args.seed)
+    forge_options = dict(latency=args.latency, rate_limit=args.rate_limit, rate_window=args.rate_window,
+                         failure_rate=args.failure_rate)
+    files = make_files(**repo)
+    results = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repo': dict(repo, **describe(files)),
+        'forge': forge_options,
+        'scenarios': {},
+    }
+    with tempfile.TemporaryDirectory() as root, FakeForge({'master': files}, **forge_options) as forge:
+        local_root = os.path.join(root, 'synthetic')
+        write_files(local_root, files)
+        targets = {
+            'local': local_root,
+            'github': f"https://github.com/{GITHUB_REPO}",
+            'gitlab': f"{forge.gitlab_url}/{GITLAB_PROJECT}",
+        }
+        if 'github-mirror' in args.scenarios:
+            targets['github-mirror'] = make_git_remote(root, local_root)
+        for scenario in args.scenarios:
+            target = targets.get(scenario, targets[scenario.split('-')[0]])
+            results['scenarios'][scenario] = run_scenario(scenario, target, forge)
+            print(f"{scenario:<15} {results['scenarios'][scenario]}", file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(results, fh, indent=2)
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(results, json.load(fh), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Deterministic synthetic repositories for the benchmarks.
+
+``make_files`` returns ``{path: bytes}`` that can be written to disk with
+``write_files`` or served through FakeForge; the same seed always gives the
+same repository.
+
+    files = make_files(files=2000, depth=4, median_size=2048, binary_ratio=0.1, latin1_ratio=0.02)
+"""
+import math
+import os
+import random
+
+SOURCE_SUFFIXES = ['.py', '.js', '.ts', '.go', '.rs', '.java', '.c', '.md', '.json', '.yaml']
+BINARY_SUFFIXES = ['.png', '.jpg', '.zip', '.so', '.pdf', '.woff2']
+
+SOURCE_LINES = [
+    "def handler(request):\n",
+    "    return request.args.get('value')\n",
+    "const answer = compute(42);\n",
+    "for (int i = 0; i < n; i++) { total += i; }\n",
+    "# configuration follows\n",
+    "key: value\n",
+    "    if err != nil { return err }\n",
+]
+
+
+def _size(rng, median_size, sigma, max_size):
+    """Log-normal sizes: most files are small, a few are very large."""
+    return max(1, min(int(rng.lognormvariate(math.log(median_size), sigma)), max_size))
+
+
+def _text(rng, size):
+    chunks = []
+    total = 0
+    while total < size:
+        line = rng.choice(SOURCE_LINES)
+        chunks.append(line)
+        total += len(line)
+    return ''.join(chunks).encode('utf-8')[:size]
+
+
+def make_files(files=1000, depth=3, fanout=8, median_size=2048, sigma=1.2, max_size=4 * 1024 * 1024,
+               binary_ratio=0.1, latin1_ratio=0.02, seed=0):
+    """
+    Generate a repository.
+
+    Args:
+        files (int): number of files besides the README
+        depth (int): deepest directory level
+        fanout (int): subdirectories per directory
+        median_size (int): median file size in bytes
+        sigma (float): spread of the log-normal size distribution
+        max_size (int): largest file size
+        binary_ratio (float): share of binary files, with binary suffixes and NUL bytes
+        latin1_ratio (float): share of text files encoded as Latin-1, which is not valid UTF-8
+
+    Returns:
+        dict: path -> bytes
+    """
+    rng = random.Random(seed)
+    result = {'README.md': b"# synthetic repository\n\nGenerated for benchmarks.\n"}
+    for i in range(files):
+        level = rng.randint(0, depth)
+        parts = [f"dir{rng.randrange(fanout)}" for _ in range(level)]
+        size = _size(rng, median_size, sigma, max_size)
+        roll = rng.random()
+        if roll < binary_ratio:
+            name = f"asset{i}{rng.choice(BINARY_SUFFIXES)}"
+            data = b'\x89BIN\x00' + rng.randbytes(max(size - 5, 0))
+        elif roll < binary_ratio + latin1_ratio:
+            name = f"legacy{i}.txt"
+            data = ("caf\xe9 na\xefve r\xe9sum\xe9\n" * (size // 20 + 1)).encode('latin-1')[:size]
+        else:
+            name = f"module{i}{rng.choice(SOURCE_SUFFIXES)}"
+            data = _text(rng, size)
+        result['/'.join(parts + [name])] = data
+    return result
+
+
+def write_files(root, files):
+    """Write ``files`` under ``root``."""
+    for path, data in files.items():
+        full_path = os.path.join(root, *path.split('/'))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as fh:
+            fh.write(data)
+
+
+def describe(files):
+    sizes = [len(data) for data in files.values()]
+    return {'files': len(files), 'bytes': sum(sizes), 'largest': max(sizes) if sizes else 0}
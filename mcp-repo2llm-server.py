@@ -1,6 +1,20 @@
 import asyncio
-from mcp.server.fastmcp import FastMCP
+import inspect
+import json
+import os
+import time
+from mcp.server.fastmcp import Context, FastMCP
 from repo2llm import GitlabRepo2Txt, GithubRepo2Txt, LocalRepo2Txt
+from repo2llm.batch import make_job, run_batch
+from repo2llm.blobcache import get_default_blob_cache
+from repo2llm.dump import DumpReader
+from repo2llm.limits import DEFAULT_MAX_FILE_BYTES
+from repo2llm.localwatch import unwatch_repo, watch_repo, watched_repos
+from repo2llm.resultcache import ResultCache, make_key
+from repo2llm.runner import JobRunner, cancellable
+from repo2llm.scheduler import get_default_scheduler
+from repo2llm.sessions import SessionStore, is_record, make_cursor, parse_cursor, split_records, track_records
+from repo2llm import stats
 # import logging
 # logging.basicConfig(
 #     filename='repo2llm.log',
@@ -12,41 +26,407 @@ from repo2llm import GitlabRepo2Txt, GithubRepo2Txt, LocalRepo2Txt
 MCP_SERVER_NAME="mcp-repo2llm-server"
 mcp = FastMCP(MCP_SERVER_NAME)
 
+# Whole renderings keyed by resolved commit SHA / local fingerprint and options
+result_cache = ResultCache(
+    max_memory_bytes=int(os.getenv('REPO2LLM_RESULT_CACHE_MB', '256')) * 1024 * 1024,
+    max_disk_bytes=int(os.getenv('REPO2LLM_RESULT_SPILL_MB', '0')) * 1024 * 1024,
+)
+
+# Renderings too large for one response, served a page at a time through cursors
+sessions = SessionStore(
+    max_sessions=int(os.getenv('REPO2LLM_SESSIONS', '16')),
+    ttl=int(os.getenv('REPO2LLM_SESSION_TTL', '1800')),
+    spool_bytes=int(os.getenv('REPO2LLM_SESSION_SPOOL_MB', '4')) * 1024 * 1024,
+)
+# Per-phase timings and counters of every rendering, for get_stats and optional JSON logs
+if os.getenv('REPO2LLM_STATS', '1') != '0':
+    stats.enable(os.getenv('REPO2LLM_STATS_LOG'))
+
+# Repository jobs run on their own bounded pool; identical concurrent calls share one job
+runner = JobRunner(max_workers=int(os.getenv('REPO2LLM_WORKERS', '4')))
+TIMEOUT = int(os.getenv('REPO2LLM_TIMEOUT', '600'))
+
+# Seconds between two progress notifications of the same job and client
+PROGRESS_INTERVAL = float(os.getenv('REPO2LLM_PROGRESS_INTERVAL', '0.5'))
+# Progress notifications carry a message only in newer MCP releases
+PROGRESS_MESSAGE = 'message' in inspect.signature(Context.report_progress).parameters
+
+PAGE_BYTES = int(os.getenv('REPO2LLM_PAGE_KB', '1024')) * 1024
+# Where get_file looks for dumps named by repository
+DUMP_DIR = os.getenv('REPO2LLM_DUMP_DIR', '.')
+MIN_PAGE_BYTES = 4096
+# Repositories of one get_repos call rendered at the same time
+BATCH_JOBS = int(os.getenv('REPO2LLM_BATCH_JOBS', '8'))
+# Keys a get_repos job may carry besides source, repo, ref and mode
+BATCH_OPTIONS = ('base_ref', 'include', 'exclude', 'max_tokens', 'max_bytes', 'max_file_bytes', 'max_repo_bytes')
+
+def page_size(page_bytes):
+    """Resolve a tool's page_bytes argument: None for the default, 0 for no paging."""
+    if page_bytes is None:
+        return PAGE_BYTES
+    return max(page_bytes, MIN_PAGE_BYTES) if page_bytes > 0 else 0
+
+def render_page(session, start, page_bytes):
+    """
+    Return the page of ``session`` at byte ``start``, followed by a cursor line
+    when more content remains.
+    """
+    text, end = session.page(start, page_bytes)
+    first, last = session.files_before(start), session.files_before(end)
+    records = f", files {first + 1}-{last} of {len(session.file_offsets)}" if last > first else ""
+    if end < session.size:
+        return (f"{text}\n[Page: bytes {start}-{end} of {session.size}{records}. More content remains: "
+                f"call get_repo_page with cursor \"{make_cursor(session.id, end)}\"]\n")
+    return f"{text}\n[Page: bytes {start}-{end} of {session.size}{records}. End of content]\n"
+
+def render_cached(source, repo, revision, options, render, page_bytes=0, token=None):
+    """
+    Return the rendering for (source, repo, revision, options), calling render()
+    for its chunks on a miss. With page_bytes, a rendering larger than one page
+    is kept in a session and only its first page is returned. Rendering stops
+    at the next chunk once token is cancelled.
+    """
+    key = make_key(source, repo, revision, options)
+    if token is not None:
+        token.check()
+        render_chunks = render
+        render = lambda: cancellable(announce_header(render_chunks(), token), token)
+    if page_bytes:
+        session = sessions.find(key)
+        if session is not None:
+            return render_page(session, 0, page_bytes)
+    content, offsets = result_cache.lookup(key)
+    if not page_bytes:
+        if content is None:
+            offsets = []
+            content = ''.join(track_records(render(), offsets))
+            result_cache.put(key, content, offsets)
+        return content
+    if content is not None and len(content) <= page_bytes // 4:
+        # Fits in one page whatever its encoded size; no session needed
+        return content
+
+    if content is not None:
+        session = sessions.create(key, split_records(content, offsets))
+    else:
+        offsets = []
+        session = sessions.create(key, track_records(render(), offsets))
+        if session.size <= sessions.spool_bytes:
+            # Only a rendering the session still holds in memory is copied to the cache;
+            # larger ones stay on disk and are served from the session while it lives
+            result_cache.put(key, session.read_all(), offsets)
+    return first_page(session, page_bytes)
+
+def first_page(session, page_bytes):
+    """
+    Return the whole content of a new session when it fits in one page,
+    discarding the session, or else its first page with a cursor.
+    """
+    if session.size > page_bytes:
+        return render_page(session, 0, page_bytes)
+    text, _ = session.page(0, page_bytes)
+    sessions.discard(session.id)
+    return text
+
+def announce_header(chunks, token):
+    """
+    Pass ``chunks`` through, sending everything before the first file record
+    (introduction, README and structure) to the job's listeners as a 'header'
+    event as soon as it is complete.
+    """
+    header = []
+    for chunk in chunks:
+        if header is not None:
+            if is_record(chunk):
+                token.notify('header', ''.join(header))
+                header = None
+            else:
+                header.append(chunk)
+        yield chunk
+
+def job_progress(token):
+    """Progress callback for a processor that forwards to the job's listeners."""
+    if token is None:
+        return None
+    return lambda *values: token.notify('progress', *values)
+
+async def send_progress(ctx, phase, done, total, nbytes):
+    if PROGRESS_MESSAGE:
+        files = f"{done}/{total}" if total is not None else f"{done}"
+        unit = 'repositories' if phase == 'batch' else 'files'
+        await ctx.report_progress(done, total, message=f"{phase}: {files} {unit}, {nbytes} bytes")
+    else:
+        await ctx.report_progress(done, total)
+
+def job_listener(ctx, partial=False):
+    """
+    Listener that forwards a job's events to the client behind ``ctx``: progress
+    notifications (at most one per PROGRESS_INTERVAL seconds while files are
+    fetched), a log message per repository a batch completes and, with
+    ``partial``, the README and structure as a log message before the file
+    contents are done. Called from the job's thread.
+    """
+    if ctx is None:
+        return None
+    loop = asyncio.get_running_loop()
+    last = [0.0]
+
+    def send(coro):
+        # Failures, such as a client that went away, are dropped with the future
+        asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def listener(kind, *values):
+        if kind == 'header':
+            if partial:
+                send(ctx.info(values[0]))
+            return
+        if kind == 'result':
+            send(ctx.info(values[0]))
+            return
+        phase, done, total, nbytes = values
+        now = time.monotonic()
+        if phase == 'fetch' and done != total and now - last[0] < PROGRESS_INTERVAL:
+            return
+        last[0] = now
+        send(send_progress(ctx, phase, done, total, nbytes))
+
+    return listener
+
+def job_key(*parts):
+    """Single-flight key of a tool call: calls with equal arguments share one job."""
+    return json.dumps(parts, sort_keys=True)
+
+def render_options(include=None, exclude=None, max_tokens=0, max_bytes=0,
+                   max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_repo_bytes=0):
+    """Cache-key options for the filters, budget and read limits; only non-defaults are included."""
+    options = {}
+    if include:
+        options['include'] = tuple(include)
+    if exclude:
+        options['exclude'] = tuple(exclude)
+    if max_tokens:
+        options['max_tokens'] = max_tokens
+    if max_bytes:
+        options['max_bytes'] = max_bytes
+    if max_file_bytes != DEFAULT_MAX_FILE_BYTES:
+        options['max_file_bytes'] = max_file_bytes
+    if max_repo_bytes:
+        options['max_repo_bytes'] = max_repo_bytes
+    return options
+
+def process_gitlab_repo(repo_url, branch, mode, base_ref=None, include=None, exclude=None, max_tokens=0, max_bytes=0,
+                        max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_repo_bytes=0, page_bytes=0, token=None):
+    repo_processor = GitlabRepo2Txt(progress=job_progress(token), cancel=token)
+    revision = repo_processor.resolve_revision(repo_url, branch, mode)
+    options = {'mode': mode, **render_options(include, exclude, max_tokens, max_bytes, max_file_bytes, max_repo_bytes)}
+    if base_ref:
+        base_ref = options['base'] = repo_processor.resolve_revision(repo_url, base_ref, mode)
+    return render_cached('gitlab', repo_url, revision, options,
+                         lambda: repo_processor.iter_repo(repo_url, revision, mode, include, exclude,
+                                                          max_tokens, max_bytes, max_file_bytes, max_repo_bytes,
+                                                          base_ref or None),
+                         page_bytes, token)
+
+def process_github_repo(repo_url, branch, mode, base_ref=None, include=None, exclude=None, max_tokens=0, max_bytes=0,
+                        max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_repo_bytes=0, page_bytes=0, token=None):
+    repo_processor = GithubRepo2Txt(progress=job_progress(token), cancel=token)
+    revision = repo_processor.resolve_revision(repo_url, branch, mode)
+    options = {'mode': mode, **render_options(include, exclude, max_tokens, max_bytes, max_file_bytes, max_repo_bytes)}
+    if base_ref:
+        base_ref = options['base'] = repo_processor.resolve_revision(repo_url, base_ref, mode)
+    return render_cached('github', repo_url, revision, options,
+                         lambda: repo_processor.iter_repo(repo_url, revision, mode, include, exclude,
+                                                          max_tokens, max_bytes, max_file_bytes, max_repo_bytes,
+                                                          base_ref or None),
+                         page_bytes, token)
+
+def process_local_repo(repo_path, ref=None, base_ref=None, include=None, exclude=None, max_tokens=0, max_bytes=0,
+                       max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_repo_bytes=0, page_bytes=0, token=None):
+    repo_processor = LocalRepo2Txt(progress=job_progress(token), cancel=token)
+    manifest = None
+    if ref:
+        # A ref is read from the object database, so its commit SHA identifies the rendering
+        revision = ref = repo_processor.resolve_revision(repo_path, ref)
+    else:
+        # Scanned once: the fingerprint and, on a miss, the rendering share the manifest
+        manifest = repo_processor.scan(repo_path, include, exclude)
+        revision = repo_processor.fingerprint(repo_path, include, exclude, manifest)
+    options = render_options(include, exclude, max_tokens, max_bytes, max_file_bytes, max_repo_bytes)
+    if base_ref:
+        base_ref = options['base'] = repo_processor.resolve_revision(repo_path, base_ref)
+    return render_cached('local', repo_path, revision, options,
+                         lambda: repo_processor.iter_repo(repo_path, include, exclude, max_tokens, max_bytes,
+                                                          max_file_bytes, max_repo_bytes, ref or None,
+                                                          base_ref or None, manifest),
+                         page_bytes, token)
+
+def batch_job(spec):
+    """
+    Build a BatchJob from one job of a get_repos call.
+
+    Raises:
+        ValueError: for a job without repo, of an unknown source or with unknown keys
+    """
+    spec = dict(spec)
+    source, repo = spec.pop('source', ''), spec.pop('repo', '')
+    ref, mode = spec.pop('ref', None), spec.pop('mode', 'auto')
+    unknown = sorted(set(spec) - set(BATCH_OPTIONS))
+    if unknown:
+        raise ValueError(f"Unknown job option(s) {', '.join(unknown)} for '{repo}'")
+    if not repo:
+        raise ValueError("Every job needs a 'repo'")
+    return make_job(source, repo, ref, mode, spec)
+
+def render_batch_job(job, token):
+    """Render one job of a batch like the single-repository tools, sharing their result cache."""
+    options = dict(job.options)
+    if job.source == 'local':
+        return process_local_repo(job.repo, job.ref, token=token, **options)
+    process = process_github_repo if job.source == 'github' else process_gitlab_repo
+    return process(job.repo, job.ref or 'master', job.mode, token=token, **options)
+
+def batch_chunks(jobs, max_jobs, token=None):
+    """
+    Yield the section of each job as it completes, telling the job's listeners
+    about every finished repository.
+    """
+    total = len(jobs)
+    nbytes = 0
+    results = run_batch(jobs, render_batch_job, max_jobs, token)
+    try:
+        for done, result in enumerate(results, 1):
+            job = result.job
+            name = f"{job.source} {job.repo}" + (f" @ {job.ref}" if job.ref else "")
+            if result.error is not None:
+                status = f"Processing failed: {result.error}"
+                section = f"Repository: {name}\n{status}\n\n"
+            else:
+                status = f"{len(result.content)} characters in {result.seconds:.1f}s"
+                section = f"Repository: {name}\n\n{result.content}\n"
+            nbytes += len(section)
+            if token is not None:
+                token.notify('result', f"[{done}/{total}] {name}: {status}")
+                token.notify('progress', 'batch', done, total, nbytes)
+            yield section
+    finally:
+        results.close()
+
+def process_batch(specs, max_jobs=0, page_bytes=0, token=None):
+    """
+    Render every job of a get_repos call, at most max_jobs at a time, paged
+    like a single rendering when larger than page_bytes.
+    """
+    jobs = [batch_job(spec) for spec in specs]
+    if not jobs:
+        return "No repositories given"
+    chunks = batch_chunks(jobs, max_jobs or BATCH_JOBS, token)
+    if not page_bytes:
+        return ''.join(chunks)
+    return first_page(sessions.create(job_key('batch', specs), chunks), page_bytes)
+
+def find_dump(repo):
+    """
+    Locate a saved dump from its path or, in DUMP_DIR, from its repository name.
+
+    Raises:
+        ValueError: if no indexed dump is found
+    """
+    if repo.endswith('.idx') and os.path.isfile(repo):
+        return repo
+    for candidate in (repo, os.path.join(DUMP_DIR, f"{repo}_contents.txt"),
+                      os.path.join(DUMP_DIR, f"{repo}_contents.dump")):
+        if os.path.isfile(candidate + '.idx'):
+            return candidate
+    raise ValueError(f"No indexed dump found for '{repo}'; save one with output_format='indexed'")
+
+def read_dump(repo, path, prefix=False, page_bytes=0, token=None):
+    """
+    Return one file of a saved dump, or with prefix every file under the directory ``path``,
+    paged like a rendering when larger than page_bytes.
+    """
+    dump = find_dump(repo)
+    with DumpReader(dump) as reader:
+        if not prefix:
+            content = reader.get(path)
+            return content if content is not None else f"File '{path}' not found in {reader.path}"
+        if not page_bytes:
+            content = ''.join(reader.iter_prefix(path))
+        else:
+            content = first_page(sessions.create(job_key('dump', reader.path, path), reader.iter_prefix(path)),
+                                 page_bytes)
+        return content or f"No files under '{path}' in {reader.path}"
+
 @mcp.tool()
-async def get_gitlab_repo(repo_url: str, branch: str = "master")->str:
+async def get_gitlab_repo(repo_url: str, branch: str = "master", mode: str = "auto", base_ref: str = "",
+                          include: list[str] | None = None, exclude: list[str] | None = None,
+                          max_tokens: int = 0, max_bytes: int = 0,
+                          max_file_bytes: int = DEFAULT_MAX_FILE_BYTES, max_repo_bytes: int = 0,
+                          page_bytes: int | None = None, partial: bool = False,
+                          ctx: Context = None)->str:
     """
-    Process and return the code from a GitLab repository branch as text
+    Process and return the code from a GitLab repository branch as text.
+    mode: 'api' fetches files one by one, 'archive' streams one tarball, 'auto' picks by file count,
+    'mirror' reads a local shallow clone kept up to date with incremental fetches
+    base_ref: branch, tag or SHA to compare with; only files added or modified since it are fetched
+    and rendered, after the README, the structure and a list of deletions and renames
+    include/exclude: .gitignore-style patterns selecting which files are rendered
+    max_tokens/max_bytes: output budget (0 for none); files that do not fit are not read and are listed at the end
+    max_file_bytes: files larger than this are shown as a head/tail excerpt (0 for no limit)
+    max_repo_bytes: stop reading file contents after this many bytes (0 for no limit)
+    page_bytes: page size of the response (server default when omitted, 0 for everything at once);
+    larger output ends with a cursor for get_repo_page
+    partial: send the README and structure as a log message as soon as they are ready;
+    progress notifications are sent whenever the request carries a progress token
     """
     try:
-        repo_processor = GitlabRepo2Txt()
-        repo_name, content = repo_processor.process_repo(
-        repo_url=repo_url,
-        branch=branch  # optional parameter
-        )
+        # Runs on the job pool; gives up after TIMEOUT seconds (REPO2LLM_TIMEOUT, default 10 minutes)
+        return await runner.run(
+            job_key('gitlab', repo_url, branch, mode, base_ref, render_options(include, exclude, max_tokens, max_bytes,
+                                                                     max_file_bytes, max_repo_bytes),
+                    page_size(page_bytes)),
+            process_gitlab_repo, repo_url, branch, mode, base_ref, include, exclude,
+            max_tokens, max_bytes, max_file_bytes, max_repo_bytes, page_size(page_bytes),
+            timeout=TIMEOUT, listener=job_listener(ctx, partial))
         # logger.info(f"Processed GitLab repository: {repo_name}")
         # logger.info(f"Processed GitLab content: {content}")
-        return content
+    except asyncio.TimeoutError:
+        return "Processing timeout, please check repository size or network connection"
     except Exception as e:
         # print(f"Error processing GitLab repository: {e}")
-        return None
+        return f"Processing failed: {str(e)}"
 
 @mcp.tool()
-async def get_github_repo(repo_url: str, branch: str = "master")->str:
+async def get_github_repo(repo_url: str, branch: str = "master", mode: str = "auto", base_ref: str = "",
+                          include: list[str] | None = None, exclude: list[str] | None = None,
+                          max_tokens: int = 0, max_bytes: int = 0,
+                          max_file_bytes: int = DEFAULT_MAX_FILE_BYTES, max_repo_bytes: int = 0,
+                          page_bytes: int | None = None, partial: bool = False,
+                          ctx: Context = None)->str:
     """
-    Process and return the code from a GitHub repository branch as text
+    Process and return the code from a GitHub repository branch as text.
+    mode: 'api' fetches files one by one, 'archive' streams one tarball, 'auto' picks by file count,
+    'mirror' reads a local shallow clone kept up to date with incremental fetches
+    base_ref: branch, tag or SHA to compare with; only files added or modified since it are fetched
+    and rendered, after the README, the structure and a list of deletions and renames
+    include/exclude: .gitignore-style patterns selecting which files are rendered
+    max_tokens/max_bytes: output budget (0 for none); files that do not fit are not read and are listed at the end
+    max_file_bytes: files larger than this are shown as a head/tail excerpt (0 for no limit)
+    max_repo_bytes: stop reading file contents after this many bytes (0 for no limit)
+    page_bytes: page size of the response (server default when omitted, 0 for everything at once);
+    larger output ends with a cursor for get_repo_page
+    partial: send the README and structure as a log message as soon as they are ready;
+    progress notifications are sent whenever the request carries a progress token
     """
     try:
-        # Create an event loop
-        loop = asyncio.get_event_loop()
-        # Wrap synchronous operation in async operation with 300 seconds (5 minutes) timeout
-        repo_processor = GithubRepo2Txt()
-        repo_name, content = await asyncio.wait_for(
-            loop.run_in_executor(None, repo_processor.process_repo, repo_url, branch),
-            timeout=3000
-        )
+        # Runs on the job pool; gives up after TIMEOUT seconds (REPO2LLM_TIMEOUT, default 10 minutes)
+        return await runner.run(
+            job_key('github', repo_url, branch, mode, base_ref, render_options(include, exclude, max_tokens, max_bytes,
+                                                                     max_file_bytes, max_repo_bytes),
+                    page_size(page_bytes)),
+            process_github_repo, repo_url, branch, mode, base_ref, include, exclude,
+            max_tokens, max_bytes, max_file_bytes, max_repo_bytes, page_size(page_bytes),
+            timeout=TIMEOUT, listener=job_listener(ctx, partial))
         # logger.info(f"Processed GitLab repository: {repo_name}")
-
-        return content
     except asyncio.TimeoutError:
         return "Processing timeout, please check repository size or network connection"
     except Exception as e:
@@ -54,24 +434,146 @@ async def get_github_repo(repo_url: str, branch: str = "master")->str:
         return f"Processing failed: {str(e)}"
 
 @mcp.tool()
-async def get_local_repo(repo_path: str)->str:
+async def get_local_repo(repo_path: str, watch: bool = False, ref: str = "", base_ref: str = "",
+                         include: list[str] | None = None, exclude: list[str] | None = None,
+                         max_tokens: int = 0, max_bytes: int = 0,
+                         max_file_bytes: int = DEFAULT_MAX_FILE_BYTES, max_repo_bytes: int = 0,
+                         page_bytes: int | None = None, partial: bool = False,
+                         ctx: Context = None)->str:
     """
-    Process and return the code from a local repository as text
+    Process and return the code from a local repository as text, skipping paths ignored by .gitignore.
+    watch: keep following file changes (Linux inotify) so later calls re-read nothing
+    ref: branch, tag or commit to read straight from the git object database instead of the working tree
+    base_ref: branch, tag or commit to compare with; only files added or modified since it are read
+    and rendered, after the structure and a list of deletions and renames
+    include/exclude: .gitignore-style patterns selecting which files are rendered
+    max_tokens/max_bytes: output budget (0 for none); files that do not fit are not read and are listed at the end
+    max_file_bytes: files larger than this are shown as a head/tail excerpt (0 for no limit)
+    max_repo_bytes: stop reading file contents after this many bytes (0 for no limit)
+    page_bytes: page size of the response (server default when omitted, 0 for everything at once);
+    larger output ends with a cursor for get_repo_page
+    partial: send the README and structure as a log message as soon as they are ready;
+    progress notifications are sent whenever the request carries a progress token
     """
     try:
-        # Create an event loop
-        loop = asyncio.get_event_loop()
-        # Wrap synchronous operation in async operation with 300 seconds (5 minutes) timeout
-        repo_processor = LocalRepo2Txt()
-        repo_name, content = await asyncio.wait_for(
-            loop.run_in_executor(None, repo_processor.process_repo, repo_path),
-            timeout=300
-        )
-        return content
+        if watch:
+            # May stop the least recently watched repository, which waits for its thread
+            await asyncio.to_thread(watch_repo, repo_path)
+        # Runs on the job pool; gives up after TIMEOUT seconds (REPO2LLM_TIMEOUT, default 10 minutes)
+        return await runner.run(
+            job_key('local', repo_path, ref, base_ref, render_options(include, exclude, max_tokens, max_bytes,
+                                                                      max_file_bytes, max_repo_bytes),
+                    page_size(page_bytes)),
+            process_local_repo, repo_path, ref, base_ref, include, exclude, max_tokens, max_bytes,
+            max_file_bytes, max_repo_bytes, page_size(page_bytes),
+            timeout=TIMEOUT, listener=job_listener(ctx, partial))
     except asyncio.TimeoutError:
         return "Processing timeout, please check repository size or file count"
     except Exception as e:
         return f"Processing failed: {str(e)}"
+
+@mcp.tool()
+async def unwatch_local_repo(repo_path: str = "")->str:
+    """
+    Stop following file changes of a repository watched with get_local_repo(watch=True).
+    repo_path: repository path as passed to get_local_repo (empty for all)
+    """
+    stopped = await asyncio.to_thread(unwatch_repo, repo_path or None)
+    return f"Stopped {stopped} watcher(s)"
+
+@mcp.tool()
+async def get_repos(jobs: list[dict], max_jobs: int = 0, page_bytes: int | None = None,
+                    ctx: Context = None)->str:
+    """
+    Process several repositories in one call and return their code as text, one section per
+    repository in the order they complete.
+    jobs: list of {"source": "github" | "gitlab" | "local", "repo": URL or path, "ref": branch, tag or SHA,
+    "mode": as for get_github_repo}, each optionally with base_ref, include, exclude, max_tokens,
+    max_bytes, max_file_bytes or max_repo_bytes
+    max_jobs: repositories rendered at the same time (server default when 0); requests to each
+    host share one concurrency and rate-limit budget however many run
+    page_bytes: page size of the response (server default when omitted, 0 for everything at once);
+    larger output ends with a cursor for get_repo_page
+    A log message is sent as each repository completes, with progress notifications when the
+    request carries a progress token
+    """
+    try:
+        # Runs on the job pool; gives up after TIMEOUT seconds (REPO2LLM_TIMEOUT, default 10 minutes)
+        return await runner.run(job_key('batch', jobs, max_jobs, page_size(page_bytes)),
+                                process_batch, jobs, max_jobs, page_size(page_bytes),
+                                timeout=TIMEOUT, listener=job_listener(ctx))
+    except asyncio.TimeoutError:
+        return "Processing timeout, please check repository sizes or network connection"
+    except Exception as e:
+        return f"Processing failed: {str(e)}"
+
+@mcp.tool()
+async def get_repo_page(cursor: str, page_bytes: int | None = None, file_index: int = -1)->str:
+    """
+    Return the next page of a repository rendering from the cursor that ended the previous page.
+    page_bytes: page size (server default when omitted)
+    file_index: start at this file record (0-based) of the rendering instead of the cursor's offset
+    """
+    try:
+        session_id, offset = parse_cursor(cursor)
+    except ValueError as e:
+        return f"Processing failed: {str(e)}"
+    session = sessions.get(session_id)
+    if session is None:
+        return "Cursor expired or unknown, please request the repository again"
+    if file_index >= 0:
+        offset = session.file_offset(file_index)
+    return render_page(session, offset, page_size(page_bytes) or PAGE_BYTES)
+
+@mcp.tool()
+async def get_file(repo: str, path: str, prefix: bool = False, page_bytes: int | None = None)->str:
+    """
+    Return one file of a dump saved with output_format='indexed', straight from its index
+    and without processing the repository again.
+    repo: path of the dump (its contents file or .idx index), or the repository name of a dump in REPO2LLM_DUMP_DIR
+    path: file path relative to the repository root
+    prefix: return every file under the directory path instead (all files when path is empty)
+    page_bytes: page size of a prefix listing (server default when omitted, 0 for no paging)
+    """
+    try:
+        return await runner.run(job_key('dump', repo, path, prefix, page_bytes), read_dump, repo, path, prefix,
+                                page_size(page_bytes), timeout=TIMEOUT)
+    except asyncio.TimeoutError:
+        return "Processing timeout, please check the dump size"
+    except Exception as e:
+        return f"Processing failed: {str(e)}"
+
+@mcp.tool()
+async def get_cache_stats()->str:
+    """
+    Return hit/miss counts and size of the shared blob cache, the result cache and the paging sessions,
+    counts of repository jobs, the request budget of each API host and the watched repositories, as JSON
+    """
+    cache = get_default_blob_cache()
+    blobs = dict(cache.stats(), enabled=True) if cache is not None else {"enabled": False}
+    return json.dumps({"blobs": blobs, "results": result_cache.stats(), "sessions": sessions.stats(),
+                       "jobs": runner.stats(), "hosts": get_default_scheduler().stats(),
+                       "watchers": watched_repos()})
+
+@mcp.tool()
+async def get_stats(recent: int = 10)->str:
+    """
+    Return per-phase timings (resolve, enumerate, fetch, decode, render) and counters
+    (API calls, bytes, rendered/binary/skipped/failed files, cache hits) as JSON:
+    totals since start and the most recent renderings.
+    recent: how many recent renderings to include
+    """
+    return json.dumps(dict(stats.registry.as_dict(recent), jobs=runner.stats()))
+
+@mcp.tool()
+async def invalidate_cache(source: str = "", repo: str = "")->str:
+    """
+    Drop cached renderings. source: 'github', 'gitlab' or 'local' (empty for all);
+    repo: repository URL or local path as passed to the tools (empty for all)
+    """
+    removed = result_cache.invalidate(source=source or None, repo=repo or None)
+    return f"Removed {removed} cached result(s)"
+
 if __name__ == "__main__":
     # Initialize and run the server
     mcp.run(transport='stdio')
\ No newline at end of file
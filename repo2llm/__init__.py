@@ -1,3 +1,22 @@
-from .githubrepo2txt import GithubRepo2Txt
-from .gitlibrepo2txt import GitlabRepo2Txt
-from .localrepo2txt import LocalRepo2Txt
\ No newline at end of file
+import importlib
+
+# Processors are imported on first access, so using one backend never loads the others
+_PROCESSORS = {
+    'GithubRepo2Txt': '.githubrepo2txt',
+    'GitlabRepo2Txt': '.gitlibrepo2txt',
+    'LocalRepo2Txt': '.localrepo2txt',
+}
+
+__all__ = list(_PROCESSORS)
+
+
+def __getattr__(name):
+    if name in _PROCESSORS:
+        value = getattr(importlib.import_module(_PROCESSORS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
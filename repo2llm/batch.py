@@ -0,0 +1,103 @@
+import importlib
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .runner import CancelToken, cancellable
+
+# Processor class of each source, imported only when a job needs it
+_SOURCES = {
+    'github': ('.githubrepo2txt', 'GithubRepo2Txt'),
+    'gitlab': ('.gitlibrepo2txt', 'GitlabRepo2Txt'),
+    'local': ('.localrepo2txt', 'LocalRepo2Txt'),
+}
+
+# One repository of a batch. ``ref`` is a branch, tag or SHA (for a local
+# repository, None reads the working tree); ``options`` holds iter_repo keyword
+# arguments such as include, exclude or max_tokens.
+BatchJob = namedtuple('BatchJob', ['source', 'repo', 'ref', 'mode', 'options'], defaults=(None, 'auto', None))
+
+# Outcome of one job: its rendering, or the error that stopped it.
+BatchResult = namedtuple('BatchResult', ['job', 'content', 'error', 'seconds'])
+
+
+def make_job(source, repo, ref=None, mode='auto', options=None):
+    """
+    Build a BatchJob, checking its source.
+
+    Raises:
+        ValueError: for a source other than 'github', 'gitlab' or 'local'
+    """
+    if source not in _SOURCES:
+        raise ValueError(f"Unknown source '{source}', expected 'github', 'gitlab' or 'local'")
+    return BatchJob(source, repo, ref or None, mode or 'auto', dict(options or {}))
+
+
+def make_processor(source, scheduler=None, cancel=None):
+    module, name = _SOURCES[source]
+    processor_class = getattr(importlib.import_module(module, __package__), name)
+    if source == 'local':
+        return processor_class(cancel=cancel)
+    return processor_class(scheduler=scheduler, cancel=cancel)
+
+
+def render_job(job, token, scheduler=None):
+    """
+    Render one job with a processor of its own; clients, connection pools,
+    the blob cache and the per-host budgets are shared by every processor.
+    Stops at the next chunk once ``token`` is cancelled.
+
+    Returns:
+        str: the rendering
+    """
+    processor = make_processor(job.source, scheduler, token)
+    options = job.options or {}
+    if job.source == 'local':
+        chunks = processor.iter_repo(job.repo, ref=job.ref, **options)
+    else:
+        chunks = processor.iter_repo(job.repo, job.ref or 'master', job.mode, **options)
+    return ''.join(cancellable(chunks, token))
+
+
+def run_batch(jobs, render=None, max_jobs=8, token=None, scheduler=None):
+    """
+    Render several repositories concurrently and yield a BatchResult per job
+    as soon as it completes, fastest first.
+
+    Up to ``max_jobs`` jobs run at once. Jobs on the same host share its
+    FetchScheduler budget, so adding jobs raises throughput until the
+    host's concurrency or rate limit is reached, and never goes past it. A
+    failing job yields its error without stopping the others. Closing the
+    generator early cancels the jobs still queued or running.
+
+    Args:
+        render (callable, optional): ``render(job, token)`` returning the
+            rendering of one job; defaults to ``render_job``
+        token (CancelToken, optional): cancels the whole batch; every job
+            gets a child token of it
+        scheduler (FetchScheduler, optional): budgets of the default
+            renderer; the process-wide scheduler when omitted
+    """
+    jobs = list(jobs)
+    token = token or CancelToken()
+    if render is None:
+        render = lambda job, job_token: render_job(job, job_token, scheduler)
+
+    def run(job):
+        start = time.monotonic()
+        try:
+            return BatchResult(job, render(job, token.child()), None, time.monotonic() - start)
+        except Exception as e:
+            return BatchResult(job, None, e, time.monotonic() - start)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_jobs, len(jobs) or 1)),
+                                  thread_name_prefix='repo2llm-batch')
+    pending = {executor.submit(run, job) for job in jobs}
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        if pending:
+            token.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,96 @@
+import os
+
+# Suffixes of files that are skipped without reading them. Matched
+# case-insensitively against the last dot-separated suffixes of a file name,
+# so '.tar.gz' and '.gz' both match 'release.TAR.GZ'.
+BINARY_SUFFIXES = frozenset(suffix.lower() for suffix in (
+    # Compiled executables and libraries
+    '.exe', '.dll', '.so', '.a', '.lib', '.dylib', '.o', '.obj',
+    # Compressed archives
+    '.zip', '.tar', '.tar.gz', '.tgz', '.rar', '.7z', '.bz2', '.gz', '.xz', '.z', '.lz', '.lzma', '.lzo', '.rz', '.sz', '.dz',
+    # Application-specific files
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.odt', '.ods', '.odp',
+    # Media files (less common)
+    '.png', '.jpg', '.jpeg', '.gif', '.mp3', '.mp4', '.wav', '.flac', '.ogg', '.avi', '.mkv', '.mov', '.webm', '.wmv', '.m4a', '.aac',
+    # Virtual machine and container images
+    '.iso', '.vmdk', '.qcow2', '.vdi', '.vhd', '.vhdx', '.ova', '.ovf',
+    # Database files
+    '.db', '.sqlite', '.mdb', '.accdb', '.frm', '.ibd', '.dbf',
+    # Java-related files
+    '.jar', '.class', '.war', '.ear', '.jpi',
+    # Python bytecode and packages
+    '.pyc', '.pyo', '.pyd', '.egg', '.whl',
+    # Other potentially important extensions
+    '.deb', '.rpm', '.apk', '.msi', '.dmg', '.pkg', '.bin', '.dat', '.data',
+    '.dump', '.img', '.toast', '.vcd', '.crx', '.xpi', '.lockb', '.svg',
+    '.eot', '.otf', '.ttf', '.woff', '.woff2',
+    '.ico', '.icns', '.cur',
+    '.cab', '.dmp', '.msp', '.msm',
+    '.keystore', '.jks', '.truststore', '.cer', '.crt', '.der', '.p7b', '.p7c', '.p12', '.pfx', '.pem', '.csr',
+    '.key', '.pub', '.sig', '.pgp', '.gpg',
+    '.nupkg', '.snupkg', '.appx', '.msix', '.msu',
+    '.snap', '.flatpak', '.appimage',
+    '.ko', '.sys', '.elf',
+    '.swf', '.fla', '.swc',
+    '.rlib', '.pdb', '.idb', '.dbg',
+    '.sdf', '.bak', '.tmp', '.temp', '.log', '.tlog', '.ilk',
+    '.bpl', '.dcu', '.dcp', '.dcpil', '.drc',
+    '.aps', '.res', '.rsrc',
+    '.DS_Store', '.localized', '.svn', '.git',
+))
+
+# Whole file names that are skipped: generated lock files with no value as context
+BINARY_NAMES = frozenset((
+    'package-lock.json',
+))
+
+# Most dot-separated parts any suffix above spans, e.g. 2 for '.tar.gz'
+_MAX_SUFFIX_PARTS = max(suffix.count('.') for suffix in BINARY_SUFFIXES)
+
+# How much of a file is inspected before deciding to read the rest
+SNIFF_BYTES = 8192
+
+# Bytes that occur in text: printable ASCII, common control characters and
+# everything above 0x7f (UTF-8 or legacy 8-bit encodings)
+_TEXT_BYTES = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7f})
+
+
+def is_binary_name(path):
+    """
+    Return True if the file at ``path`` is skipped because of its name or suffix.
+
+    ``path`` may be a bare file name or a path using '/' or ``os.sep``.
+    """
+    name = path[max(path.rfind('/'), path.rfind(os.sep)) + 1:].lower()
+    if name in BINARY_NAMES:
+        return True
+    end = len(name)
+    for _ in range(_MAX_SUFFIX_PARTS):
+        end = name.rfind('.', 0, end)
+        if end < 0:
+            return False
+        if name[end:] in BINARY_SUFFIXES:
+            return True
+    return False
+
+
+def is_binary_content(head):
+    """
+    Return True if ``head``, the first bytes of a file, look like binary data.
+
+    A NUL byte marks a file as binary. Otherwise a prefix that is not valid
+    UTF-8 is binary only when more than a tenth of it is control bytes, so
+    Latin-1 and other 8-bit text is still rendered.
+    """
+    if not head:
+        return False
+    if b'\0' in head:
+        return True
+    try:
+        head.decode('utf-8')
+        return False
+    except UnicodeDecodeError as e:
+        if e.reason == 'unexpected end of data' and e.end == len(head):
+            # A multi-byte character cut off by the prefix boundary
+            return False
+    return len(head.translate(None, _TEXT_BYTES)) * 10 > len(head)
@@ -0,0 +1,152 @@
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Git object ids: SHA-1 (40 hex) or SHA-256 (64 hex) repositories
+_SHA_RE = re.compile(r'^[0-9a-f]{40}([0-9a-f]{24})?$')
+
+
+def default_cache_dir():
+    return os.getenv('REPO2LLM_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'repo2llm'))
+
+
+class BlobCache:
+    """
+    On-disk, content-addressed cache of blob contents keyed by git blob SHA.
+
+    Blobs are immutable, so an entry never goes stale; the cache only has to
+    stay under ``max_bytes``, which it does by evicting the least recently
+    used blobs. Writes go through a temporary file and ``os.replace`` so
+    concurrent readers, threads or processes, never see a partial blob.
+    """
+
+    def __init__(self, directory=None, max_bytes=512 * 1024 * 1024):
+        self.directory = directory or os.path.join(default_cache_dir(), 'blobs')
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU index from the files already on disk, oldest access first."""
+        found = []
+        for prefix in os.listdir(self.directory):
+            prefix_dir = os.path.join(self.directory, prefix)
+            if len(prefix) != 2 or not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if not _SHA_RE.match(name):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(prefix_dir, name))
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, name, stat.st_size))
+        for _, sha, size in sorted(found):
+            self.entries[sha] = size
+            self.total_bytes += size
+
+    def _path(self, sha):
+        return os.path.join(self.directory, sha[:2], sha)
+
+    def get(self, sha):
+        """
+        Return the cached bytes for ``sha``, or None on a miss.
+        """
+        if not sha or not _SHA_RE.match(sha):
+            return None
+        try:
+            with open(self._path(sha), 'rb') as f:
+                data = f.read()
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+            if sha in self.entries:
+                self.entries.move_to_end(sha)
+        try:
+            # Keeps LRU order across processes sharing the directory
+            os.utime(self._path(sha))
+        except OSError:
+            pass
+        return data
+
+    def put(self, sha, data):
+        """
+        Store ``data`` under ``sha`` and evict old entries if the cache is over its cap.
+        """
+        if not sha or not _SHA_RE.match(sha) or len(data) > self.max_bytes:
+            return
+        with self.lock:
+            if sha in self.entries:
+                self.entries.move_to_end(sha)
+                return
+        path = self._path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        evicted = []
+        with self.lock:
+            if sha not in self.entries:
+                self.entries[sha] = len(data)
+                self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes and self.entries:
+                old_sha, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                self.evictions += 1
+                evicted.append(old_sha)
+        for old_sha in evicted:
+            try:
+                os.remove(self._path(old_sha))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'directory': self.directory,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_blob_cache():
+    """
+    Return the process-wide blob cache shared by all processors, or None when
+    it is disabled with ``REPO2LLM_BLOB_CACHE_MB=0``.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            max_mb = int(os.getenv('REPO2LLM_BLOB_CACHE_MB', '512'))
+            if max_mb <= 0:
+                return None
+            _default_cache = BlobCache(max_bytes=max_mb * 1024 * 1024)
+        return _default_cache
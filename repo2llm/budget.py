@@ -0,0 +1,284 @@
+import posixpath
+
+from .binaryfilter import is_binary_name
+from collections import namedtuple
+
+# Rough size of one LLM token in bytes of source text; good enough to plan
+# a budget without running a tokenizer over content that is not read yet.
+BYTES_PER_TOKEN = 4
+
+# Bytes of ``File: ...`` / ``Content:`` framing around each record, besides the path
+RECORD_OVERHEAD = 18
+
+# Bytes charged for a file rendered as a one-line skip note
+NOTE_BYTES = 32
+
+# Most omitted paths listed in the footer
+MAX_LISTED = 200
+
+# Bytes set aside for the footer's summary lines; the paths it lists only
+# take what the rendered files leave of the budget
+FOOTER_BYTES = 128
+
+# Bytes set aside for the note that ends a README or listing cut short
+CLIP_NOTE_BYTES = 96
+
+ENTRY_POINT_NAMES = frozenset((
+    'main.py', '__main__.py', 'app.py', 'cli.py', 'server.py', 'manage.py', 'setup.py', 'pyproject.toml',
+    'package.json', 'index.js', 'index.ts', 'main.js', 'main.ts', 'server.js', 'app.js',
+    'main.go', 'go.mod', 'main.rs', 'lib.rs', 'cargo.toml', 'main.c', 'main.cpp', 'program.cs',
+    'main.java', 'main.kt', 'makefile', 'dockerfile', 'cmakelists.txt',
+))
+
+SOURCE_SUFFIXES = frozenset((
+    '.py', '.pyi', '.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx', '.go', '.rs', '.java', '.kt', '.kts',
+    '.scala', '.c', '.h', '.cc', '.cpp', '.cxx', '.hpp', '.cs', '.fs', '.rb', '.php', '.swift', '.m',
+    '.mm', '.lua', '.pl', '.r', '.jl', '.ex', '.exs', '.erl', '.hs', '.ml', '.clj', '.dart', '.vue',
+    '.svelte', '.sh', '.bash', '.zsh', '.ps1', '.sql', '.proto', '.graphql',
+))
+
+# One file considered for the budget; ``size`` is None when the source does not report it.
+# ``shown`` is the path its record displays, when that differs from ``path``.
+BudgetItem = namedtuple('BudgetItem', ['key', 'path', 'size', 'shown'], defaults=(None,))
+
+
+def rank(item):
+    """
+    Sort key putting the most useful files first: the root README, then other
+    READMEs and entry points, then source files and then everything else,
+    smallest first. Files of unknown size go after those of known size.
+    """
+    name = posixpath.basename(item.path).lower()
+    if name.startswith('readme'):
+        tier = 0 if posixpath.dirname(item.path.strip('/')) == '' else 1
+    elif name in ENTRY_POINT_NAMES:
+        tier = 1
+    elif posixpath.splitext(name)[1] in SOURCE_SUFFIXES:
+        tier = 2
+    else:
+        tier = 3
+    if item.size is None:
+        return (1, tier, 0, item.path)
+    return (0, tier, item.size, item.path)
+
+
+class Budget:
+    """
+    Output budget of a rendering, in bytes, from ``max_tokens`` and/or ``max_bytes``.
+
+    ``plan`` picks which files to read before any of them is read or
+    fetched; files that do not fit are recorded as dropped and reported by
+    ``footer``. The README and the structure listing, which come before any
+    file, are cut short by ``clip`` and ``clip_lines`` to what remains.
+    Without either limit every file is kept.
+    """
+
+    def __init__(self, max_tokens=None, max_bytes=None):
+        limits = []
+        if max_tokens:
+            limits.append(max_tokens * BYTES_PER_TOKEN)
+        if max_bytes:
+            limits.append(max_bytes)
+        self.max_tokens = max_tokens or None
+        self.limit = min(limits) if limits else None
+        self.used = FOOTER_BYTES if self.limit is not None else 0
+        self.dropped = []
+        self.unsized = {}
+
+    @property
+    def active(self):
+        return self.limit is not None
+
+    def remaining(self):
+        """Bytes left in the budget, or None without a limit."""
+        return None if self.limit is None else max(self.limit - self.used, 0)
+
+    def size_limit(self, key):
+        """
+        Largest size at which a file of unknown size could still fit, or None
+        when the file needs no check.
+        """
+        if key not in self.unsized:
+            return None
+        return self.remaining()
+
+    def reserve(self, size):
+        """
+        Charge ``size`` bytes of output that is always emitted, such as the
+        introduction, a title or a footer. A budget too small for them is
+        reported as overrun by ``footer``.
+        """
+        self.used += size
+
+    def describe(self):
+        """The limit as shown in notes: in tokens when given in tokens, else in bytes."""
+        if self.max_tokens and self.limit == self.max_tokens * BYTES_PER_TOKEN:
+            return f"~{self.max_tokens} tokens"
+        return f"{self.limit} bytes"
+
+    def _clip_note(self, what, shown, total, unit):
+        return f"... [{what} cut short: {shown} of {total} {unit} shown to stay within {self.describe()}]\n"
+
+    def clip(self, text, what):
+        """
+        Charge ``text``, such as the README, cutting it at a line break to what
+        remains of the budget, followed by a note, when it does not fit.
+
+        Returns:
+            str: ``text`` itself or its clipped form
+        """
+        data = text.encode('utf-8', 'surrogateescape')
+        if not self.active or self.used + len(data) <= self.limit:
+            self.used += len(data)
+            return text
+        kept = data[:max(self.limit - self.used - CLIP_NOTE_BYTES, 0)]
+        kept = kept[:kept.rfind(b'\n') + 1]
+        clipped = kept.decode('utf-8', 'surrogateescape') + self._clip_note(what, len(kept), len(data), 'bytes')
+        self.used += len(clipped.encode('utf-8', 'surrogateescape'))
+        return clipped
+
+    def clip_lines(self, lines, what='structure'):
+        """
+        Charge the lines of a listing, such as the structure listing, keeping
+        the first ones that fit what remains of the budget and ending with a
+        note when some are left out.
+
+        Returns:
+            list: the lines to emit
+        """
+        lines = list(lines)
+        sizes = [len(line.encode('utf-8', 'surrogateescape')) for line in lines]
+        if not self.active or self.used + sum(sizes) <= self.limit:
+            self.used += sum(sizes)
+            return lines
+        room = self.limit - self.used - CLIP_NOTE_BYTES
+        count = 0
+        while count < len(lines) and sizes[count] <= room:
+            room -= sizes[count]
+            count += 1
+        note = self._clip_note(what, count, len(lines), 'lines')
+        self.used += sum(sizes[:count]) + len(note.encode('utf-8'))
+        return lines[:count] + [note]
+
+    def keep(self, item):
+        """
+        Charge a file rendered as a short note, such as one skipped by name, if the note fits.
+
+        Returns:
+            bool: False if it does not fit; it is then recorded as dropped
+        """
+        cost = self.cost(item, NOTE_BYTES)
+        if self.active and self.used + cost > self.limit:
+            self.dropped.append(item)
+            return False
+        self.used += cost
+        return True
+
+    @staticmethod
+    def cost(item, size=None):
+        """Bytes the record of ``item`` takes in the output, path and framing included."""
+        size = item.size if size is None else size
+        return size + len((item.shown or item.path).encode('utf-8', 'surrogateescape')) + RECORD_OVERHEAD
+
+    def plan(self, items):
+        """
+        Choose the files to render.
+
+        Files of known size are admitted in rank order while they fit. Files
+        of unknown size are all kept for now and must pass ``admit`` once
+        their size is known.
+
+        Returns:
+            set: keys of the files to read or fetch
+        """
+        if not self.active:
+            return {item.key for item in items}
+        selected = set()
+        for item in sorted(items, key=rank):
+            if item.size is None:
+                self.unsized[item.key] = item
+                selected.add(item.key)
+            elif self.used + self.cost(item) <= self.limit:
+                self.used += self.cost(item)
+                selected.add(item.key)
+            else:
+                self.dropped.append(item)
+        return selected
+
+    def admit(self, key, size):
+        """
+        Admit a file whose size was unknown when planning, now that it is ``size`` bytes.
+        Files planned with a known size are already admitted.
+
+        Returns:
+            bool: True if it fits; otherwise it is recorded as dropped
+        """
+        item = self.unsized.pop(key, None)
+        if item is None:
+            return True
+        if self.used + self.cost(item, size) <= self.limit:
+            self.used += self.cost(item, size)
+            return True
+        self.dropped.append(item._replace(size=size))
+        return False
+
+    def footer(self, display=None):
+        """
+        Describe the files left out, or return '' when nothing was dropped.
+
+        The summary fits the bytes reserved for it; dropped paths are listed
+        only while they fit what the rendered files left of the budget, and
+        the rest are counted. Output that is always emitted and went past the
+        limit anyway is reported too.
+
+        Args:
+            display (callable, optional): maps a dropped path to the form shown in the output
+        """
+        if not self.active or (not self.dropped and self.used <= self.limit):
+            return ''
+        if self.used > self.limit:
+            return (f"Output exceeds {self.describe()} by about {self.used - self.limit} bytes: "
+                    f"the introduction and titles alone do not fit, {len(self.dropped)} file(s) omitted\n\n")
+        display = display or (lambda path: path)
+        dropped_bytes = sum(item.size or 0 for item in self.dropped)
+        lines = [f"Omitted {len(self.dropped)} file(s), {dropped_bytes} bytes, to stay within {self.describe()}:\n"]
+        room = max(self.limit - self.used, 0) + FOOTER_BYTES - len(lines[0]) - 1
+        listed = 0
+        for item in sorted(self.dropped, key=lambda item: item.path)[:MAX_LISTED]:
+            line = f"{display(item.path)} ({item.size} bytes)\n"
+            rest = len(self.dropped) - listed - 1
+            if len(line.encode('utf-8', 'surrogateescape')) + (len(f"... and {rest} more\n") if rest else 0) > room:
+                break
+            lines.append(line)
+            room -= len(line.encode('utf-8', 'surrogateescape'))
+            listed += 1
+        if listed < len(self.dropped):
+            lines.append(f"... and {len(self.dropped) - listed} more\n")
+        return ''.join(lines) + '\n'
+
+
+def plan_tree_entries(budget, entries, read_size=None):
+    """
+    Apply ``budget`` to a remote tree listing, before any blob is fetched.
+
+    Args:
+        read_size (callable, optional): maps a blob's size to the bytes it
+            renders as, for files that are shown as an excerpt
+
+    Returns:
+        list: the entries to render; directories are always kept, and
+            submodules and files skipped by name whenever their note fits
+    """
+    if not budget.active:
+        return entries
+    items = []
+    kept = set()
+    for entry in entries:
+        if entry.type == 'commit' or (entry.type == 'blob' and is_binary_name(entry.path)):
+            if budget.keep(BudgetItem(entry.path, entry.path, entry.size or 0, f"/{entry.path}")):
+                kept.add(entry.path)
+        elif entry.type == 'blob':
+            size = entry.size if read_size is None or entry.size is None else read_size(entry.size)
+            items.append(BudgetItem(entry.path, entry.path, size, f"/{entry.path}"))
+    kept |= budget.plan(items)
+    return [entry for entry in entries if entry.type == 'tree' or entry.path in kept]
@@ -0,0 +1,70 @@
+import threading
+
+from .fetcher import make_session
+
+# Clients and HTTP sessions by (kind, host, token), shared by every processor in the process
+_clients = {}
+_lock = threading.Lock()
+_env_loaded = False
+
+
+def load_env():
+    """Load a .env file into the environment, once per process."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    with _lock:
+        if not _env_loaded:
+            load_dotenv()
+            _env_loaded = True
+
+
+def _shared(key, create):
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = create()
+        return client
+
+
+def github_client(api_url, token):
+    """
+    Return the process-wide PyGithub client for ``api_url`` and ``token``.
+
+    PyGithub is imported on first use, so processes that never talk to
+    GitHub do not pay for loading it.
+    """
+    def create():
+        from github import Github
+        return Github(token, base_url=api_url)
+    return _shared(('github', api_url, token), create)
+
+
+def gitlab_client(url, token):
+    """
+    Return the process-wide python-gitlab client for ``url`` and ``token``,
+    importing python-gitlab on first use.
+    """
+    def create():
+        import gitlab
+        return gitlab.Gitlab(url, private_token=token)
+    return _shared(('gitlab', url, token), create)
+
+
+def http_session(kind, url, token, headers, pool_size=8):
+    """
+    Return the process-wide requests session for one host and token, so
+    connections stay warm from one call to the next.
+    """
+    return _shared(('session', kind, url, token), lambda: make_session(headers, pool_size=pool_size))
+
+
+def clear_clients():
+    """Drop every shared client and close the pooled sessions."""
+    with _lock:
+        clients = list(_clients.items())
+        _clients.clear()
+    for key, client in clients:
+        if key[0] == 'session':
+            client.close()
@@ -0,0 +1,94 @@
+import hashlib
+from .render import FileRecord, format_record
+from .stats import NULL_STATS
+
+# Note of a file rendered as a reference to an identical file shown earlier
+DUPLICATE_NOTE = "Identical to {path}"
+_DUPLICATE_PREFIX = DUPLICATE_NOTE.split('{')[0]
+
+# Most bytes of the footer, charged to an output budget up front
+FOOTER_BYTES = 100
+
+
+def find_copies(entries, key_for):
+    """
+    Find the entries whose content key repeats the key of an earlier entry.
+
+    Args:
+        key_for (callable): content key of an entry, such as its blob SHA or
+            inode, or None when it has none
+
+    Returns:
+        dict: path of every later copy -> path of the first entry with its key
+    """
+    first = {}
+    copies = {}
+    for entry in entries:
+        key = key_for(entry)
+        if key is None:
+            continue
+        if key in first:
+            copies[entry.path] = first[key]
+        else:
+            first[key] = entry.path
+    return copies
+
+
+def duplicate_of(note):
+    """The path a duplicate note refers to, or None for any other note."""
+    if note and note.startswith(_DUPLICATE_PREFIX):
+        return note[len(_DUPLICATE_PREFIX):]
+    return None
+
+
+class Deduplicator:
+    """
+    Render each distinct file body once and later copies as a reference to the first.
+
+    A body is identified by the blob SHA listed for its path in ``keys`` when
+    the source has one, otherwise by a hash of the decoded text. Skip notes
+    are never deduplicated.
+    """
+
+    def __init__(self, keys=None, stats=NULL_STATS):
+        self.keys = keys or {}
+        self.stats = stats
+        self.first = {}
+        self.files = 0
+        self.saved = 0
+
+    def _key(self, record):
+        key = self.keys.get(record.path)
+        if key is None:
+            key = hashlib.sha1(record.text.encode('utf-8', 'surrogateescape')).hexdigest()
+        # The same blob renders alike only under the same label (whole, excerpt, Latin-1)
+        return key, record.label
+
+    def apply(self, record):
+        """
+        Returns:
+            FileRecord: a reference to the first file with the same body, or
+                ``record`` when there is none or the reference is not shorter
+        """
+        if record.text is None:
+            return record
+        key = self._key(record)
+        first = self.first.get(key)
+        if first is None:
+            self.first[key] = record.path
+            return record
+        reference = FileRecord(record.path, note=DUPLICATE_NOTE.format(path=first))
+        saved = len(format_record(record)) - len(format_record(reference))
+        if saved <= 0:
+            return record
+        self.files += 1
+        self.saved += saved
+        self.stats.add('bytes_deduplicated', saved)
+        return reference
+
+    def footer(self):
+        """Describe the savings, or return '' when no file was deduplicated."""
+        if not self.files:
+            return ''
+        return (f"Deduplicated {self.files} file(s) identical to a file rendered earlier, "
+                f"saving {self.saved} bytes\n\n")
@@ -0,0 +1,108 @@
+from .gitobjects import run_git
+
+# Deletions and renames listed by name before the rest are summarised
+MAX_LISTED = 200
+
+
+class TreeDiff:
+    """
+    Files that differ between a base and a head revision.
+
+    ``added`` and ``modified`` are rendered; deletions and renames whose
+    content did not change are only listed. Renames are exact: a deleted
+    and an added file with the same blob.
+    """
+
+    def __init__(self, added=(), modified=(), deleted=(), renamed=()):
+        self.added = sorted(added)
+        self.modified = sorted(modified)
+        self.deleted = sorted(deleted)
+        self.renamed = sorted(renamed)
+
+    @property
+    def changed(self):
+        """Paths whose head content is rendered."""
+        return set(self.added) | set(self.modified)
+
+    def summary(self, base, head, display=None):
+        """
+        Describe the change set, with deletions and renames listed by path.
+
+        Args:
+            display (callable, optional): maps a path to the form shown in the output
+        """
+        display = display or (lambda path: path)
+        lines = [f"Changes from {base} to {head}: {len(self.added)} added, {len(self.modified)} modified, "
+                 f"{len(self.renamed)} renamed, {len(self.deleted)} deleted\n"]
+        listed = [f"Deleted: {display(path)}\n" for path in self.deleted]
+        listed += [f"Renamed: {display(old)} -> {display(new)}\n" for old, new in self.renamed]
+        lines.extend(listed[:MAX_LISTED])
+        if len(listed) > MAX_LISTED:
+            lines.append(f"... and {len(listed) - MAX_LISTED} more\n")
+        return ''.join(lines) + '\n'
+
+
+def _pair_renames(added, deleted, sha_of_added, sha_of_deleted):
+    by_sha = {}
+    for path in sorted(deleted):
+        by_sha.setdefault(sha_of_deleted[path], []).append(path)
+    renamed = []
+    for path in sorted(added):
+        candidates = by_sha.get(sha_of_added.get(path))
+        if candidates:
+            renamed.append((candidates.pop(0), path))
+    return renamed
+
+
+def diff_trees(base_entries, head_entries):
+    """
+    Compare two tree listings by path and blob SHA, without reading any blob.
+
+    Returns:
+        TreeDiff
+    """
+    base = {entry.path: entry.sha for entry in base_entries if entry.type != 'tree'}
+    head = {entry.path: entry.sha for entry in head_entries if entry.type != 'tree'}
+    added = {path for path in head if path not in base}
+    deleted = {path for path in base if path not in head}
+    modified = {path for path in head if path in base and head[path] != base[path]}
+    renamed = _pair_renames(added, deleted, head, base)
+    added -= {new for _, new in renamed}
+    deleted -= {old for old, _ in renamed}
+    return TreeDiff(added, modified, deleted, renamed)
+
+
+def diff_worktree(repo_path, base_commit, base_entries, files):
+    """
+    Compare the working tree with ``base_commit``.
+
+    Args:
+        base_entries (list): TreeEntry listing of the base, already filtered
+        files (list): relative paths of the scanned working-tree files
+
+    Returns:
+        TreeDiff
+    """
+    base = {entry.path: entry.sha for entry in base_entries if entry.type != 'tree'}
+    output = run_git(repo_path, 'diff', '--no-renames', '--name-status', '-z', base_commit, '--')
+    fields = output.split(b'\0')
+    reported = {}
+    for status, path in zip(fields[0::2], fields[1::2]):
+        if status:
+            reported[path.decode('utf-8', 'surrogateescape')] = status.decode()
+    present = set(files)
+    added = {path for path in present if path not in base}
+    modified = {path for path in present if path in base and path in reported}
+    deleted = {path for path in base if reported.get(path) == 'D'}
+    renamed = []
+    if added and deleted:
+        # Only new files are hashed, to find the ones that are moved base files
+        ordered = sorted(added)
+        hashes = run_git(repo_path, 'hash-object', '--stdin-paths',
+                         input=''.join(f"{path}\n" for path in ordered).encode('utf-8', 'surrogateescape'))
+        sha_of_added = dict(zip(ordered, hashes.decode().split()))
+        renamed = _pair_renames(added, deleted, sha_of_added, base)
+        added -= {new for _, new in renamed}
+        deleted -= {old for old, _ in renamed}
+    return TreeDiff(added, modified, deleted, renamed)
+
@@ -0,0 +1,260 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+import zlib
+from urllib.parse import quote
+from .dedup import duplicate_of
+from .render import format_record, parse_record, write_chunks
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.idx'
+
+# Output formats of save_repo_contents
+OUTPUT_FORMATS = ('text', 'indexed')
+
+
+def _default_key(path):
+    return path.lstrip('/')
+
+
+def normalize_path(path):
+    """Form of a file path used as index key: relative, '/'-separated, without a leading './'."""
+    path = path.replace(os.sep, '/')
+    while path.startswith('./'):
+        path = path[2:]
+    return path.lstrip('/')
+
+
+def write_indexed(chunks, output_filename, key_for=None, compress=False):
+    """
+    Write output chunks to ``output_filename`` and index every file record in
+    ``output_filename + '.idx'``, so single files can be read back by path (see DumpReader).
+
+    Without ``compress`` the contents file is byte for byte the text dump
+    ``write_chunks`` writes. With it, each file record, and the text between
+    records, is stored zlib-compressed wherever that makes it smaller.
+    Both files are written under temporary names and moved into place once
+    complete.
+
+    Args:
+        key_for (callable, optional): maps the path shown in a record to its
+            path relative to the repository root; by default a leading '/'
+            is stripped
+
+    Returns:
+        str: the path of the contents file
+    """
+    key_for = key_for or _default_key
+    index_filename = output_filename + INDEX_SUFFIX
+    partial_filename = output_filename + '.part'
+    partial_index = index_filename + '.part'
+    if os.path.exists(partial_index):
+        os.remove(partial_index)
+    db = sqlite3.connect(partial_index)
+    try:
+        db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        db.execute(
+            "CREATE TABLE segments ("
+            "seq INTEGER PRIMARY KEY, offset INTEGER, length INTEGER, size INTEGER, compressed INTEGER, "
+            "path TEXT UNIQUE, display TEXT, hash TEXT, label TEXT, note TEXT, same_as TEXT)"
+        )
+        rows = []
+        with open(partial_filename, 'wb') as f:
+            def store(text, path=None, record=None):
+                data = text.encode('utf-8', 'surrogateescape')
+                stored, compressed = data, 0
+                if compress:
+                    packed = zlib.compress(data)
+                    if len(packed) < len(data):
+                        stored, compressed = packed, 1
+                offset = f.tell()
+                f.write(stored)
+                if record is None:
+                    rows.append((offset, len(stored), len(data), compressed, None, None, None, None, None, None))
+                    return
+                digest = None
+                if record.text is not None:
+                    digest = hashlib.sha1(record.text.encode('utf-8', 'surrogateescape')).hexdigest()
+                first = duplicate_of(record.note)
+                rows.append((offset, len(stored), len(data), compressed, path, record.path, digest,
+                             None if record.text is None else record.label,
+                             None if record.text is not None or first is not None else record.note,
+                             None if first is None else key_for(first)))
+
+            pending = []
+            for chunk in chunks:
+                if chunk.startswith('File: '):
+                    if pending:
+                        store(''.join(pending))
+                        pending = []
+                    record = parse_record(chunk)
+                    store(chunk, key_for(record.path), record)
+                else:
+                    pending.append(chunk)
+            if pending:
+                store(''.join(pending))
+            size = f.tell()
+        db.executemany(
+            "INSERT INTO segments (offset, length, size, compressed, path, display, hash, label, note, same_as) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        db.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+            ('version', str(INDEX_VERSION)),
+            ('contents', os.path.basename(output_filename)),
+            ('size', str(size)),
+            ('files', str(sum(1 for row in rows if row[4] is not None))),
+        ])
+        db.commit()
+        db.close()
+        os.replace(partial_filename, output_filename)
+        os.replace(partial_index, index_filename)
+    except BaseException:
+        db.close()
+        for name in (partial_filename, partial_index):
+            if os.path.exists(name):
+                os.remove(name)
+        raise
+    return output_filename
+
+
+def save_chunks(chunks, repo_name, output_format='text', compress=False, key_for=None):
+    """
+    Save a rendering as ``<repo_name>_contents.txt`` in ``output_format``.
+
+    A compressed indexed dump is not plain text and is named ``<repo_name>_contents.dump``.
+
+    Returns:
+        str: the path of the contents file
+
+    Raises:
+        ValueError: for an unknown output format
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}', expected 'text' or 'indexed'")
+    if output_format == 'text':
+        return write_chunks(chunks, f'{repo_name}_contents.txt')
+    output_filename = f'{repo_name}_contents.dump' if compress else f'{repo_name}_contents.txt'
+    return write_indexed(chunks, output_filename, key_for, compress)
+
+
+class DumpReader:
+    """
+    Random access to the files of a dump written by ``write_indexed``.
+
+    The contents file is memory-mapped and the index is looked up by path,
+    so reading one file, or the files under one directory, never scans the
+    rest of the dump.
+
+    Raises:
+        ValueError: if the index is missing, of another version, or does not
+            match the contents file
+    """
+
+    def __init__(self, path):
+        index_path = path if path.endswith(INDEX_SUFFIX) else path + INDEX_SUFFIX
+        if not os.path.isfile(index_path):
+            raise ValueError(f"No index found for dump '{path}'")
+        self.db = sqlite3.connect(f"file:{quote(os.path.abspath(index_path))}?mode=ro", uri=True,
+                                  check_same_thread=False)
+        self.data = None
+        try:
+            meta = dict(self.db.execute("SELECT key, value FROM meta"))
+            if meta.get('version') != str(INDEX_VERSION):
+                raise ValueError(f"Unsupported index version {meta.get('version')} in '{index_path}'")
+            self.meta = meta
+            self.path = os.path.join(os.path.dirname(index_path), meta['contents'])
+            with open(self.path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size != int(meta['size']):
+                    raise ValueError(f"Dump '{self.path}' changed since it was indexed")
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        except (sqlite3.Error, OSError) as e:
+            self.close()
+            raise ValueError(f"Unreadable dump '{path}': {e}") from e
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def files(self):
+        return int(self.meta['files'])
+
+    def _segment(self, offset, length, compressed):
+        data = self.data[offset:offset + length]
+        if compressed:
+            data = zlib.decompress(data)
+        return data.decode('utf-8', 'surrogateescape')
+
+    def _row(self, path):
+        return self.db.execute("SELECT offset, length, compressed, display, same_as FROM segments WHERE path = ?",
+                               (path,)).fetchone()
+
+    def _render(self, row):
+        offset, length, compressed, display, same_as = row
+        if same_as is not None:
+            first = self._row(same_as)
+            if first is not None:
+                # A deduplicated copy is served with the content of the file it repeats
+                return format_record(parse_record(self._render(first))._replace(path=display))
+        return self._segment(offset, length, compressed)
+
+    def get(self, path):
+        """
+        Return the ``File: ...`` record of one file, or None if the dump has no such file.
+
+        Args:
+            path (str): path relative to the repository root
+        """
+        row = self._row(normalize_path(path))
+        return None if row is None else self._render(row)
+
+    def info(self, path):
+        """
+        Return the index entry of one file as a dict, or None if the dump has no such file.
+        """
+        row = self.db.execute(
+            "SELECT path, display, offset, length, size, compressed, hash, label, note, same_as "
+            "FROM segments WHERE path = ?", (normalize_path(path),)).fetchone()
+        if row is None:
+            return None
+        keys = ('path', 'display', 'offset', 'length', 'size', 'compressed', 'hash', 'label', 'note', 'same_as')
+        return dict(zip(keys, row), compressed=bool(row[5]))
+
+    def _under(self, prefix):
+        prefix = normalize_path(prefix)
+        if not prefix:
+            return "SELECT {} FROM segments WHERE path IS NOT NULL ORDER BY seq", ()
+        prefix = prefix.rstrip('/') + '/'
+        # Every path starting with prefix sorts between it and its successor
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return "SELECT {} FROM segments WHERE path >= ? AND path < ? ORDER BY seq", (prefix, upper)
+
+    def paths(self, prefix=''):
+        """List the paths of the files under the directory ``prefix``, all of them when empty, in dump order."""
+        query, args = self._under(prefix)
+        return [path for path, in self.db.execute(query.format('path'), args)]
+
+    def iter_prefix(self, prefix=''):
+        """Yield the records of the files under the directory ``prefix``, in dump order."""
+        query, args = self._under(prefix)
+        rows = self.db.execute(query.format('offset, length, compressed, display, same_as'), args).fetchall()
+        for row in rows:
+            yield self._render(row)
+
+    def read_all(self):
+        """Return the whole dump as text, as ``process_repo`` would."""
+        rows = self.db.execute("SELECT offset, length, compressed FROM segments ORDER BY seq")
+        return ''.join(self._segment(*row) for row in rows)
+
+    def close(self):
+        data, self.data = self.data, None
+        if isinstance(data, mmap.mmap):
+            data.close()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
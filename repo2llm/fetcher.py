@@ -0,0 +1,391 @@
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .stats import NULL_STATS
+
+# Status codes worth retrying: the request may succeed unchanged a moment later.
+TRANSIENT_STATUS = {500, 502, 503, 504}
+
+
+# Bodies of recent revalidated responses by URL, shared by every fetcher in the process
+_etag_store = OrderedDict()
+_etag_lock = threading.Lock()
+_ETAG_STORE_SIZE = 1024
+
+
+class FetchError(Exception):
+    """Raised when a download fails permanently or runs out of retries."""
+
+    def __init__(self, url, message, status=None):
+        super().__init__(f"{message} ({url})")
+        self.url = url
+        self.status = status
+
+
+class TooLargeError(FetchError):
+    """
+    Raised instead of reading a body that exceeds the caller's size limit.
+
+    ``size`` is the body's size when the server reported it, otherwise the
+    number of bytes read before the limit was crossed.
+    """
+
+    def __init__(self, url, size):
+        super().__init__(url, f"Body of {size} bytes exceeds the size limit")
+        self.size = size
+
+
+def make_session(headers=None, pool_size=8):
+    """
+    Build a requests session whose connection pool can keep ``pool_size``
+    connections per host alive between requests.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+class RateLimiter:
+    """
+    Shared view of one host's rate-limit budget, fed from response headers.
+
+    Understands GitHub's ``X-RateLimit-*`` and GitLab's ``RateLimit-*``
+    headers as well as ``Retry-After``. When the remaining budget drops to
+    ``low_watermark`` every worker waits for the reset instead of burning
+    the last requests on 403/429 responses.
+    """
+
+    def __init__(self, low_watermark=10, max_wait=300.0):
+        self.low_watermark = low_watermark
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.remaining = None
+        self.reset_at = 0.0
+        self.paused_until = 0.0
+
+    def delay(self):
+        """Seconds a caller should wait before sending the next request."""
+        now = time.time()
+        with self.lock:
+            delay = self.paused_until - now
+            if self.remaining is not None and self.remaining <= self.low_watermark:
+                delay = max(delay, self.reset_at - now)
+        return min(max(delay, 0.0), self.max_wait)
+
+    def wait(self, cancel=None):
+        """
+        Sleep until the next request may be sent; with ``cancel`` (a CancelToken)
+        the sleep ends as soon as the job is cancelled.
+
+        Raises:
+            Cancelled: if ``cancel`` is cancelled before or while waiting
+        """
+        delay = self.delay()
+        if cancel is None:
+            if delay > 0:
+                time.sleep(delay)
+            return
+        if delay > 0:
+            cancel.wait(delay)
+        cancel.check()
+
+    def update(self, response):
+        headers = response.headers
+        remaining = headers.get('X-RateLimit-Remaining', headers.get('RateLimit-Remaining'))
+        reset = headers.get('X-RateLimit-Reset', headers.get('RateLimit-Reset'))
+        with self.lock:
+            if remaining is not None:
+                try:
+                    self.remaining = int(remaining)
+                except ValueError:
+                    pass
+            if reset is not None:
+                try:
+                    self.reset_at = float(reset)
+                except ValueError:
+                    pass
+
+    def pause(self, seconds):
+        """Hold back every worker sharing this limiter for ``seconds``."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.time() + seconds)
+
+    def retry_after(self, response):
+        """How long to back off after a rate-limited response, or None if it was not one."""
+        headers = response.headers
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                return None
+        remaining = headers.get('X-RateLimit-Remaining', headers.get('RateLimit-Remaining'))
+        if response.status_code == 429 or remaining == '0':
+            reset = headers.get('X-RateLimit-Reset', headers.get('RateLimit-Reset'))
+            if reset is not None:
+                try:
+                    return max(float(reset) - time.time(), 1.0)
+                except ValueError:
+                    pass
+            return 60.0
+        # A plain 403 is a permission problem, not a rate limit
+        return None
+
+
+class BlobFetcher:
+    """
+    Download many URLs over a pooled session with bounded concurrency.
+
+    Transient failures are retried with exponential backoff and full jitter,
+    rate-limit responses pause all workers until the budget resets, and
+    ``fetch_all`` yields results in the order the items were given. With a
+    ``cache``, downloads that carry a content key are served from it when
+    possible and stored in it otherwise. With a ``host`` budget (see
+    HostBudget), every request takes one of the host's shared slots and the
+    host's shared rate limiter replaces ``limiter``. With a ``cancel``
+    token, rate-limit waits and retry backoffs end once it is cancelled.
+    Requests, retries, cache hits and bytes are counted on ``stats``.
+    """
+
+    def __init__(self, session, max_workers=8, max_retries=5, backoff_base=0.5, backoff_cap=30.0,
+                 limiter=None, timeout=60, cache=None, host=None, cancel=None):
+        self.session = session
+        self.cache = cache
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.host = host
+        self.limiter = host.limiter if host is not None else limiter or RateLimiter()
+        self.timeout = timeout
+        self.cancel = cancel
+        self.stats = NULL_STATS
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def _sleep(self, seconds):
+        if self.cancel is None:
+            time.sleep(seconds)
+            return
+        self.cancel.wait(seconds)
+        self.cancel.check()
+
+    def _request(self, url, headers=None, stream=False, ok_status=(200, 206)):
+        """
+        Send a GET request, retrying transient failures and rate-limit responses.
+
+        Raises:
+            FetchError: on a non-retryable status or when retries are exhausted
+        """
+        attempt = 0
+        while True:
+            self.limiter.wait(self.cancel)
+            self.stats.add('api_calls')
+            try:
+                with self.host or nullcontext():
+                    response = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise FetchError(url, f"Connection failed: {e}")
+                self.stats.add('retries')
+                self._sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            self.limiter.update(response)
+            if response.status_code in ok_status:
+                return response
+            response.close()
+
+            wait = self.limiter.retry_after(response)
+            if wait is not None:
+                if attempt >= self.max_retries:
+                    raise FetchError(url, "Rate limit exceeded", response.status_code)
+                self.stats.add('rate_limited')
+                self.limiter.pause(wait + random.uniform(0, 1))
+                attempt += 1
+                continue
+            if response.status_code in TRANSIENT_STATUS and attempt < self.max_retries:
+                self.stats.add('retries')
+                self._sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            raise FetchError(url, f"HTTP {response.status_code}", response.status_code)
+
+    def fetch(self, url, headers=None, key=None, reject=None, reject_bytes=8192, max_size=None):
+        """
+        Download one URL and return its body as bytes.
+
+        Args:
+            key (str, optional): content key, such as a blob SHA, under which
+                the body is looked up in and stored to the cache
+            reject (callable, optional): called with the first ``reject_bytes``
+                of the body; when it returns True the download is abandoned
+                and None is returned
+            max_size (int, optional): largest body worth reading; checked
+                against Content-Length before the body is read, and no more
+                than one byte past it is read otherwise
+
+        Raises:
+            FetchError: on a non-retryable status or when retries are exhausted
+            TooLargeError: when the body is known to exceed ``max_size``
+        """
+        limit = max_size
+        if key is not None and self.cache is not None:
+            data = self.cache.get(key)
+            if data is not None:
+                self.stats.add('cache_hits')
+                if limit is not None and len(data) > limit:
+                    raise TooLargeError(url, len(data))
+                return None if reject is not None and reject(data[:reject_bytes]) else data
+        if reject is None and limit is None:
+            data = self._request(url, headers=headers).content
+        else:
+            response = self.stream(url, headers=headers)
+            try:
+                length = response.headers.get('Content-Length', '')
+                if limit is not None and length.isdigit() and int(length) > limit:
+                    raise TooLargeError(url, int(length))
+                data = response.raw.read(reject_bytes)
+                if reject is not None and reject(data):
+                    return None
+                if limit is None:
+                    data += response.raw.read()
+                else:
+                    data += response.raw.read(max(limit + 1 - len(data), 0))
+                    if len(data) > limit:
+                        raise TooLargeError(url, len(data))
+            finally:
+                # Drops the connection only if the body was abandoned half-read
+                response.close()
+        self.stats.add('bytes_fetched', len(data))
+        if key is not None and self.cache is not None:
+            self.cache.put(key, data)
+        return data
+
+    def fetch_excerpt(self, url, head_bytes, tail_bytes, headers=None):
+        """
+        Download only the first ``head_bytes`` and last ``tail_bytes`` of a body.
+
+        Both parts are requested with Range headers. When the server ignores
+        Range, only the head is read off the full response and the tail is
+        left empty, so at most ``head_bytes + tail_bytes`` are ever read.
+
+        Returns:
+            tuple: (head, tail, size) where ``size`` is the full body size, or
+                None when the server did not report it
+
+        Raises:
+            FetchError: on a non-retryable status or when retries are exhausted
+        """
+        # Ranges count encoded bytes, so ask for the body unencoded
+        headers = dict(headers or {}, **{'Accept-Encoding': 'identity'})
+        response = self.stream(url, headers=dict(headers, Range=f"bytes=0-{head_bytes - 1}"))
+        try:
+            ranged = response.status_code == 206
+            if ranged:
+                _, _, total = response.headers.get('Content-Range', '').rpartition('/')
+            else:
+                total = response.headers.get('Content-Length', '')
+            size = int(total) if total.isdigit() else None
+            head = response.raw.read(head_bytes)
+        finally:
+            response.close()
+        tail = b''
+        if ranged and tail_bytes > 0 and (size is None or size > len(head)):
+            tail_bytes = tail_bytes if size is None else min(tail_bytes, size - len(head))
+            response = self.stream(url, headers=dict(headers, Range=f"bytes=-{tail_bytes}"))
+            try:
+                if response.status_code == 206:
+                    tail = response.raw.read(tail_bytes)
+            finally:
+                response.close()
+        self.stats.add('bytes_fetched', len(head) + len(tail))
+        return head, tail, size
+
+    def fetch_revalidated(self, url, headers=None):
+        """
+        Download one URL, revalidating the previous response with ``If-None-Match``.
+
+        An unchanged resource costs a 304 without a body, which GitHub does
+        not count against the rate limit; the stored body is returned.
+        """
+        headers = dict(headers or {})
+        store_key = (url, headers.get('Accept'))
+        with _etag_lock:
+            cached = _etag_store.get(store_key)
+        if cached is not None:
+            headers['If-None-Match'] = cached[0]
+        response = self._request(url, headers=headers, ok_status=(200, 206, 304))
+        if response.status_code == 304 and cached is not None:
+            return cached[1]
+        body = response.content
+        etag = response.headers.get('ETag')
+        if etag:
+            with _etag_lock:
+                _etag_store[store_key] = (etag, body)
+                _etag_store.move_to_end(store_key)
+                while len(_etag_store) > _ETAG_STORE_SIZE:
+                    _etag_store.popitem(last=False)
+        return body
+
+    def stream(self, url, headers=None):
+        """
+        Open one URL for streaming; the caller reads ``response.raw`` and must close the response.
+
+        Raises:
+            FetchError: on a non-retryable status or when retries are exhausted
+        """
+        response = self._request(url, headers=headers, stream=True)
+        # Undo any Content-Encoding so readers see the payload itself
+        response.raw.decode_content = True
+        return response
+
+    def _fetch_item(self, url, key, reject, max_size):
+        if url is None:
+            return None, None
+        try:
+            return self.fetch(url, key=key, reject=reject, max_size=max_size), None
+        except FetchError as e:
+            return None, e
+
+    def fetch_all(self, items, url_for, key_for=None, reject=None, max_size_for=None):
+        """
+        Fetch ``url_for(item)`` for every item, yielding ``(item, data, error)`` in input order.
+
+        Items whose ``url_for`` returns None are passed through without a
+        request, as are items whose body ``reject`` turns down; bodies over
+        ``max_size_for(item)`` yield a TooLargeError (see fetch).
+        ``key_for(item)`` supplies the cache key of each item. At most two
+        requests per worker are queued ahead of the item being yielded, so
+        memory stays bounded for long plans.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            pending = deque()
+            for item in items:
+                key = key_for(item) if key_for else None
+                max_size = max_size_for(item) if max_size_for else None
+                pending.append((item, executor.submit(self._fetch_item, url_for(item), key, reject, max_size)))
+                if len(pending) >= self.max_workers * 2:
+                    item, future = pending.popleft()
+                    yield (item, *future.result())
+            while pending:
+                item, future = pending.popleft()
+                yield (item, *future.result())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
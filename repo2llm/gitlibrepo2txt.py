@@ -1,172 +1,586 @@
+import itertools
+import json
 import os
-import gitlab
-from tqdm import tqdm
-from dotenv import load_dotenv, find_dotenv
+import tarfile
+from collections import Counter
+from urllib.parse import quote
+from .blobcache import get_default_blob_cache
+from .clients import gitlab_client, http_session, load_env
+from .ignore import PathFilter
+from .limits import DEFAULT_MAX_FILE_BYTES, ReadLimits
+from .mirrors import Mirror, auth_env, get_default_mirror_store
+from .budget import Budget, plan_tree_entries
+from .dedup import FOOTER_BYTES as DEDUP_FOOTER_BYTES, Deduplicator, find_copies
+from .delta import diff_trees
+from .dump import save_chunks
+from .fetcher import BlobFetcher, FetchError, TooLargeError
+from .binaryfilter import SNIFF_BYTES, is_binary_content, is_binary_name
+from .progress import Progress
+from .render import FileRecord, format_record
+from .scheduler import get_default_scheduler
+from .stats import start_run, tracked
+from .treewalk import TreeEntry, walk_order
 
 class GitlabRepo2Txt:
-    def __init__(self):
+    def __init__(self, fetch_workers=8, archive_threshold=1000, blob_cache=None, progress=None,
+                 mirror_store=None, dedup=True, scheduler=None, cancel=None):
+        """
+        Args:
+            fetch_workers (int): number of blobs downloaded concurrently
+            archive_threshold (int): in 'auto' mode, repositories with more files
+                than this are fetched as one tarball instead of blob by blob
+            blob_cache (BlobCache, optional): cache of blob contents by SHA;
+                defaults to the process-wide cache shared by all processors
+            progress (callable, optional): called as ``progress(phase, done, total, nbytes)``
+                while a repository is rendered; see Progress
+            mirror_store (MirrorStore, optional): mirrors used by the 'mirror' mode;
+                defaults to the process-wide store
+            dedup (bool): render files identical to one shown earlier as a
+                reference to it; see Deduplicator
+            scheduler (FetchScheduler, optional): per-host request budgets shared
+                with every processor and batch job; defaults to the process-wide scheduler
+            cancel (CancelToken, optional): checked inside the tree listing, the
+                archive stream and other phases that run before the first chunk,
+                which raise once it is cancelled
+        """
         # _=load_dotenv(find_dotenv())
-        load_dotenv()
+        load_env()
         self.GITLAB_TOKEN = os.getenv('GITLAB_TOKEN')
         if not self.GITLAB_TOKEN:
             raise ValueError("Please set 'GITLAB_TOKEN' environment variable or in the script.")
-        self.gitlab = gitlab.Gitlab('https://gitlab.com', private_token=self.GITLAB_TOKEN)
-        
-    def _get_readme_content(self, repo, branch='master'):
+        self.gitlab_url = os.getenv('GITLAB_URL', 'https://gitlab.com').rstrip('/')
+        # Clients and connection pools are shared by every processor for the same host and token
+        self.gitlab = gitlab_client(self.gitlab_url, self.GITLAB_TOKEN)
+        session = http_session('gitlab', self.gitlab_url, self.GITLAB_TOKEN,
+                               {'PRIVATE-TOKEN': self.GITLAB_TOKEN}, pool_size=fetch_workers)
+        if blob_cache is None:
+            blob_cache = get_default_blob_cache()
+        if scheduler is None:
+            scheduler = get_default_scheduler()
+        self.fetcher = BlobFetcher(session, max_workers=fetch_workers, cache=blob_cache,
+                                   host=scheduler.host(self.gitlab_url), cancel=cancel)
+        self.archive_threshold = archive_threshold
+        self.progress = progress
+        self.mirror_store = mirror_store
+        self.dedup = dedup
+        self.cancel = cancel
+
+    def _check_cancelled(self):
+        """Stop a slow phase, such as a tree listing, once the job is cancelled."""
+        if self.cancel is not None:
+            self.cancel.check()
+
+    def _get_readme_content(self, repo, entries, limits=None):
         """
-        Retrieve the content of the README file.
+        Retrieve the content of the README file from the already listed tree.
+
+        The README is read like any other file: charged against the
+        repository cap of ``limits`` and, over the size cap, rendered from a
+        head/tail excerpt instead of downloaded whole.
         """
+        limits = limits or ReadLimits(None)
         readme_variants = ['README.md', 'readme.md', 'ReadMe.md']
-        
+        blobs = {entry.path: entry for entry in entries if entry.type == 'blob'}
+
         for readme_name in readme_variants:
+            if readme_name not in blobs:
+                continue
             try:
-                readme = repo.files.get(file_path=readme_name, ref=branch)
-                return readme.decode().decode('utf-8')
+                return self._read_readme(repo, blobs[readme_name], limits)
             except:
                 continue
         
         return "README not found."
 
-    def _traverse_repo_iteratively(self, repo):
+    def _resolve_commit(self, repo, branch='master'):
         """
-        Traverse the repository iteratively to avoid recursion limits for large repositories.
+        Resolve a branch, tag or SHA to its commit SHA.
         """
-        # Get default branch
-        default_branch = repo.default_branch
-        structure = ""
-        dirs_to_visit = [("", repo.repository_tree(ref=repo.default_branch, all=True))]
-        dirs_visited = set()
+        with self.fetcher.host:
+            return repo.commits.get(branch).id
 
-        while dirs_to_visit:
-            path, contents = dirs_to_visit.pop()
-            dirs_visited.add(path)
-            for content in tqdm(contents, desc=f"Processing {path}", leave=False):
-                if content['type'] == "tree":
-                    if content['path'] not in dirs_visited:
-                        structure += f"{path}/{content['name']}/\n"
-                        dirs_to_visit.append((f"{path}/{content['name']}", repo.repository_tree(path=content['path'], all=True)))
-                else:
-                    structure += f"{path}/{content['name']}\n"
-        return structure
-
-    def _get_file_contents_iteratively(self, repo, branch='master'):
-        # Get default branch
-        # default_branch = repo.default_branch
-        file_contents = ""
-        dirs_to_visit = [("", repo.repository_tree(ref=branch, all=True))]
-        dirs_visited = set()
-        binary_extensions = [
-            # Compiled executables and libraries
-            '.exe', '.dll', '.so', '.a', '.lib', '.dylib', '.o', '.obj',
-            # Compressed archives
-            '.zip', '.tar', '.tar.gz', '.tgz', '.rar', '.7z', '.bz2', '.gz', '.xz', '.z', '.lz', '.lzma', '.lzo', '.rz', '.sz', '.dz',
-            # Application-specific files
-            '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.odt', '.ods', '.odp',
-            # Media files (less common)
-            '.png', '.jpg', '.jpeg', '.gif', '.mp3', '.mp4', '.wav', '.flac', '.ogg', '.avi', '.mkv', '.mov', '.webm', '.wmv', '.m4a', '.aac',
-            # Virtual machine and container images
-            '.iso', '.vmdk', '.qcow2', '.vdi', '.vhd', '.vhdx', '.ova', '.ovf',
-            # Database files
-            '.db', '.sqlite', '.mdb', '.accdb', '.frm', '.ibd', '.dbf',
-            # Java-related files
-            '.jar', '.class', '.war', '.ear', '.jpi',
-            # Python bytecode and packages
-            '.pyc', '.pyo', '.pyd', '.egg', '.whl',
-            # Other potentially important extensions
-            '.deb', '.rpm', '.apk', '.msi', '.dmg', '.pkg', '.bin', '.dat', '.data',
-            '.dump', '.img', '.toast', '.vcd', '.crx', '.xpi', '.lockb', 'package-lock.json', '.svg' ,
-            '.eot', '.otf', '.ttf', '.woff', '.woff2',
-            '.ico', '.icns', '.cur',
-            '.cab', '.dmp', '.msp', '.msm',
-            '.keystore', '.jks', '.truststore', '.cer', '.crt', '.der', '.p7b', '.p7c', '.p12', '.pfx', '.pem', '.csr',
-            '.key', '.pub', '.sig', '.pgp', '.gpg',
-            '.nupkg', '.snupkg', '.appx', '.msix', '.msp', '.msu',
-            '.deb', '.rpm', '.snap', '.flatpak', '.appimage',
-            '.ko', '.sys', '.elf',
-            '.swf', '.fla', '.swc',
-            '.rlib', '.pdb', '.idb', '.pdb', '.dbg',
-            '.sdf', '.bak', '.tmp', '.temp', '.log', '.tlog', '.ilk',
-            '.bpl', '.dcu', '.dcp', '.dcpil', '.drc',
-            '.aps', '.res', '.rsrc', '.rc', '.resx',
-            '.prefs', '.properties', '.ini', '.cfg', '.config', '.conf',
-            '.DS_Store', '.localized', '.svn', '.git', '.gitignore', '.gitkeep',
-        ]
-
-        while dirs_to_visit:
-            path, contents = dirs_to_visit.pop()
-            dirs_visited.add(path)
-            for content in tqdm(contents, desc=f"Downloading {path}", leave=False):
-                if content['type'] == "tree":
-                    if content['path'] not in dirs_visited:
-                        dirs_to_visit.append((f"{path}/{content['name']}", repo.repository_tree(path=content['path'], all=True)))
+    def _project_path(self, repo_url):
+        return repo_url.replace(f'{self.gitlab_url}/', '').replace('https://gitlab.com/', '').strip('/')
+
+    def resolve_revision(self, repo_url, branch='master', mode='auto'):
+        """
+        Resolve a branch, tag or SHA to a commit SHA with one conditional request.
+
+        Returns:
+            str: commit SHA
+        """
+        self._check_cancelled()
+        if mode == 'mirror':
+            # Asks the git server, so the mirror mode makes no API request at all
+            return self._mirrors().resolve(self._clone_url(repo_url), branch, self._git_env(repo_url))
+        project = quote(self._project_path(repo_url), safe='')
+        url = f"{self.gitlab_url}/api/v4/projects/{project}/repository/commits/{quote(branch, safe='')}"
+        return json.loads(self.fetcher.fetch_revalidated(url))['id']
+
+    def _get_tree_entries(self, repo, commit_id, path_filter=None):
+        """
+        List the full tree at ``commit_id`` with one paginated recursive tree listing.
+
+        Returns:
+            list: TreeEntry objects in traversal order, without the paths
+                ``path_filter`` rejects
+        """
+        path_filter = path_filter or PathFilter(use_gitignore=False)
+        # Pages are requested as the listing is iterated, one per 100 entries
+        tree = repo.repository_tree(ref=commit_id, recursive=True, iterator=True, per_page=100)
+        entries = []
+        while True:
+            self._check_cancelled()
+            with self.fetcher.host:
+                page = list(itertools.islice(tree, 100))
+            self.fetcher.stats.add('api_calls')
+            entries.extend(TreeEntry(item['path'], item['type'], None, item['id']) for item in page)
+            if len(page) < 100:
+                break
+        return path_filter.filter_entries(walk_order(entries))
+
+    def _blob_url(self, repo, entry):
+        return f"{self.gitlab_url}/api/v4/projects/{repo.id}/repository/blobs/{entry.sha}/raw"
+
+    def _mirrors(self):
+        if self.mirror_store is None:
+            self.mirror_store = get_default_mirror_store()
+        return self.mirror_store
+
+    def _clone_url(self, repo_url):
+        return repo_url.rstrip('/')
+
+    def _git_env(self, repo_url):
+        return auth_env(self._clone_url(repo_url), 'oauth2', self.GITLAB_TOKEN)
+
+    def _open_mirror(self, repo_url, branch):
+        """
+        Bring the local mirror of the repository up to ``branch`` and open it, fetching only what is new.
+        """
+        self._check_cancelled()
+        mirror = self._mirrors().open(self._clone_url(repo_url), branch, self._git_env(repo_url))
+        self.fetcher.stats.add('mirror_opens')
+        return mirror
+
+    def _read_readme(self, repo, entry, limits):
+        """
+        Read the text of a README blob within ``limits``, from the API or the mirror.
+        """
+        if entry.size is not None and not limits.admit(entry.path, entry.size):
+            return limits.repo_note()
+        size = entry.size
+        if isinstance(repo, Mirror):
+            size, head, tail = repo.read_blob_excerpt(entry.sha, limits.max_file_bytes,
+                                                      limits.head_bytes, limits.tail_bytes)
+        elif limits.is_oversized(size):
+            head, tail, total = self.fetcher.fetch_excerpt(self._blob_url(repo, entry),
+                                                           limits.head_bytes, limits.tail_bytes)
+            size = total or size
+        else:
+            try:
+                head = self.fetcher.fetch(self._blob_url(repo, entry), key=entry.sha,
+                                          max_size=limits.max_file_bytes)
+                tail, size = None, len(head)
+            except TooLargeError as e:
+                head, tail, total = self.fetcher.fetch_excerpt(self._blob_url(repo, entry),
+                                                               limits.head_bytes, limits.tail_bytes)
+                size = total or e.size
+        if entry.size is None and not limits.admit(entry.path, size):
+            return limits.repo_note()
+        if tail is None:
+            return head.decode('utf-8')
+        text, _ = limits.excerpt(head, tail, size)
+        return text
+
+    def _traverse_repo_iteratively(self, entries):
+        """
+        Yield one structure line per entry of the listed tree.
+        """
+        for entry in entries:
+            if entry.type == 'tree':
+                yield f"/{entry.path}/\n"
+            else:
+                yield f"/{entry.path}\n"
+
+    def _get_file_contents_iteratively(self, repo, entries, budget=None, limits=None):
+        """
+        Yield a FileRecord per file of the listed tree, downloading blobs concurrently
+        while keeping the listing order. Files of unknown size that turn out not to
+        fit ``budget`` are left out, and files over the size cap of ``limits`` are
+        rendered from a ranged head/tail excerpt instead of downloaded whole.
+        A blob listed under several paths is downloaded once.
+        """
+        budget = budget or Budget()
+        limits = limits or ReadLimits(None)
+        files = [entry for entry in entries if entry.type != 'tree']
+        # Sizes listed in the tree are charged before anything is downloaded
+        for entry in files:
+            if entry.type == 'blob' and entry.size is not None and not is_binary_name(entry.path):
+                limits.admit(entry.path, entry.size)
+
+        def content_key(entry):
+            # Files of unknown size the budget may still drop are never replayed as copies
+            if entry.type == 'blob' and budget.size_limit(entry.path) is None:
+                return entry.sha
+            return None
+
+        copies = find_copies(files, content_key)
+        firsts = set(copies.values())
+        rendered = {}
+
+        def blob_url(entry):
+            # Check if the file name suggests it's a binary file
+            if entry.type == 'commit' or is_binary_name(entry.path):
+                return None
+            if entry.path in copies:
+                return None
+            if entry.path in limits.skipped or limits.is_oversized(entry.size):
+                return None
+            return self._blob_url(repo, entry)
+
+        def max_size(entry):
+            limit = budget.size_limit(entry.path)
+            if entry.size is None and limits.max_file_bytes is not None:
+                limit = limits.max_file_bytes if limit is None else min(limit, limits.max_file_bytes)
+            return limit
+
+        downloads = self.fetcher.fetch_all(files, blob_url, key_for=lambda entry: entry.sha,
+                                           reject=is_binary_content, max_size_for=max_size)
+        for entry, content, error in downloads:
+            file_path = f"/{entry.path}"
+            if entry.path in copies:
+                record = rendered[copies[entry.path]]._replace(path=file_path)
+            elif entry.type == 'commit':
+                record = FileRecord(file_path, note="Skipped submodule")
+            elif is_binary_name(entry.path):
+                record = FileRecord(file_path, note="Skipped binary file")
+            elif entry.path in limits.skipped:
+                record = FileRecord(file_path, note=limits.repo_note())
+            elif limits.is_oversized(entry.size):
+                record = self._get_blob_excerpt(repo, entry, limits, entry.size)
+            elif isinstance(error, TooLargeError):
+                if not budget.admit(entry.path, limits.rendered_size(error.size)):
+                    continue
+                if not limits.admit(entry.path, error.size):
+                    record = FileRecord(file_path, note=limits.repo_note())
+                elif limits.is_oversized(error.size):
+                    record = self._get_blob_excerpt(repo, entry, limits, error.size)
                 else:
-                    # Check if the file extension suggests it's a binary file
-                    if any(content['name'].endswith(ext) for ext in binary_extensions):
-                        file_contents += f"File: {path}/{content['name']}\nContent: Skipped binary file\n\n"
-                    else:
-                        file_contents += f"File: {path}/{content['name']}\n"
-                        try:
-                            file = repo.files.get(file_path=content['path'], ref=branch)
-                            decoded_content = file.decode().decode('utf-8')
-                            file_contents += f"Content:\n{decoded_content}\n\n"
-                        except UnicodeDecodeError:
-                            file_contents += "Content: Skipped due to unsupported encoding\n\n"
-        return file_contents
-
-    def process_repo(self, repo_url, branch='master'):
+                    continue
+            elif error is not None:
+                record = FileRecord(file_path, note=f"Skipped due to download error: {error}")
+            elif content is None:
+                record = FileRecord(file_path, note="Skipped binary file")
+            elif not budget.admit(entry.path, len(content)):
+                continue
+            elif entry.size is None and not limits.admit(entry.path, len(content)):
+                record = FileRecord(file_path, note=limits.repo_note())
+            else:
+                record = self._decode_file(file_path, content)
+            if entry.path in firsts:
+                rendered[entry.path] = record
+            yield record
+
+    def _get_blob_excerpt(self, repo, entry, limits, size):
         """
-        处理GitLab仓库并返回处理后的内容
-        
+        Render a blob over the size cap from its first and last bytes, fetched with Range requests.
+        """
+        file_path = f"/{entry.path}"
+        try:
+            head, tail, total = self.fetcher.fetch_excerpt(self._blob_url(repo, entry),
+                                                           limits.head_bytes, limits.tail_bytes)
+        except FetchError as e:
+            return FileRecord(file_path, note=f"Skipped due to download error: {e}")
+        if is_binary_content(head[:SNIFF_BYTES]):
+            return FileRecord(file_path, note="Skipped binary file")
+        try:
+            text, label = limits.excerpt(head, tail, total or size)
+        except UnicodeDecodeError:
+            return FileRecord(file_path, note="Skipped due to unsupported encoding")
+        return FileRecord(file_path, text, label=label)
+
+    def _decode_file(self, file_path, content):
+        with self.fetcher.stats.phase('decode'):
+            try:
+                return FileRecord(file_path, content.decode('utf-8'))
+            except UnicodeDecodeError:
+                return FileRecord(file_path, note="Skipped due to unsupported encoding")
+
+    def _get_archive_contents_iteratively(self, repo, commit_id, paths=None, budget=None, limits=None, shas=None,
+                                          submodules=()):
+        """
+        Yield a FileRecord per file by streaming the repository tarball at ``commit_id``.
+
+        Members are read one at a time straight off the HTTP response, so the
+        archive is never held in memory or spooled to disk. Files appear in
+        archive order rather than the traversal order of the API mode:
+        buffering them back into that order could hold most of the archive.
+        An archive holds only an empty directory for a submodule, so the
+        ``submodules`` of the listing follow the files as "Skipped submodule"
+        records, as in the API mode. With ``paths``, members outside that set
+        are skipped over unread, as are members of unknown size that do not
+        fit ``budget``; of members over the size cap of ``limits`` only the
+        head and tail are read, the rest is skipped over.
+        With ``shas``, the blob SHA of each path, a member whose blob was
+        already read under another path is skipped over too and rendered
+        like that one.
+        """
+        budget = budget or Budget()
+        limits = limits or ReadLimits(None)
+        shas = shas or {}
+        shared = {sha for sha, count in Counter(shas.values()).items() if count > 1}
+        replay = {}
+        response = self.fetcher.stream(
+            f"{self.gitlab_url}/api/v4/projects/{repo.id}/repository/archive.tar.gz?sha={commit_id}")
+        try:
+            with tarfile.open(fileobj=response.raw, mode='r|*') as archive:
+                for member in archive:
+                    self._check_cancelled()
+                    # Members live under a single "<project>-<ref>-<sha>/" directory
+                    _, _, path = member.name.partition('/')
+                    if not path or not (member.isfile() or member.issym()):
+                        continue
+                    if paths is not None and path not in paths:
+                        continue
+                    if not budget.admit(path, limits.rendered_size(member.size)):
+                        continue
+                    self.fetcher.stats.add('bytes_fetched', limits.read_size(member.size))
+                    file_path = f"/{path}"
+                    sha = shas.get(path)
+                    if sha in replay:
+                        yield replay[sha]._replace(path=file_path)
+                        continue
+                    record = self._render_member(archive, member, path, limits)
+                    if sha in shared:
+                        replay[sha] = record
+                    yield record
+        finally:
+            response.close()
+        for path in submodules:
+            yield FileRecord(f"/{path}", note="Skipped submodule")
+
+    def _render_member(self, archive, member, path, limits):
+        """
+        Render one member of the streamed archive, reading no more of it than needed.
+        """
+        file_path = f"/{path}"
+        if is_binary_name(path):
+            return FileRecord(file_path, note="Skipped binary file")
+        if not limits.admit(path, member.size):
+            return FileRecord(file_path, note=limits.repo_note())
+        if member.issym():
+            # A symlink blob holds its target, as the blob API returns it
+            return FileRecord(file_path, member.linkname)
+        member_file = archive.extractfile(member)
+        head = member_file.read(SNIFF_BYTES)
+        if is_binary_content(head):
+            # The rest of the member is skipped over, never buffered
+            return FileRecord(file_path, note="Skipped binary file")
+        if not limits.is_oversized(member.size):
+            return self._decode_file(file_path, head + member_file.read())
+        head = (head + member_file.read(max(limits.head_bytes - len(head), 0)))[:limits.head_bytes]
+        # A streamed archive cannot seek; the middle is read and dropped in blocks
+        skip = member.size - limits.tail_bytes - len(head)
+        while skip > 0:
+            block = member_file.read(min(skip, 64 * 1024))
+            if not block:
+                break
+            skip -= len(block)
+        tail = member_file.read(limits.tail_bytes)
+        try:
+            text, label = limits.excerpt(head, tail, member.size)
+        except UnicodeDecodeError:
+            return FileRecord(file_path, note="Skipped due to unsupported encoding")
+        return FileRecord(file_path, text, label=label)
+
+    def _use_archive(self, entries, mode):
+        if mode not in ('auto', 'api', 'archive', 'mirror'):
+            raise ValueError(f"Unknown mode '{mode}', expected 'auto', 'api', 'archive' or 'mirror'")
+        if mode == 'auto':
+            return sum(1 for entry in entries if entry.type == 'blob') > self.archive_threshold
+        return mode == 'archive'
+
+    def iter_repo(self, repo_url, branch='master', mode='auto', include=None, exclude=None,
+                  max_tokens=None, max_bytes=None, max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_repo_bytes=None,
+                  base_ref=None):
+        """
+        按顺序逐块生成GitLab仓库的处理结果
+
         Args:
             repo_url (str): GitLab仓库URL
             branch (str, optional): 分支名称. 默认为 'master'
-            
-        Returns:
-            tuple: (repo_name, content_string) - 仓库名和处理后的内容字符串
+            mode (str, optional): 'api' 逐个下载文件, 'archive' 流式下载整个归档, 'mirror' 从本地镜像 (浅克隆) 读取, 'auto' 按文件数自动选择. 默认为 'auto'
+            include (list, optional): 只保留匹配这些 .gitignore 风格模式的文件
+            exclude (list, optional): 排除匹配这些 .gitignore 风格模式的路径
+            max_tokens (int, optional): 输出的大致 token 上限, 放不下的文件不会被下载
+            max_bytes (int, optional): 输出的字节上限, 放不下的文件不会被下载
+            max_file_bytes (int, optional): 单个文件的下载上限, 超过时只通过 Range 请求下载开头和结尾的片段. 默认为 1MB, 0 表示不限制
+            max_repo_bytes (int, optional): 整个仓库的下载上限, 达到后其余文件不再下载
+            base_ref (str, optional): 对比的基准分支、标签或提交; 指定时只下载并输出相对它新增或修改的文件, 删除和重命名只列出路径
+
+        Yields:
+            str: 输出内容块, 依次拼接即为 process_repo 返回的内容
+        """
+        stats = start_run('gitlab', repo_url)
+        self.fetcher.stats = stats
+        return tracked(stats, self._iter_chunks(stats, repo_url, branch, mode, include, exclude,
+                                                max_tokens, max_bytes, max_file_bytes, max_repo_bytes, base_ref))
+
+    def _iter_chunks(self, stats, repo_url, branch, mode, include, exclude, max_tokens, max_bytes,
+                     max_file_bytes, max_repo_bytes, base_ref=None):
+        """
+        Generate the chunks of ``iter_repo``, recording phase timings and counters on ``stats``.
         """
         repo_name = repo_url.split('/')[-1]
-        repo = self.gitlab.projects.get(repo_url.replace('https://gitlab.com/', ''))
+        progress = Progress(self.progress)
+        progress.phase('resolve')
+        mirror = None
+        base_entries = None
+        if mode == 'mirror':
+            with stats.phase('resolve'):
+                if base_ref:
+                    # Listed first: a mirror is opened for one commit at a time
+                    with self._open_mirror(repo_url, base_ref) as base_mirror:
+                        base_entries = base_mirror.list_tree()
+                repo = mirror = self._open_mirror(repo_url, branch)
+        else:
+            with stats.phase('resolve'):
+                with self.fetcher.host:
+                    repo = self.gitlab.projects.get(self._project_path(repo_url))
+                stats.add('api_calls')
+        try:
+            intro = "Use the following files and contents for analysis:\n\n"
+            yield intro
 
-        # print(f"Getting README for {repo_name}")
-        readme_content = self._get_readme_content(repo, branch)
+            # print(f"Getting tree for {repo_name}")
+            path_filter = PathFilter(include, exclude, use_gitignore=False)
+            if mirror is not None:
+                commit_sha = mirror.commit_sha
+                progress.phase('enumerate')
+                with stats.phase('enumerate'):
+                    entries = path_filter.filter_entries(mirror.list_tree())
+                    if base_entries is not None:
+                        base_entries = path_filter.filter_entries(base_entries)
+            else:
+                with stats.phase('resolve'):
+                    commit_sha = self._resolve_commit(repo, branch)
+                    stats.add('api_calls')
+                progress.phase('enumerate')
+                with stats.phase('enumerate'):
+                    entries = self._get_tree_entries(repo, commit_sha, path_filter)
+                    if base_ref:
+                        base_commit_sha = self._resolve_commit(repo, base_ref)
+                        stats.add('api_calls')
+                        base_entries = self._get_tree_entries(repo, base_commit_sha, path_filter)
 
-        # print(f"\nGetting repository structure for {repo_name}")
-        repo_structure = f"Repository structure: {repo_name}\n"
-        repo_structure += self._traverse_repo_iteratively(repo)
+            # print(f"Getting README for {repo_name}")
+            limits = ReadLimits(max_file_bytes, max_repo_bytes)
+            with stats.phase('fetch'):
+                readme_content = self._get_readme_content(repo, entries, limits)
+            title = f"Repository structure: {repo_name}\n"
+            budget = Budget(max_tokens, max_bytes)
+            # The README and the structure listing get what the fixed parts leave
+            budget.reserve(len(intro) + len("README:\n\n\n") + len(title) + 2)
+            if self.dedup:
+                budget.reserve(DEDUP_FOOTER_BYTES)
+            yield f"README:\n{budget.clip(readme_content, 'README')}\n\n"
 
-        # print(f"\nGetting file contents for {repo_name}")
-        file_contents = self._get_file_contents_iteratively(repo, branch)
+            # print(f"\nGetting repository structure for {repo_name}")
+            yield title
+            yield from budget.clip_lines(self._traverse_repo_iteratively(entries))
+            yield '\n\n'
+            if base_entries is not None:
+                # Only files added or modified since the base are fetched and rendered
+                delta = diff_trees(base_entries, entries)
+                summary = delta.summary(base_ref, branch, lambda path: f"/{path}")
+                yield budget.clip(summary, 'change summary')
+                changed = delta.changed
+                entries = [entry for entry in entries if entry.type == 'tree' or entry.path in changed]
+            entries = plan_tree_entries(budget, entries, limits.rendered_size)
+            progress.phase('fetch', sum(1 for entry in entries if entry.type != 'tree'))
+            shas = {entry.path: entry.sha for entry in entries if entry.type == 'blob'}
+            dedup = Deduplicator({f"/{path}": sha for path, sha in shas.items()}, stats) if self.dedup else None
 
-        instructions = "Use the following files and contents for analysis:\n\n"
-        
-        # 组合所有内容
-        content = (
-            instructions +
-            f"README:\n{readme_content}\n\n" +
-            repo_structure +
-            '\n\n' +
-            file_contents
-        )
+            # print(f"\nGetting file contents for {repo_name}")
+            if mirror is not None:
+                records = mirror.records(entries, budget, limits, self._decode_file, stats)
+            elif self._use_archive(entries, mode):
+                selective = path_filter.active or budget.active or base_entries is not None
+                paths = {entry.path for entry in entries if entry.type == 'blob'} if selective else None
+                submodules = [entry.path for entry in entries if entry.type == 'commit']
+                records = self._get_archive_contents_iteratively(repo, commit_sha, paths, budget, limits, shas,
+                                                                 submodules)
+            else:
+                records = self._get_file_contents_iteratively(repo, entries, budget, limits)
+            for record in stats.timed('fetch', records):
+                with stats.phase('render'):
+                    if dedup is not None:
+                        record = dedup.apply(record)
+                    chunk = format_record(record)
+                stats.record(record)
+                progress.advance(chunk)
+                yield chunk
+            yield budget.footer(lambda path: f"/{path}")
+            if dedup is not None:
+                yield dedup.footer()
+            progress.finish()
+        finally:
+            if mirror is not None:
+                mirror.close()
+
+    def process_repo(self, repo_url, branch='master', mode='auto', include=None, exclude=None,
+                     max_tokens=None, max_bytes=None, max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_repo_bytes=None,
+                     base_ref=None):
+        """
+        处理GitLab仓库并返回处理后的内容
         
-        return repo_name, content
+        Args:
+            repo_url (str): GitLab仓库URL
+            branch (str, optional): 分支名称. 默认为 'master'
+            mode (str, optional): 'api' 逐个下载文件, 'archive' 流式下载整个归档, 'mirror' 从本地镜像 (浅克隆) 读取, 'auto' 按文件数自动选择. 默认为 'auto'
+            include (list, optional): 只保留匹配这些 .gitignore 风格模式的文件
+            exclude (list, optional): 排除匹配这些 .gitignore 风格模式的路径
+            max_tokens (int, optional): 输出的大致 token 上限, 放不下的文件不会被下载
+            max_bytes (int, optional): 输出的字节上限, 放不下的文件不会被下载
+            max_file_bytes (int, optional): 单个文件的下载上限, 超过时只通过 Range 请求下载开头和结尾的片段. 默认为 1MB, 0 表示不限制
+            max_repo_bytes (int, optional): 整个仓库的下载上限, 达到后其余文件不再下载
+            base_ref (str, optional): 对比的基准分支、标签或提交; 指定时只下载并输出相对它新增或修改的文件, 删除和重命名只列出路径
+            
+        Returns:
+            tuple: (repo_name, content_string) - 仓库名和处理后的内容字符串
+        """
+        repo_name = repo_url.split('/')[-1]
+        return repo_name, ''.join(self.iter_repo(repo_url, branch, mode, include, exclude, max_tokens, max_bytes,
+                                                 max_file_bytes, max_repo_bytes, base_ref))
 
-    def save_repo_contents(self, repo_url, branch='master'):
+    def save_repo_contents(self, repo_url, branch='master', mode='auto', include=None, exclude=None,
+                           max_tokens=None, max_bytes=None, max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_repo_bytes=None,
+                           base_ref=None, output_format='text', compress=False):
         """
         处理GitLab仓库并保存到文件
         
         Args:
             repo_url (str): GitLab仓库URL
             branch (str, optional): 分支名称. 默认为 'master'
+            mode (str, optional): 'api' 逐个下载文件, 'archive' 流式下载整个归档, 'mirror' 从本地镜像 (浅克隆) 读取, 'auto' 按文件数自动选择. 默认为 'auto'
+            include (list, optional): 只保留匹配这些 .gitignore 风格模式的文件
+            exclude (list, optional): 排除匹配这些 .gitignore 风格模式的路径
+            max_tokens (int, optional): 输出的大致 token 上限, 放不下的文件不会被下载
+            max_bytes (int, optional): 输出的字节上限, 放不下的文件不会被下载
+            max_file_bytes (int, optional): 单个文件的下载上限, 超过时只通过 Range 请求下载开头和结尾的片段. 默认为 1MB, 0 表示不限制
+            max_repo_bytes (int, optional): 整个仓库的下载上限, 达到后其余文件不再下载
+            base_ref (str, optional): 对比的基准分支、标签或提交; 指定时只下载并输出相对它新增或修改的文件, 删除和重命名只列出路径
+            output_format (str, optional): 'text' 只写出纯文本; 'indexed' 另外写出 .idx 索引, 之后可按路径直接读取单个文件 (见 repo2llm.dump.DumpReader). 默认为 'text'
+            compress (bool, optional): 'indexed' 格式下逐个文件压缩内容, 输出文件名改为 *_contents.dump. 默认为 False
             
         Returns:
             str: 输出文件的路径
         """
         try:
-            repo_name, content = self.process_repo(repo_url, branch)
-            output_filename = f'{repo_name}_contents.txt'
-            
-            with open(output_filename, 'w', encoding='utf-8') as f:
-                f.write(content)
+            repo_name = repo_url.split('/')[-1]
+            output_filename = save_chunks(self.iter_repo(repo_url, branch, mode, include, exclude, max_tokens, max_bytes,
+                                                         max_file_bytes, max_repo_bytes, base_ref),
+                                          repo_name, output_format, compress)
                 
             # print(f"Repository contents have been saved to '{output_filename}'.")
             return output_filename
@@ -204,4 +618,11 @@ class GitlabRepo2Txt:
         repo_url="https://gitlab.com/username/repo",
         branch="master"  # 可选参数
     )
+
+    # 方式3：逐块生成内容, 适合超大仓库
+    for chunk in repo_processor.iter_repo(
+        repo_url="https://gitlab.com/username/repo",
+        branch="master"  # 可选参数
+    ):
+        print(chunk, end='')
     """
\ No newline at end of file
@@ -0,0 +1,178 @@
+import subprocess
+import threading
+from .treewalk import TreeEntry, walk_order
+
+# Read size used to skip the middle of an object larger than the excerpt
+SKIP_BLOCK = 64 * 1024
+
+
+class GitError(Exception):
+    """Raised when a git command fails, with git's own message."""
+
+
+def run_git(repo_path, *args, input=None, env=None):
+    """
+    Run a git command in ``repo_path`` and return its standard output.
+
+    Args:
+        input (bytes, optional): written to the command's standard input
+        env (dict, optional): environment of the command
+
+    Raises:
+        GitError: if git is missing or the command fails
+    """
+    try:
+        result = subprocess.run(['git', '-C', repo_path, *args], input=input, capture_output=True, env=env)
+    except OSError as e:
+        raise GitError(f"git is not available: {e}") from e
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', 'replace').strip()
+        raise GitError(message or f"git {args[0]} failed")
+    return result.stdout
+
+
+def resolve_commit(repo_path, ref):
+    """
+    Resolve a branch, tag or commit of the repository at ``repo_path`` to a commit SHA.
+
+    Raises:
+        GitError: if ``ref`` does not name a commit
+    """
+    try:
+        return run_git(repo_path, 'rev-parse', '--verify', '--quiet', f"{ref}^{{commit}}").decode().strip()
+    except GitError:
+        raise GitError(f"Unknown ref '{ref}' in {repo_path}") from None
+
+
+def list_tree(repo_path, commit_sha, partial=False, env=None):
+    """
+    List the whole tree of ``commit_sha`` from the object database with one ``git ls-tree`` call.
+
+    Args:
+        partial (bool): the repository is a partial clone; sizes are then
+            looked up only for the blobs it holds, since asking git for the
+            size of a missing blob downloads it
+
+    Returns:
+        list: TreeEntry objects in traversal order; the size of a blob is
+            None only when it is missing from a partial clone
+    """
+    long_format = () if partial else ('--long',)
+    output = run_git(repo_path, 'ls-tree', '-r', '-t', '-z', *long_format, '--full-tree', commit_sha, env=env)
+    entries = []
+    for line in output.split(b'\0'):
+        if not line:
+            continue
+        info, path = line.split(b'\t', 1)
+        fields = info.split()
+        size = fields[3] if len(fields) > 3 else b'-'
+        entries.append(TreeEntry(path.decode('utf-8', 'surrogateescape'), fields[1].decode(),
+                                 int(size) if size != b'-' else None, fields[2].decode()))
+    if partial:
+        entries = _with_present_sizes(repo_path, commit_sha, entries, env)
+    return walk_order(entries)
+
+
+def _with_present_sizes(repo_path, commit_sha, entries, env):
+    """Fill in the sizes of the blobs a partial clone holds, without fetching the others."""
+    listing = run_git(repo_path, 'rev-list', '--objects', '--no-walk', '--missing=print', commit_sha, env=env)
+    missing = {line[1:].decode() for line in listing.splitlines() if line.startswith(b'?')}
+    present = sorted({entry.sha for entry in entries if entry.type == 'blob' and entry.sha not in missing})
+    sizes = {}
+    if present:
+        output = run_git(repo_path, 'cat-file', '--batch-check=%(objectname) %(objectsize)',
+                         input=''.join(f"{sha}\n" for sha in present).encode(), env=env)
+        for line in output.splitlines():
+            sha, size = line.split()
+            sizes[sha.decode()] = int(size)
+    return [entry._replace(size=sizes.get(entry.sha)) if entry.type == 'blob' else entry for entry in entries]
+
+
+class CatFile:
+    """
+    One ``git cat-file --batch`` process streaming blobs out of the object database.
+
+    Requests are written by a background thread while objects are read back,
+    so git never waits for the reader between objects. A process serves one
+    pass of ``read``; it is stopped when the pass ends or is abandoned.
+    """
+
+    def __init__(self, repo_path, env=None):
+        self.repo_path = repo_path
+        self.env = env
+        self.process = None
+
+    def read(self, shas, max_bytes=None, head_bytes=0, tail_bytes=0):
+        """
+        Yield ``(sha, size, head, tail)`` for every SHA, in order.
+
+        Objects up to ``max_bytes`` (all of them when None) come whole in
+        ``head`` with ``tail`` None. Larger ones are streamed past: only their
+        first ``head_bytes`` and last ``tail_bytes`` are kept. ``size`` is None
+        and both parts empty for a missing object.
+        """
+        shas = list(shas)
+        try:
+            self.process = subprocess.Popen(['git', '-C', self.repo_path, 'cat-file', '--batch'],
+                                            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            stderr=subprocess.DEVNULL, env=self.env)
+        except OSError as e:
+            raise GitError(f"git is not available: {e}") from e
+        writer = threading.Thread(target=self._write_requests, args=(self.process, shas), daemon=True)
+        writer.start()
+        try:
+            stdout = self.process.stdout
+            for sha in shas:
+                header = stdout.readline()
+                if not header:
+                    raise GitError(f"git cat-file stopped before object {sha}")
+                fields = header.split()
+                if fields[-1] == b'missing':
+                    yield sha, None, b'', None
+                    continue
+                size = int(fields[2])
+                if max_bytes is None or size <= max_bytes:
+                    yield sha, size, self._read_exactly(stdout, size), None
+                else:
+                    head = self._read_exactly(stdout, head_bytes)
+                    tail_start = max(size - tail_bytes, head_bytes)
+                    self._skip(stdout, tail_start - head_bytes)
+                    tail = self._read_exactly(stdout, size - tail_start)
+                    yield sha, size, head, tail
+                stdout.read(1)
+        finally:
+            self.close()
+
+    @staticmethod
+    def _write_requests(process, shas):
+        try:
+            for sha in shas:
+                process.stdin.write(f"{sha}\n".encode())
+            process.stdin.close()
+        except (BrokenPipeError, OSError, ValueError):
+            # The reader gave up and stopped the process
+            pass
+
+    @staticmethod
+    def _read_exactly(stream, size):
+        data = stream.read(size) if size else b''
+        if len(data) != size:
+            raise GitError("git cat-file output ended early")
+        return data
+
+    @staticmethod
+    def _skip(stream, size):
+        while size > 0:
+            block = stream.read(min(size, SKIP_BLOCK))
+            if not block:
+                raise GitError("git cat-file output ended early")
+            size -= len(block)
+
+    def close(self):
+        process, self.process = self.process, None
+        if process is None:
+            return
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        process.stdout.close()
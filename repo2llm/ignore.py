@@ -0,0 +1,122 @@
+import os
+import posixpath
+
+import pathspec
+
+GITIGNORE = '.gitignore'
+
+
+def _compile(patterns):
+    if not patterns:
+        return None
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    return pathspec.GitIgnoreSpec.from_lines(patterns)
+
+
+class PathFilter:
+    """
+    Decide which repository paths are rendered, before they are walked or fetched.
+
+    Paths are relative to the repository root and use '/' separators.
+    ``exclude`` patterns and ``.gitignore`` rules prune directories before
+    the walk descends into them; ``include`` patterns, when given, keep only
+    the files they match. All patterns use .gitignore syntax.
+    """
+
+    def __init__(self, include=None, exclude=None, use_gitignore=True):
+        self.include = _compile(include)
+        self.exclude = _compile(exclude)
+        self.use_gitignore = use_gitignore
+
+    @property
+    def active(self):
+        """True if include/exclude patterns were given."""
+        return self.include is not None or self.exclude is not None
+
+    def load_gitignore(self, directory, rel_dir, rules=()):
+        """
+        Extend the ``.gitignore`` rule chain of a directory's parent with its own file.
+
+        Args:
+            directory (str): directory on disk
+            rel_dir (str): the same directory relative to the root, '' or ending in '/'
+            rules (tuple): the parent's chain of (rel_dir, spec) pairs
+
+        Returns:
+            tuple: the rule chain that applies inside ``directory``
+        """
+        if not self.use_gitignore:
+            return rules
+        try:
+            with open(os.path.join(directory, GITIGNORE), 'r', encoding='utf-8', errors='replace') as file:
+                spec = pathspec.GitIgnoreSpec.from_lines(file.read().splitlines())
+        except OSError:
+            return rules
+        if not any(pattern.include is not None for pattern in spec.patterns):
+            return rules
+        return rules + ((rel_dir, spec),)
+
+    def is_excluded(self, rel_path, is_dir, rules=()):
+        """
+        Return True if ``rel_path`` is excluded or ignored by ``rules``.
+
+        Deeper ``.gitignore`` files come later in ``rules`` and override
+        shallower ones, including through '!' negations, as in git.
+        """
+        candidate = f"{rel_path}/" if is_dir else rel_path
+        if self.exclude is not None and self.exclude.match_file(candidate):
+            return True
+        ignored = False
+        for base, spec in rules:
+            result = spec.check_file(candidate[len(base):])
+            if result.include is not None:
+                ignored = result.include
+        return ignored
+
+    def is_included(self, rel_path):
+        return self.include is None or self.include.match_file(rel_path)
+
+    def filter_entries(self, entries):
+        """
+        Filter TreeEntry objects of a remote tree listing in traversal order.
+
+        Remote trees only hold tracked files, which git never ignores, so only
+        include/exclude patterns apply. Everything below an excluded directory
+        is dropped, and with ``include`` so are directories left empty.
+        """
+        if not self.active:
+            return entries
+        pruned = set()
+        kept = []
+        for entry in entries:
+            parent = posixpath.dirname(entry.path)
+            if parent in pruned:
+                if entry.type == 'tree':
+                    pruned.add(entry.path)
+                continue
+            if entry.type == 'tree':
+                if self.is_excluded(entry.path, True):
+                    pruned.add(entry.path)
+                    continue
+            elif self.is_excluded(entry.path, False) or not self.is_included(entry.path):
+                continue
+            kept.append(entry)
+        if self.include is None:
+            return kept
+        return drop_empty_dirs(kept, lambda entry: entry.type == 'tree', posixpath.dirname)
+
+
+def drop_empty_dirs(entries, is_dir, dirname):
+    """
+    Drop directory entries that have no file left anywhere below them.
+    """
+    nonempty = set()
+    for entry in entries:
+        if is_dir(entry):
+            continue
+        parent = dirname(entry.path)
+        while parent and parent not in nonempty:
+            nonempty.add(parent)
+            parent = dirname(parent)
+    return [entry for entry in entries if not is_dir(entry) or entry.path in nonempty]
@@ -0,0 +1,111 @@
+import codecs
+import threading
+
+# Files larger than this are rendered as a head/tail excerpt by default
+DEFAULT_MAX_FILE_BYTES = 1024 * 1024
+
+# Bytes of an oversized file shown from its start and from its end
+HEAD_BYTES = 24 * 1024
+TAIL_BYTES = 8 * 1024
+
+# Bytes an excerpt adds to its head and tail: the longer label and the omission marker
+EXCERPT_OVERHEAD = 160
+
+
+class ReadLimits:
+    """
+    Caps on the bytes read for a single file and for a whole repository.
+
+    A file over ``max_file_bytes`` is never read in full: only its first
+    ``head_bytes`` and last ``tail_bytes`` are read, by seeking locally and
+    with HTTP Range requests remotely, and rendered with a size note. Once
+    ``max_repo_bytes`` have been read, the remaining files are rendered as
+    notes. A limit of 0 or None disables it.
+    """
+
+    def __init__(self, max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_repo_bytes=None,
+                 head_bytes=HEAD_BYTES, tail_bytes=TAIL_BYTES):
+        self.max_file_bytes = max_file_bytes or None
+        self.max_repo_bytes = max_repo_bytes or None
+        if self.max_file_bytes is not None:
+            # An excerpt is never larger than the cap it replaces
+            head_bytes = min(head_bytes, self.max_file_bytes)
+            tail_bytes = min(tail_bytes, self.max_file_bytes - head_bytes)
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.used = 0
+        self.exhausted = False
+        self.admitted = set()
+        self.skipped = set()
+        self.lock = threading.Lock()
+
+    def is_oversized(self, size):
+        return self.max_file_bytes is not None and size is not None and size > self.max_file_bytes
+
+    def read_size(self, size):
+        """Bytes read for a file of ``size`` bytes: all of them, or just its excerpt."""
+        if self.is_oversized(size):
+            return self.head_bytes + self.tail_bytes
+        return size
+
+    def rendered_size(self, size):
+        """Bytes of output for a file of ``size`` bytes, for the output budget."""
+        if self.is_oversized(size):
+            return self.head_bytes + self.tail_bytes + EXCERPT_OVERHEAD
+        return size
+
+    def admit(self, key, size):
+        """
+        Charge a file of ``size`` bytes against the repository cap, in rendering order.
+        A key already admitted, such as the README read ahead of the listing,
+        is not charged again.
+
+        Returns:
+            bool: False for the first file that does not fit and every file
+                after it; their keys are recorded in ``skipped``
+        """
+        read = self.read_size(size or 0)
+        with self.lock:
+            if key in self.admitted:
+                return True
+            if not self.exhausted and self.max_repo_bytes is not None and self.used + read > self.max_repo_bytes:
+                self.exhausted = True
+            if self.exhausted:
+                self.skipped.add(key)
+                return False
+            self.used += read
+            self.admitted.add(key)
+            return True
+
+    def repo_note(self):
+        return f"Skipped: repository read limit of {self.max_repo_bytes} bytes reached"
+
+    def excerpt(self, head, tail, size):
+        """
+        Render the text of an oversized file from its raw ``head`` and ``tail`` bytes.
+
+        The head is cut at its last line break and the tail starts after its
+        first one, so neither shows a partial line or a split UTF-8 sequence.
+
+        Returns:
+            tuple: (text, label) for a FileRecord
+
+        Raises:
+            UnicodeDecodeError: if the excerpt is not UTF-8
+        """
+        newline = head.rfind(b'\n')
+        if newline >= 0:
+            head = head[:newline + 1]
+        head_text = codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        # Count only the bytes shown, not a trailing partial sequence
+        head = head[:len(head_text.encode('utf-8'))]
+        tail_text = ''
+        if tail:
+            newline = tail.find(b'\n')
+            tail = tail[newline + 1:] if newline >= 0 else tail.lstrip(bytes(range(0x80, 0xc0)))
+            tail_text = tail.decode('utf-8')
+        omitted = size - len(head) - len(tail)
+        text = f"{head_text}\n... [{omitted} bytes omitted] ...\n{tail_text}"
+        label = (f"Content (excerpt: first {len(head)} and last {len(tail)} of {size} bytes, "
+                 f"file exceeds {self.max_file_bytes} bytes)")
+        return text, label
@@ -0,0 +1,102 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from .blobcache import default_cache_dir
+from .render import FileRecord
+
+# Files modified this recently are not indexed: a write landing in the same
+# mtime tick as the read would otherwise go unnoticed on the next call.
+RACY_WINDOW_NS = 2 * 10 ** 9
+
+
+class LocalIndex:
+    """
+    Persistent per-repository index of rendered local files.
+
+    Each row maps a path and its (inode, size, mtime_ns) stat signature to the
+    FileRecord rendered from it. A repeat dump re-reads only files whose
+    signature changed and takes every other record from the index.
+    """
+
+    def __init__(self, repo_path, directory=None):
+        directory = directory or os.path.join(default_cache_dir(), 'local-index')
+        os.makedirs(directory, exist_ok=True)
+        name = hashlib.sha256(os.path.abspath(repo_path).encode('utf-8', 'surrogateescape')).hexdigest()[:32]
+        self.path = os.path.join(directory, f"{name}.sqlite")
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, ino INTEGER, size INTEGER, mtime_ns INTEGER, "
+            "text TEXT, note TEXT, label TEXT)"
+        )
+        self.db.commit()
+        self.signatures = {
+            path: (ino, size, mtime_ns)
+            for path, ino, size, mtime_ns in self.db.execute("SELECT path, ino, size, mtime_ns FROM files")
+        }
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _signature(entry):
+        return (entry.inode, entry.size, entry.mtime_ns)
+
+    def lookup(self, entry):
+        """
+        Return the indexed FileRecord for ``entry``, or None if it is missing or stale.
+        """
+        with self.lock:
+            if self.signatures.get(entry.path) != self._signature(entry):
+                self.misses += 1
+                return None
+            try:
+                row = self.db.execute("SELECT text, note, label FROM files WHERE path = ?", (entry.path,)).fetchone()
+            except UnicodeEncodeError:
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        text, note, label = row
+        return FileRecord(entry.path, text, note, label)
+
+    def store(self, entry, record):
+        if entry.mtime_ns > time.time_ns() - RACY_WINDOW_NS:
+            return
+        signature = self._signature(entry)
+        with self.lock:
+            try:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO files (path, ino, size, mtime_ns, text, note, label) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (entry.path, *signature, record.text, record.note, record.label),
+                )
+            except UnicodeEncodeError:
+                # Undecodable file names cannot be stored as TEXT; they are simply re-read
+                return
+            self.signatures[entry.path] = signature
+
+    def prune(self, paths):
+        """
+        Forget every indexed path not in ``paths``.
+        """
+        keep = set(paths)
+        with self.lock:
+            stale = [path for path in self.signatures if path not in keep]
+            self.db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in stale])
+            for path in stale:
+                del self.signatures[path]
+
+    def commit(self):
+        with self.lock:
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.commit()
+            self.db.close()
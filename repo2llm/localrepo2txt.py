@@ -1,146 +1,603 @@
+import hashlib
+import mmap
 import os
-from tqdm import tqdm
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from .localindex import LocalIndex
+from .budget import Budget, BudgetItem
+from .binaryfilter import SNIFF_BYTES, is_binary_content, is_binary_name
+from .dedup import FOOTER_BYTES as DEDUP_FOOTER_BYTES, Deduplicator, find_copies
+from .delta import diff_trees, diff_worktree
+from .dump import save_chunks
+from .gitobjects import CatFile, list_tree, resolve_commit
+from .ignore import GITIGNORE, PathFilter, drop_empty_dirs
+from .limits import DEFAULT_MAX_FILE_BYTES, ReadLimits
+from .progress import Progress
+from .render import FileRecord, format_record
+from .stats import NULL_STATS, start_run, tracked
+
+# One scanned filesystem entry; shared by the structure and contents passes.
+LocalEntry = namedtuple('LocalEntry', ['path', 'is_dir', 'size', 'mtime', 'inode', 'mtime_ns'], defaults=(0, 0))
 
 class LocalRepo2Txt:
-    def __init__(self):
-        self.binary_extensions = [
-            # Compiled executables and libraries
-            '.exe', '.dll', '.so', '.a', '.lib', '.dylib', '.o', '.obj',
-            # Compressed archives
-            '.zip', '.tar', '.tar.gz', '.tgz', '.rar', '.7z', '.bz2', '.gz', '.xz', '.z', '.lz', '.lzma', '.lzo', '.rz', '.sz', '.dz',
-            # Application-specific files
-            '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.odt', '.ods', '.odp',
-            # Media files (less common)
-            '.png', '.jpg', '.jpeg', '.gif', '.mp3', '.mp4', '.wav', '.flac', '.ogg', '.avi', '.mkv', '.mov', '.webm', '.wmv', '.m4a', '.aac',
-            # Virtual machine and container images
-            '.iso', '.vmdk', '.qcow2', '.vdi', '.vhd', '.vhdx', '.ova', '.ovf',
-            # Database files
-            '.db', '.sqlite', '.mdb', '.accdb', '.frm', '.ibd', '.dbf',
-            # Java-related files
-            '.jar', '.class', '.war', '.ear', '.jpi',
-            # Python bytecode and packages
-            '.pyc', '.pyo', '.pyd', '.egg', '.whl',
-            # Other potentially important extensions
-            '.deb', '.rpm', '.apk', '.msi', '.dmg', '.pkg', '.bin', '.dat', '.data',
-            '.dump', '.img', '.toast', '.vcd', '.crx', '.xpi', '.lockb', 'package-lock.json', '.svg' ,
-            '.eot', '.otf', '.ttf', '.woff', '.woff2',
-            '.ico', '.icns', '.cur',
-            '.cab', '.dmp', '.msp', '.msm',
-            '.keystore', '.jks', '.truststore', '.cer', '.crt', '.der', '.p7b', '.p7c', '.p12', '.pfx', '.pem', '.csr',
-            '.key', '.pub', '.sig', '.pgp', '.gpg',
-            '.nupkg', '.snupkg', '.appx', '.msix', '.msp', '.msu',
-            '.deb', '.rpm', '.snap', '.flatpak', '.appimage',
-            '.ko', '.sys', '.elf',
-            '.swf', '.fla', '.swc',
-            '.rlib', '.pdb', '.idb', '.pdb', '.dbg',
-            '.sdf', '.bak', '.tmp', '.temp', '.log', '.tlog', '.ilk',
-            '.bpl', '.dcu', '.dcp', '.dcpil', '.drc',
-            '.aps', '.res', '.rsrc', '.rc', '.resx',
-            '.prefs', '.properties', '.ini', '.cfg', '.config', '.conf',
-            '.DS_Store', '.localized', '.svn', '.git', '.gitignore', '.gitkeep',
-        ]
+    def __init__(self, read_workers=8, mmap_threshold=1024 * 1024, use_index=True, use_gitignore=True, progress=None,
+                 dedup=True, cancel=None):
+        """
+        Args:
+            read_workers (int): number of threads reading file contents; 1 reads serially
+            mmap_threshold (int): files of at least this many bytes are memory-mapped
+            use_index (bool): keep rendered files in a persistent per-repository
+                index and re-read only files whose stat signature changed
+            use_gitignore (bool): skip paths ignored by the repository's
+                .gitignore files, at any depth
+            progress (callable, optional): called as ``progress(phase, done, total, nbytes)``
+                while a repository is rendered; see Progress
+            dedup (bool): render files identical to one shown earlier as a
+                reference to it; see Deduplicator
+            cancel (CancelToken, optional): checked inside the scan and other
+                phases that run before the first chunk, which raise once it is cancelled
+        """
+        self.read_workers = read_workers
+        self.mmap_threshold = mmap_threshold
+        self.use_index = use_index
+        self.use_gitignore = use_gitignore
+        self.index = None
+        self.limits = None
+        self.stats = NULL_STATS
+        self.progress = progress
+        self.dedup = dedup
+        self.cancel = cancel
         self.ignore_dirs = {'.git', '__pycache__', '.svn', '.hg', '.DS_Store', '.venv'}
     
-    def _traverse_local_repo_iteratively(self, repo_path):
+    def _path_filter(self, include=None, exclude=None):
+        return PathFilter(include, exclude, use_gitignore=self.use_gitignore)
+
+    def _check_cancelled(self):
+        """Stop a slow phase, such as a tree listing, once the job is cancelled."""
+        if self.cancel is not None:
+            self.cancel.check()
+
+    def _scan_local_repo(self, repo_path, path_filter=None):
         """
-        Traverse the local repository iteratively.
+        Walk the local repository once and build a manifest of its entries.
+
+        Each entry records path, type, size and mtime, in the order the
+        structure listing and the file contents are rendered in. Ignored
+        and excluded directories are pruned before they are listed, and
+        virtualenvs under any name once their listing shows a pyvenv.cfg.
+        Only files that may be read are stat'ed: directories and files
+        skipped by name render the same whatever their size.
         """
-        structure = ""
-        dirs_to_visit = [repo_path]
+        if path_filter is None:
+            path_filter = self._path_filter()
+        manifest = []
+        # (directory, its path relative to the root, parent rules, position of its manifest entry)
+        dirs_to_visit = [(repo_path, '', (), None)]
         dirs_visited = set()
 
         while dirs_to_visit:
-            current_path = dirs_to_visit.pop()
+            self._check_cancelled()
+            current_path, rel_dir, parent_rules, position = dirs_to_visit.pop()
             dirs_visited.add(current_path)
-            for entry in tqdm(os.scandir(current_path), desc=f"Processing {current_path}", leave=False):
+            with os.scandir(current_path) as listing:
+                entries = list(listing)
+            names = {entry.name for entry in entries}
+            if position is not None and 'pyvenv.cfg' in names:
+                manifest[position] = None
+                continue
+            rules = parent_rules
+            if GITIGNORE in names:
+                rules = path_filter.load_gitignore(current_path, rel_dir, parent_rules)
+            for entry in entries:
+                rel_path = rel_dir + entry.name
                 if entry.is_dir():
                     if entry.name in self.ignore_dirs:
                         continue
-                    if entry.path not in dirs_visited:
-                        structure += f"{entry.path}/\n"
-                        dirs_to_visit.append(entry.path)
-                else:
-                    structure += f"{entry.path}\n"
-        return structure
-    
-    def _get_local_file_contents_iteratively(self, repo_path):
-        # Ensure repo_path ends with '/'
-        if not repo_path.endswith('/'):
-            repo_path = repo_path + '/'
-        file_contents = ""
-        dirs_to_visit = [repo_path]
-        dirs_visited = set()
-    
-        while dirs_to_visit:
-            current_path = dirs_to_visit.pop()
-            dirs_visited.add(current_path)
-            for entry in tqdm(os.scandir(current_path), desc=f"Downloading {current_path}", leave=False):
-                if entry.is_dir():
-                    if entry.name in self.ignore_dirs:
+                    if path_filter.is_excluded(rel_path, True, rules):
                         continue
                     if entry.path not in dirs_visited:
-                        dirs_to_visit.append(entry.path)
+                        dirs_to_visit.append((entry.path, f"{rel_path}/", rules, len(manifest)))
+                        manifest.append(LocalEntry(entry.path, True, 0, 0))
+                elif path_filter.is_excluded(rel_path, False, rules) or not path_filter.is_included(rel_path):
+                    continue
+                elif is_binary_name(entry.name):
+                    manifest.append(LocalEntry(entry.path, False, 0, 0))
                 else:
-                    if any(entry.name.endswith(ext) for ext in self.binary_extensions):
-                        file_contents += f"File: {entry.path}\nContent: Skipped binary file\n\n"
-                    else:
-                        file_contents += f"File: {entry.path}\n"
-                        try:
-                            with open(entry.path, 'r', encoding='utf-8') as file:
-                                file_contents += f"Content:\n{file.read()}\n\n"
-                        except (UnicodeDecodeError, FileNotFoundError, IsADirectoryError):
-                            file_contents += "Content: Skipped due to decoding error or file not found\n\n"
-        return file_contents
-    
-    def process_repo(self, repo_path):
+                    try:
+                        stat = entry.stat()
+                        manifest.append(LocalEntry(entry.path, False, stat.st_size, stat.st_mtime,
+                                                   stat.st_ino, stat.st_mtime_ns))
+                    except OSError:
+                        manifest.append(LocalEntry(entry.path, False, 0, 0))
+        # Virtualenvs found once listed left None in place of their directory entry
+        manifest = [entry for entry in manifest if entry is not None]
+        if path_filter.include is not None:
+            manifest = drop_empty_dirs(manifest, lambda entry: entry.is_dir, os.path.dirname)
+        return manifest
+
+    def _scan_git_tree(self, repo_path, commit_sha, path_filter):
+        """
+        List the tree of ``commit_sha`` from the object database as a manifest,
+        in the same form _scan_local_repo gives for the working tree.
+
+        Only tracked files exist there, so .gitignore rules never apply; the
+        include/exclude patterns do.
+
+        Returns:
+            tuple: (manifest, objects), where objects maps the path of every
+                file in the manifest to its TreeEntry
+        """
+        manifest = []
+        objects = {}
+        self._check_cancelled()
+        for entry in path_filter.filter_entries(list_tree(repo_path, commit_sha)):
+            path = os.path.join(repo_path, *entry.path.split('/'))
+            if entry.type == 'tree':
+                manifest.append(LocalEntry(path, True, 0, 0))
+            else:
+                manifest.append(LocalEntry(path, False, entry.size or 0, 0))
+                objects[path] = entry
+        return manifest, objects
+
+    def resolve_revision(self, repo_path, ref):
+        """
+        Resolve ``ref`` (branch, tag or commit) of the repository to its commit SHA.
+
+        Raises:
+            GitError: if ``ref`` does not name a commit
+        """
+        self._check_cancelled()
+        return resolve_commit(repo_path, ref)
+
+    def scan(self, repo_path, include=None, exclude=None):
+        """
+        Scan the working tree once, for both ``fingerprint`` and ``iter_repo``.
+
+        Returns:
+            list: LocalEntry manifest of the non-ignored entries
+        """
+        return self._scan_local_repo(repo_path, self._path_filter(include, exclude))
+
+    def fingerprint(self, repo_path, include=None, exclude=None, manifest=None):
+        """
+        Fingerprint the working tree from file metadata, without reading any file.
+
+        Args:
+            include (list, optional): only fingerprint files matching these patterns
+            exclude (list, optional): skip paths matching these patterns
+            manifest (list, optional): manifest from ``scan`` with the same
+                patterns; the tree is scanned when omitted
+
+        Returns:
+            str: hex digest that changes whenever an entry is added, removed,
+                resized or touched
+        """
+        if manifest is None:
+            manifest = self.scan(repo_path, include, exclude)
+        digest = hashlib.sha256()
+        for entry in manifest:
+            digest.update(f"{entry.path}\0{entry.is_dir}\0{entry.size}\0{entry.mtime}\n".encode('utf-8', 'surrogateescape'))
+        return digest.hexdigest()
+
+    def _traverse_local_repo_iteratively(self, manifest):
+        """
+        Yield the repository structure lines from a scanned manifest.
+        """
+        for entry in manifest:
+            if entry.is_dir:
+                yield f"{entry.path}/\n"
+            else:
+                yield f"{entry.path}\n"
+
+    def _read_local_file(self, entry):
+        """
+        Read and decode a single file, memory-mapping it when it is large.
+
+        Returns None without reading past the first SNIFF_BYTES when the
+        file's prefix looks binary.
+        """
+        with open(entry.path, 'rb') as file:
+            if entry.size >= self.mmap_threshold:
+                try:
+                    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        if is_binary_content(mapped[:SNIFF_BYTES]):
+                            return None
+                        text = str(mapped, 'utf-8')
+                except ValueError:
+                    # The file was truncated to zero bytes after it was scanned
+                    text = str(file.read(), 'utf-8')
+            else:
+                head = file.read(SNIFF_BYTES)
+                if is_binary_content(head):
+                    return None
+                text = str(head + file.read(), 'utf-8')
+        return self._translate_newlines(text)
+
+    @staticmethod
+    def _translate_newlines(text):
+        # Match the newline translation of text-mode reads
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+
+    def _read_local_excerpt(self, entry, limits):
+        """
+        Read only the head and tail of a file over the size cap, seeking past the rest.
+
+        Returns:
+            FileRecord: the excerpt, or a skip note if the head looks binary
+        """
+        with open(entry.path, 'rb') as file:
+            head = file.read(limits.head_bytes)
+            if is_binary_content(head[:SNIFF_BYTES]):
+                return FileRecord(entry.path, note="Skipped binary file")
+            size = os.fstat(file.fileno()).st_size
+            tail = b''
+            if limits.tail_bytes and size > len(head):
+                file.seek(max(size - limits.tail_bytes, len(head)))
+                tail = file.read(limits.tail_bytes)
+        self.stats.add('bytes_read', len(head) + len(tail))
+        text, label = limits.excerpt(head, tail, size)
+        return FileRecord(entry.path, self._translate_newlines(text), label=label)
+
+    def _render_local_file(self, entry):
+        if is_binary_name(entry.path):
+            return FileRecord(entry.path, note="Skipped binary file")
+        limits = self.limits
+        if limits is not None:
+            if entry.path in limits.skipped:
+                return FileRecord(entry.path, note=limits.repo_note())
+            if limits.is_oversized(entry.size):
+                # Excerpts depend on the limits, so they bypass the index
+                try:
+                    return self._read_local_excerpt(entry, limits)
+                except (UnicodeDecodeError, FileNotFoundError, IsADirectoryError):
+                    return FileRecord(entry.path, note="Skipped due to decoding error or file not found")
+        index = self.index
+        if index is not None:
+            record = index.lookup(entry)
+            if record is not None:
+                self.stats.add('cache_hits')
+                return record
+        try:
+            text = self._read_local_file(entry)
+            self.stats.add('bytes_read', entry.size)
+        except (UnicodeDecodeError, FileNotFoundError, IsADirectoryError):
+            return FileRecord(entry.path, note="Skipped due to decoding error or file not found")
+        if text is None:
+            record = FileRecord(entry.path, note="Skipped binary file")
+        else:
+            record = FileRecord(entry.path, text)
+        if index is not None:
+            index.store(entry, record)
+        return record
+
+    def _get_local_file_contents_iteratively(self, manifest):
+        """
+        Yield a FileRecord for every file in the manifest, in manifest order.
+
+        Hard links to a file read earlier, and other entries with the same
+        inode, size and mtime, are not read again: the first one's record is
+        repeated under their path.
+        """
+        files = [entry for entry in manifest if not entry.is_dir]
+        copies = find_copies(files, lambda entry: (entry.inode, entry.size, entry.mtime_ns) if entry.inode else None)
+        firsts = set(copies.values())
+        rendered = {}
+        records = self._read_local_files([entry for entry in files if entry.path not in copies])
+        try:
+            for entry in files:
+                first = copies.get(entry.path)
+                if first is not None:
+                    yield rendered[first]._replace(path=entry.path)
+                    continue
+                record = next(records)
+                if entry.path in firsts:
+                    rendered[entry.path] = record
+                yield record
+        finally:
+            records.close()
+
+    def _read_local_files(self, files):
+        """
+        Yield a FileRecord for every file, in order.
+
+        Files are read concurrently by a bounded thread pool in small batches;
+        at most two batches per worker are in flight ahead of the record
+        being yielded.
+        """
+        if self.read_workers <= 1:
+            for entry in files:
+                yield self._render_local_file(entry)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=self.read_workers)
+        try:
+            pending = deque()
+            for batch in self._batch_entries(files):
+                pending.append(executor.submit(self._render_local_batch, batch))
+                if len(pending) >= self.read_workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _get_git_file_contents_iteratively(self, repo_path, files, objects):
+        """
+        Yield a FileRecord for every file of a git tree manifest, in manifest order.
+
+        Blobs are streamed from one ``git cat-file --batch`` process; files
+        skipped by name or by the repository cap are never requested, and
+        blobs over the size cap are streamed past, keeping only their excerpt.
+        A blob listed under several paths is read once.
+        """
+        limits = self.limits
+        plan = []
+        for entry in files:
+            if objects[entry.path].type == 'commit':
+                plan.append((entry, FileRecord(entry.path, note="Skipped submodule")))
+            elif is_binary_name(entry.path):
+                plan.append((entry, FileRecord(entry.path, note="Skipped binary file")))
+            elif entry.path in limits.skipped:
+                plan.append((entry, FileRecord(entry.path, note=limits.repo_note())))
+            else:
+                plan.append((entry, None))
+        copies = find_copies([entry for entry, record in plan if record is None],
+                             lambda entry: objects[entry.path].sha)
+        firsts = set(copies.values())
+        rendered = {}
+        blobs = CatFile(repo_path).read([objects[entry.path].sha for entry, record in plan
+                                         if record is None and entry.path not in copies],
+                                        limits.max_file_bytes, limits.head_bytes, limits.tail_bytes)
+        try:
+            for entry, record in plan:
+                if entry.path in copies:
+                    record = rendered[copies[entry.path]]._replace(path=entry.path)
+                elif record is None:
+                    _, size, head, tail = next(blobs)
+                    record = self._render_git_blob(entry, size, head, tail, limits)
+                    if entry.path in firsts:
+                        rendered[entry.path] = record
+                yield record
+        finally:
+            blobs.close()
+
+    def _render_git_blob(self, entry, size, head, tail, limits):
+        if size is None:
+            return FileRecord(entry.path, note="Skipped due to decoding error or file not found")
+        self.stats.add('bytes_read', len(head) + len(tail or b''))
+        if is_binary_content(head[:SNIFF_BYTES]):
+            return FileRecord(entry.path, note="Skipped binary file")
+        try:
+            if tail is None:
+                return FileRecord(entry.path, self._translate_newlines(str(head, 'utf-8')))
+            text, label = limits.excerpt(head, tail, size)
+        except UnicodeDecodeError:
+            return FileRecord(entry.path, note="Skipped due to decoding error or file not found")
+        return FileRecord(entry.path, self._translate_newlines(text), label=label)
+
+    def _batch_entries(self, files, max_files=32, max_bytes=4 * 1024 * 1024):
+        """
+        Group files into read batches so per-task overhead stays small for tiny files.
+        """
+        batch = []
+        batch_bytes = 0
+        for entry in files:
+            batch.append(entry)
+            batch_bytes += entry.size
+            if len(batch) >= max_files or batch_bytes >= max_bytes:
+                yield batch
+                batch = []
+                batch_bytes = 0
+        if batch:
+            yield batch
+
+    def _render_local_batch(self, batch):
+        return [self._render_local_file(entry) for entry in batch]
+
+    def _plan_budget(self, repo_path, files, budget, limits):
+        """
+        Pick the files that fit ``budget`` from their scanned sizes, before reading any.
+        Files skipped by name cost only their note and go first; files over
+        the size cap cost only their excerpt.
+        """
+        items = []
+        kept = set()
+        for entry in files:
+            rel_path = self._relative_path(repo_path, entry)
+            # Records show the path as scanned
+            if is_binary_name(entry.path):
+                if budget.keep(BudgetItem(entry.path, rel_path, entry.size, entry.path)):
+                    kept.add(entry.path)
+            else:
+                items.append(BudgetItem(entry.path, rel_path, limits.rendered_size(entry.size), entry.path))
+        kept |= budget.plan(items)
+        return [entry for entry in files if entry.path in kept]
+
+    @staticmethod
+    def _relative_path(repo_path, entry):
+        return os.path.relpath(entry.path, repo_path).replace(os.sep, '/')
+
+    def _diff_base(self, repo_path, base_commit_sha, manifest, objects, include, exclude):
+        """
+        Compare the rendered tree, a ref's (``objects``) or the working tree's, with the base commit.
+
+        Returns:
+            TreeDiff
+        """
+        base_entries = PathFilter(include, exclude, use_gitignore=False).filter_entries(
+            list_tree(repo_path, base_commit_sha))
+        if objects is not None:
+            return diff_trees(base_entries, objects.values())
+        files = [self._relative_path(repo_path, entry) for entry in manifest if not entry.is_dir]
+        return diff_worktree(repo_path, base_commit_sha, base_entries, files)
+
+    def iter_repo(self, repo_path, include=None, exclude=None, max_tokens=None, max_bytes=None,
+                  max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_repo_bytes=None, ref=None, base_ref=None, manifest=None):
+        """
+        按顺序逐块生成本地仓库的处理结果
+
+        Args:
+            repo_path (str): 本地仓库路径
+            include (list, optional): 只保留匹配这些 .gitignore 风格模式的文件
+            exclude (list, optional): 排除匹配这些 .gitignore 风格模式的路径
+            max_tokens (int, optional): 输出的大致 token 上限, 放不下的文件不会被读取
+            max_bytes (int, optional): 输出的字节上限, 放不下的文件不会被读取
+            max_file_bytes (int, optional): 单个文件的读取上限, 超过时只读取开头和结尾的片段. 默认为 1MB, 0 表示不限制
+            max_repo_bytes (int, optional): 整个仓库的读取上限, 达到后其余文件不再读取
+            ref (str, optional): 分支、标签或提交; 指定时直接从 git 对象库读取该版本, 不读取工作区. 默认为 None
+            base_ref (str, optional): 对比的基准分支、标签或提交; 指定时只读取并输出相对它新增或修改的文件, 删除和重命名只列出路径
+            manifest (list, optional): scan() 用相同 include/exclude 得到的工作区清单; 指定时不再重新扫描. 默认为 None
+
+        Yields:
+            str: 输出内容块, 依次拼接即为 process_repo 返回的内容
+        """
+        stats = self.stats = start_run('local', repo_path)
+        return tracked(stats, self._iter_chunks(stats, repo_path, include, exclude, max_tokens, max_bytes,
+                                                max_file_bytes, max_repo_bytes, ref, base_ref, manifest))
+
+    def _iter_chunks(self, stats, repo_path, include, exclude, max_tokens, max_bytes, max_file_bytes, max_repo_bytes,
+                     ref=None, base_ref=None, manifest=None):
+        """
+        Generate the chunks of ``iter_repo``, recording phase timings and counters on ``stats``.
+        """
+        repo_name = os.path.basename(repo_path)
+
+        # print(f"Scanning repository: {repo_name}")
+        progress = Progress(self.progress)
+        objects = None
+        if ref is not None or base_ref is not None:
+            progress.phase('resolve')
+            with stats.phase('resolve'):
+                commit_sha = resolve_commit(repo_path, ref) if ref is not None else None
+                base_commit_sha = resolve_commit(repo_path, base_ref) if base_ref is not None else None
+        progress.phase('enumerate')
+        with stats.phase('enumerate'):
+            if ref is None:
+                if manifest is None:
+                    manifest = self.scan(repo_path, include, exclude)
+            else:
+                manifest, objects = self._scan_git_tree(repo_path, commit_sha,
+                                                        PathFilter(include, exclude, use_gitignore=False))
+            delta = None
+            if base_ref is not None:
+                delta = self._diff_base(repo_path, base_commit_sha, manifest, objects, include, exclude)
+
+        intro = "Use the files and contents provided below to complete this analysis:\n\n"
+        yield intro
+
+        # print(f"Fetching repository structure for: {repo_name}")
+        title = f"Repository Structure: {repo_name}\n".replace(repo_path, '.')
+        budget = Budget(max_tokens, max_bytes)
+        # The structure listing gets what the fixed parts leave
+        budget.reserve(len(intro) + len(title) + 2)
+        if self.dedup:
+            budget.reserve(DEDUP_FOOTER_BYTES)
+        yield title
+        yield from budget.clip_lines(line.replace(repo_path, '.')
+                                     for line in self._traverse_local_repo_iteratively(manifest))
+        yield '\n\n'
+
+        files = [entry for entry in manifest if not entry.is_dir]
+        if delta is not None:
+            # Only files added or modified since the base are read and rendered
+            summary = delta.summary(base_ref, ref or 'working tree', lambda path: os.path.join('.', *path.split('/')))
+            yield budget.clip(summary, 'change summary')
+            changed = delta.changed
+            files = [entry for entry in files if self._relative_path(repo_path, entry) in changed]
+        limits = ReadLimits(max_file_bytes, max_repo_bytes)
+        if budget.active:
+            files = self._plan_budget(repo_path, files, budget, limits)
+        if limits.max_repo_bytes is not None:
+            for entry in files:
+                if not is_binary_name(entry.path):
+                    limits.admit(entry.path, entry.size)
+
+        progress.phase('fetch', len(files))
+        # print(f"\nFetching file contents for: {repo_name}")
+        # Blobs of a ref are addressed by content already; only the working tree uses the index
+        index = self.index = LocalIndex(repo_path) if self.use_index and ref is None else None
+        self.limits = limits
+        if objects is None:
+            records = self._get_local_file_contents_iteratively(files)
+            dedup = Deduplicator(stats=stats) if self.dedup else None
+        else:
+            records = self._get_git_file_contents_iteratively(repo_path, files, objects)
+            dedup = Deduplicator({path: entry.sha for path, entry in objects.items()}, stats) if self.dedup else None
+        try:
+            for record in stats.timed('fetch', records):
+                with stats.phase('render'):
+                    if dedup is not None:
+                        record = dedup.apply(record)
+                    chunk = format_record(record)
+                stats.record(record)
+                progress.advance(chunk)
+                yield chunk
+            yield budget.footer(lambda path: os.path.join('.', *path.split('/')))
+            if dedup is not None:
+                yield dedup.footer()
+            progress.finish()
+            if index is not None and not include and not exclude:
+                # A filtered manifest leaves out paths that still exist; only a full scan may prune
+                index.prune(entry.path for entry in manifest if not entry.is_dir)
+        finally:
+            self.index = None
+            self.limits = None
+            if index is not None:
+                index.close()
+
+    def process_repo(self, repo_path, include=None, exclude=None, max_tokens=None, max_bytes=None,
+                     max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_repo_bytes=None, ref=None, base_ref=None):
         """
         处理本地仓库并返回处理后的内容
         
         Args:
             repo_path (str): 本地仓库路径
+            include (list, optional): 只保留匹配这些 .gitignore 风格模式的文件
+            exclude (list, optional): 排除匹配这些 .gitignore 风格模式的路径
+            max_tokens (int, optional): 输出的大致 token 上限, 放不下的文件不会被读取
+            max_bytes (int, optional): 输出的字节上限, 放不下的文件不会被读取
+            max_file_bytes (int, optional): 单个文件的读取上限, 超过时只读取开头和结尾的片段. 默认为 1MB, 0 表示不限制
+            max_repo_bytes (int, optional): 整个仓库的读取上限, 达到后其余文件不再读取
+            ref (str, optional): 分支、标签或提交; 指定时直接从 git 对象库读取该版本, 不读取工作区. 默认为 None
+            base_ref (str, optional): 对比的基准分支、标签或提交; 指定时只读取并输出相对它新增或修改的文件, 删除和重命名只列出路径
             
         Returns:
             tuple: (repo_name, content_string) - 仓库名和处理后的内容字符串
         """
         repo_name = os.path.basename(repo_path)
+        return repo_name, ''.join(self.iter_repo(repo_path, include, exclude, max_tokens, max_bytes,
+                                                 max_file_bytes, max_repo_bytes, ref, base_ref))
     
-        # print(f"Fetching repository structure for: {repo_name}")
-        repo_structure = f"Repository Structure: {repo_name}\n"
-        repo_structure += self._traverse_local_repo_iteratively(repo_path)
-    
-        repo_structure = repo_structure.replace(repo_path, '.')
-    
-        # print(f"\nFetching file contents for: {repo_name}")
-        file_contents = self._get_local_file_contents_iteratively(repo_path)
-    
-        instructions = "Use the files and contents provided below to complete this analysis:\n\n"
-        
-        # 组合所有内容
-        content = (
-            instructions +
-            repo_structure +
-            '\n\n' +
-            file_contents
-        )
-        
-        return repo_name, content
-    
-    def save_repo_contents(self, repo_path):
+    def save_repo_contents(self, repo_path, include=None, exclude=None, max_tokens=None, max_bytes=None,
+                           max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_repo_bytes=None, ref=None, base_ref=None,
+                           output_format='text', compress=False):
         """
         处理本地仓库并保存到文件
         
         Args:
             repo_path (str): 本地仓库路径
+            include (list, optional): 只保留匹配这些 .gitignore 风格模式的文件
+            exclude (list, optional): 排除匹配这些 .gitignore 风格模式的路径
+            max_tokens (int, optional): 输出的大致 token 上限, 放不下的文件不会被读取
+            max_bytes (int, optional): 输出的字节上限, 放不下的文件不会被读取
+            max_file_bytes (int, optional): 单个文件的读取上限, 超过时只读取开头和结尾的片段. 默认为 1MB, 0 表示不限制
+            max_repo_bytes (int, optional): 整个仓库的读取上限, 达到后其余文件不再读取
+            ref (str, optional): 分支、标签或提交; 指定时直接从 git 对象库读取该版本, 不读取工作区. 默认为 None
+            base_ref (str, optional): 对比的基准分支、标签或提交; 指定时只读取并输出相对它新增或修改的文件, 删除和重命名只列出路径
+            output_format (str, optional): 'text' 只写出纯文本; 'indexed' 另外写出 .idx 索引, 之后可按路径直接读取单个文件 (见 repo2llm.dump.DumpReader). 默认为 'text'
+            compress (bool, optional): 'indexed' 格式下逐个文件压缩内容, 输出文件名改为 *_contents.dump. 默认为 False
             
         Returns:
             str: 输出文件的路径
         """
         try:
-            repo_name, content = self.process_repo(repo_path)
-            output_filename = f'{repo_name}_contents.txt'
-            
-            with open(output_filename, 'w', encoding='utf-8') as f:
-                f.write(content)
+            repo_name = os.path.basename(repo_path)
+            output_filename = save_chunks(self.iter_repo(repo_path, include, exclude, max_tokens, max_bytes,
+                                                         max_file_bytes, max_repo_bytes, ref, base_ref),
+                                          repo_name, output_format, compress,
+                                          lambda path: os.path.relpath(path, repo_path).replace(os.sep, '/'))
                 
             # print(f"Repository contents saved to '{output_filename}'.")
             return output_filename
@@ -173,4 +630,14 @@ output_file = repo_processor.save_repo_contents(
 repo_name, content = repo_processor.process_repo(
     repo_path="/path/to/local/repo"
 )
+
+# 方式3：逐块生成内容, 适合超大仓库
+for chunk in repo_processor.iter_repo(repo_path="/path/to/local/repo"):
+    print(chunk, end='')
+
+# 方式4：直接从 git 对象库读取某个分支、标签或提交, 无需检出
+repo_name, content = repo_processor.process_repo(
+    repo_path="/path/to/local/repo",
+    ref="v1.0"
+)
 """
\ No newline at end of file
@@ -0,0 +1,255 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from .limits import DEFAULT_MAX_FILE_BYTES, ReadLimits
+from .localindex import LocalIndex, RACY_WINDOW_NS
+from .localrepo2txt import LocalEntry, LocalRepo2Txt
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+
+_EVENT = struct.Struct('iIII')
+
+_libc = None
+
+
+def _inotify():
+    global _libc
+    if _libc is None:
+        if not sys.platform.startswith('linux'):
+            raise OSError("Watch mode needs inotify, which is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("Watch mode needs inotify, which this C library does not provide")
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc = libc
+    return _libc
+
+
+class LocalRepoWatcher:
+    """
+    Keep a local repository's file index warm between dumps.
+
+    A background thread follows inotify events for every non-ignored
+    directory and, once the tree has been quiet for ``debounce`` seconds,
+    re-renders the changed files into the repository's LocalIndex. The next
+    dump then finds every record already indexed and reads nothing. Files
+    over ``max_file_bytes`` are left alone: dumps render them as excerpts,
+    which are never indexed.
+    """
+
+    def __init__(self, repo_path, processor=None, debounce=0.5, max_file_bytes=DEFAULT_MAX_FILE_BYTES):
+        self.repo_path = repo_path
+        self.processor = processor or LocalRepo2Txt()
+        self.limits = ReadLimits(max_file_bytes)
+        self.debounce = debounce
+        self.fd = None
+        self.watches = {}
+        self.changed = set()
+        self.rescan = True
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.refreshes = 0
+
+    def start(self):
+        libc = _inotify()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self.fd = fd
+        self._add_watch(self.repo_path)
+        self.thread = threading.Thread(target=self._run, name=f"repo2llm-watch:{self.repo_path}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _add_watch(self, path):
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self.watches[wd] = path
+
+    def _add_tree(self, path):
+        """
+        Watch ``path`` and every non-ignored directory below it, marking their files changed.
+        """
+        self._add_watch(path)
+        for entry in self.processor._scan_local_repo(path):
+            if entry.is_dir:
+                self._add_watch(entry.path)
+            else:
+                self.changed.add(entry.path)
+
+    def _read_events(self):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                self.rescan = True
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if name not in self.processor.ignore_dirs and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(path)
+            else:
+                self.changed.add(path)
+
+    def _run(self):
+        index = LocalIndex(self.repo_path)
+        self.processor.index = index
+        self.processor.limits = self.limits
+        try:
+            last_event = 0.0
+            while not self.stop_event.is_set():
+                ready, _, _ = select.select([self.fd], [], [], self.debounce)
+                if ready:
+                    self._read_events()
+                    last_event = time.monotonic()
+                    continue
+                if self.rescan:
+                    self._refresh_all(index)
+                elif self.changed and time.monotonic() - last_event >= self.debounce:
+                    self._refresh_changed(index)
+        finally:
+            self.processor.index = None
+            self.processor.limits = None
+            index.close()
+
+    def _refresh_all(self, index):
+        self.rescan = False
+        self.changed.clear()
+        manifest = self.processor._scan_local_repo(self.repo_path)
+        for entry in manifest:
+            if entry.is_dir:
+                self._add_watch(entry.path)
+        self._render(index, [entry for entry in manifest if not entry.is_dir])
+
+    def _refresh_changed(self, index):
+        paths, self.changed = self.changed, set()
+        entries = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if os.path.isfile(path):
+                entries.append(LocalEntry(path, False, stat.st_size, stat.st_mtime, stat.st_ino, stat.st_mtime_ns))
+        self._render(index, entries)
+
+    def _render(self, index, entries):
+        racy_after = time.time_ns() - RACY_WINDOW_NS
+        for entry in entries:
+            if self.limits.is_oversized(entry.size):
+                continue
+            self.processor._render_local_file(entry)
+            # Too fresh to be indexed yet; look at it again once it has settled
+            if entry.mtime_ns > racy_after:
+                self.changed.add(entry.path)
+        index.commit()
+        self.refreshes += 1
+
+
+# Running watchers by absolute path, least recently requested first
+_watchers = OrderedDict()
+_watchers_lock = threading.Lock()
+
+# Most repositories watched at once; each holds an inotify descriptor and a thread
+MAX_WATCHERS = int(os.getenv('REPO2LLM_MAX_WATCHERS', '8'))
+
+
+def watch_repo(repo_path, max_watchers=None):
+    """
+    Start watching ``repo_path`` unless it is already being watched.
+
+    A watcher whose thread died is stopped and replaced. Once more than
+    ``max_watchers`` (default REPO2LLM_MAX_WATCHERS) repositories are
+    watched, the least recently requested ones are stopped.
+
+    Returns:
+        LocalRepoWatcher: the running watcher for the repository
+    """
+    key = os.path.abspath(repo_path)
+    max_watchers = max(1, max_watchers or MAX_WATCHERS)
+    stopped = []
+    with _watchers_lock:
+        watcher = _watchers.pop(key, None)
+        if watcher is not None and not watcher.is_alive():
+            stopped.append(watcher)
+            watcher = None
+        if watcher is None:
+            watcher = LocalRepoWatcher(repo_path).start()
+        _watchers[key] = watcher
+        while len(_watchers) > max_watchers:
+            stopped.append(_watchers.popitem(last=False)[1])
+    for old in stopped:
+        old.stop()
+    return watcher
+
+
+def unwatch_repo(repo_path=None):
+    """
+    Stop watching ``repo_path``, or every repository when it is None.
+
+    Returns:
+        int: how many watchers were stopped
+    """
+    with _watchers_lock:
+        if repo_path is None:
+            stopped = list(_watchers.values())
+            _watchers.clear()
+        else:
+            watcher = _watchers.pop(os.path.abspath(repo_path), None)
+            stopped = [watcher] if watcher is not None else []
+    for watcher in stopped:
+        watcher.stop()
+    return len(stopped)
+
+
+def watched_repos():
+    """Paths of the repositories being watched, least recently requested first."""
+    with _watchers_lock:
+        return list(_watchers)
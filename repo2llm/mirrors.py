@@ -0,0 +1,380 @@
+import base64
+import hashlib
+import os
+import re
+import shutil
+import threading
+from .binaryfilter import SNIFF_BYTES, is_binary_content, is_binary_name
+from .blobcache import default_cache_dir
+from .dedup import find_copies
+from .gitobjects import CatFile, GitError, list_tree, run_git
+from .render import FileRecord
+
+try:
+    import fcntl
+except ImportError:
+    # Without flock (Windows), mirrors are only locked within this process
+    fcntl = None
+
+_SHA_RE = re.compile(r'^[0-9a-f]{40}([0-9a-f]{24})?$')
+
+# Blobs larger than this are left out of a mirror and downloaded only when rendered
+DEFAULT_BLOB_LIMIT = 1024 * 1024
+
+
+def auth_env(url, username, token):
+    """
+    Environment passing ``token`` to git as an HTTP header for ``url``.
+
+    The header goes through GIT_CONFIG_* variables, so the token is never
+    written to the mirror's configuration or shown in the process list.
+    """
+    env = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+    if token and url.startswith(('https://', 'http://')):
+        credentials = base64.b64encode(f"{username}:{token}".encode()).decode()
+        env.update(GIT_CONFIG_COUNT='1', GIT_CONFIG_KEY_0='http.extraHeader',
+                   GIT_CONFIG_VALUE_0=f"Authorization: Basic {credentials}")
+    return env
+
+
+class Mirror:
+    """
+    A commit checked out of the MirrorStore, readable until ``close``.
+
+    While open the mirror holds a shared lock, so it is neither evicted nor
+    fetched into by another caller.
+    """
+
+    def __init__(self, store, key, path, commit_sha, env, lock_file):
+        self.store = store
+        self.key = key
+        self.path = path
+        self.commit_sha = commit_sha
+        self.env = env
+        self.lock_file = lock_file
+
+    def list_tree(self):
+        return list_tree(self.path, self.commit_sha, partial=True, env=self.env)
+
+    def read_blob(self, sha):
+        return self.read_blob_excerpt(sha)[1]
+
+    def read_blob_excerpt(self, sha, max_bytes=None, head_bytes=0, tail_bytes=0):
+        """
+        Read a blob whole, or only its head and tail when it is over ``max_bytes``.
+
+        Returns:
+            tuple: (size, head, tail), with tail None for a blob read whole
+        """
+        for _, size, head, tail in CatFile(self.path, self.env).read([sha], max_bytes, head_bytes, tail_bytes):
+            if size is None:
+                raise GitError(f"object {sha} is missing from the mirror")
+            return size, head, tail
+
+    def records(self, entries, budget, limits, decode, stats):
+        """
+        Yield a FileRecord per file of a tree listing, with '/'-prefixed paths
+        like the API and archive modes, streaming blobs out of the mirror.
+
+        Blobs held by the mirror have known sizes and are planned like any
+        listing; blobs left out by the blob limit are downloaded by git when
+        read and then checked against ``budget`` and ``limits``. A blob listed
+        under several paths is read once.
+        """
+        files = [entry for entry in entries if entry.type != 'tree']
+        for entry in files:
+            if entry.type == 'blob' and entry.size is not None and not is_binary_name(entry.path):
+                limits.admit(entry.path, entry.size)
+        plan = []
+        for entry in files:
+            file_path = f"/{entry.path}"
+            if entry.type == 'commit':
+                plan.append((entry, FileRecord(file_path, note="Skipped submodule")))
+            elif is_binary_name(entry.path):
+                plan.append((entry, FileRecord(file_path, note="Skipped binary file")))
+            elif entry.path in limits.skipped:
+                plan.append((entry, FileRecord(file_path, note=limits.repo_note())))
+            else:
+                plan.append((entry, None))
+        # Files of unknown size the budget may still drop are never replayed as copies
+        copies = find_copies([entry for entry, record in plan if record is None],
+                             lambda entry: entry.sha if budget.size_limit(entry.path) is None else None)
+        firsts = set(copies.values())
+        rendered = {}
+        blobs = CatFile(self.path, self.env).read([entry.sha for entry, record in plan
+                                                   if record is None and entry.path not in copies],
+                                                  limits.max_file_bytes, limits.head_bytes, limits.tail_bytes)
+        try:
+            for entry, record in plan:
+                if entry.path in copies:
+                    record = rendered[copies[entry.path]]._replace(path=f"/{entry.path}")
+                elif record is None:
+                    _, size, head, tail = next(blobs)
+                    if size is not None:
+                        stats.add('bytes_read', len(head) + len(tail or b''))
+                    record = self._render_blob(entry, size, head, tail, budget, limits, decode)
+                    if entry.path in firsts:
+                        rendered[entry.path] = record
+                if record is not None:
+                    yield record
+        finally:
+            blobs.close()
+
+    @staticmethod
+    def _render_blob(entry, size, head, tail, budget, limits, decode):
+        file_path = f"/{entry.path}"
+        if size is None:
+            return FileRecord(file_path, note="Skipped due to download error: object missing from the mirror")
+        if is_binary_content(head[:SNIFF_BYTES]):
+            return FileRecord(file_path, note="Skipped binary file")
+        if not budget.admit(entry.path, limits.rendered_size(size)):
+            return None
+        if entry.size is None and not limits.admit(entry.path, size):
+            return FileRecord(file_path, note=limits.repo_note())
+        if tail is None:
+            return decode(file_path, head)
+        try:
+            text, label = limits.excerpt(head, tail, size)
+        except UnicodeDecodeError:
+            return FileRecord(file_path, note="Skipped due to unsupported encoding")
+        return FileRecord(file_path, text, label=label)
+
+    def close(self):
+        lock_file, self.lock_file = self.lock_file, None
+        if lock_file is not None:
+            self.store._release(self.key, lock_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class MirrorStore:
+    """
+    Managed on-disk mirrors of remote repositories, one bare partial clone each.
+
+    A mirror is created with a shallow fetch that leaves out blobs over
+    ``blob_limit`` and is updated with incremental shallow fetches, which only
+    transfer objects it does not hold yet; a commit already in the mirror
+    needs no network at all. Whole mirrors are evicted least recently used
+    first once the store exceeds ``max_bytes``. Each mirror has a lock file:
+    fetches and evictions take it exclusively, readers share it, across
+    threads and processes. A mirror left broken, by an interrupted clone or
+    lost objects, is cloned again from scratch.
+    """
+
+    def __init__(self, directory=None, max_bytes=2 * 1024 * 1024 * 1024, blob_limit=DEFAULT_BLOB_LIMIT):
+        self.directory = directory or os.path.join(default_cache_dir(), 'mirrors')
+        self.max_bytes = max_bytes
+        self.blob_limit = blob_limit
+        self.lock = threading.Lock()
+        self.readers = {}
+        self.fetches = 0
+        self.reused = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()[:24]
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.git")
+
+    def _lock(self, key, exclusive, blocking=True):
+        lock_file = open(os.path.join(self.directory, f"{key}.lock"), 'a+')
+        if fcntl is not None:
+            flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            try:
+                fcntl.flock(lock_file, flags if blocking else flags | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return None
+        return lock_file
+
+    def _release(self, key, lock_file):
+        with self.lock:
+            self.readers[key] -= 1
+            if not self.readers[key]:
+                del self.readers[key]
+        lock_file.close()
+
+    def resolve(self, url, ref, env=None):
+        """
+        Resolve ``ref`` to a commit SHA with ``git ls-remote``, without fetching anything.
+
+        Raises:
+            GitError: if the remote has no such branch or tag
+        """
+        if _SHA_RE.match(ref):
+            return ref
+        output = run_git(self.directory, 'ls-remote', url, ref, f"refs/tags/{ref}^{{}}", env=env)
+        refs = {}
+        for line in output.decode().splitlines():
+            sha, name = line.split('\t', 1)
+            refs[name] = sha
+        for name in (f"refs/tags/{ref}^{{}}", f"refs/heads/{ref}", f"refs/tags/{ref}", ref):
+            if name in refs:
+                return refs[name]
+        raise GitError(f"Unknown ref '{ref}' in {url}")
+
+    def open(self, url, ref, env=None):
+        """
+        Bring the mirror of ``url`` up to ``ref`` and open it for reading.
+
+        Returns:
+            Mirror: to be closed once the rendering is done
+        """
+        key = self._key(url)
+        path = self._path(key)
+        lock_file = self._lock(key, exclusive=True)
+        try:
+            created = False
+            if os.path.isdir(path) and not self._is_mirror(path, url, env):
+                shutil.rmtree(path, ignore_errors=True)
+            if not os.path.isdir(path):
+                self._create(path, url, env)
+                created = True
+            commit_sha = self._local_commit(path, ref, env)
+            if commit_sha is None:
+                try:
+                    commit_sha = self._fetch(path, ref, env)
+                except GitError:
+                    if created or not self._remote_has(url, ref, env):
+                        raise
+                    # The remote serves the ref, so the mirror is what is broken: fetch into a fresh one
+                    shutil.rmtree(path, ignore_errors=True)
+                    self._create(path, url, env)
+                    commit_sha = self._fetch(path, ref, env)
+                self.fetches += 1
+            else:
+                self.reused += 1
+            # Modification time orders mirrors for eviction
+            os.utime(path)
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_SH)
+        except BaseException:
+            lock_file.close()
+            raise
+        with self.lock:
+            self.readers[key] = self.readers.get(key, 0) + 1
+        mirror = Mirror(self, key, path, commit_sha, env, lock_file)
+        try:
+            self._evict(keep=key)
+        except OSError:
+            pass
+        return mirror
+
+    def _create(self, path, url, env):
+        partial_path = f"{path}.part"
+        shutil.rmtree(partial_path, ignore_errors=True)
+        run_git(self.directory, 'init', '--quiet', '--bare', partial_path, env=env)
+        run_git(partial_path, 'remote', 'add', 'origin', url, env=env)
+        run_git(partial_path, 'config', 'gc.auto', '0', env=env)
+        os.replace(partial_path, path)
+
+    def _is_mirror(self, path, url, env):
+        """Whether ``path`` is a usable bare repository with ``url`` as its origin."""
+        try:
+            bare = run_git(path, 'rev-parse', '--is-bare-repository', env=env).decode().strip()
+            origin = run_git(path, 'config', '--get', 'remote.origin.url', env=env).decode().strip()
+        except GitError:
+            return False
+        return bare == 'true' and origin == url
+
+    def _remote_has(self, url, ref, env):
+        """Whether the remote answers and has the branch or tag ``ref``."""
+        if _SHA_RE.match(ref):
+            return False
+        try:
+            self.resolve(url, ref, env)
+        except GitError:
+            return False
+        return True
+
+    def _local_commit(self, path, ref, env):
+        """The commit SHA if ``ref`` is a SHA whose tree the mirror already holds."""
+        if not _SHA_RE.match(ref):
+            return None
+        try:
+            run_git(path, 'cat-file', '-e', f"{ref}^{{tree}}", env=env)
+        except GitError:
+            return None
+        return ref
+
+    def _fetch(self, path, ref, env):
+        """Fetch ``ref`` shallowly and return the commit SHA it resolved to."""
+        run_git(path, 'fetch', '--quiet', '--depth', '1', f"--filter=blob:limit={self.blob_limit}",
+                '--no-tags', 'origin', ref, env=env)
+        return run_git(path, 'rev-parse', 'FETCH_HEAD^{commit}', env=env).decode().strip()
+
+    def _mirror_keys(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.git'):
+                yield name[:-len('.git')]
+
+    def size_of(self, key):
+        total = 0
+        for root, _, files in os.walk(self._path(key)):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def _evict(self, keep=None):
+        """Remove whole mirrors, least recently used first, until the store fits ``max_bytes``."""
+        sizes = {key: self.size_of(key) for key in self._mirror_keys()}
+        total = sum(sizes.values())
+        by_age = sorted(sizes, key=lambda key: os.stat(self._path(key)).st_mtime)
+        for key in by_age:
+            if total <= self.max_bytes:
+                break
+            if key == keep or key in self.readers:
+                continue
+            lock_file = self._lock(key, exclusive=True, blocking=False)
+            if lock_file is None:
+                # Read or fetched by another process
+                continue
+            try:
+                shutil.rmtree(self._path(key), ignore_errors=True)
+            finally:
+                lock_file.close()
+            total -= sizes[key]
+            self.evictions += 1
+
+    def stats(self):
+        keys = list(self._mirror_keys())
+        return {
+            'mirrors': len(keys),
+            'bytes': sum(self.size_of(key) for key in keys),
+            'max_bytes': self.max_bytes,
+            'blob_limit': self.blob_limit,
+            'fetches': self.fetches,
+            'reused': self.reused,
+            'evictions': self.evictions,
+            'directory': self.directory,
+        }
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_mirror_store():
+    """
+    Return the process-wide mirror store, capped by ``REPO2LLM_MIRROR_MB``
+    (default 2048) and leaving out blobs over ``REPO2LLM_MIRROR_BLOB_KB``
+    (default 1024).
+    """
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = MirrorStore(
+                max_bytes=int(os.getenv('REPO2LLM_MIRROR_MB', '2048')) * 1024 * 1024,
+                blob_limit=int(os.getenv('REPO2LLM_MIRROR_BLOB_KB', '1024')) * 1024,
+            )
+        return _default_store
@@ -0,0 +1,33 @@
+class Progress:
+    """
+    Report how far a rendering got to an optional callback.
+
+    The callback is called as ``callback(phase, done, total, nbytes)`` with the
+    current phase ('resolve', 'enumerate', 'fetch' or 'done'), the files
+    rendered so far, the files planned (None until the tree is listed) and
+    the bytes of output produced. Without a callback every call returns at once.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.done = 0
+        self.total = None
+        self.nbytes = 0
+
+    def phase(self, name, total=None):
+        if self.callback is None:
+            return
+        if total is not None:
+            self.total = total
+        self.callback(name, self.done, self.total, self.nbytes)
+
+    def advance(self, chunk):
+        """Count one rendered file record."""
+        if self.callback is None:
+            return
+        self.done += 1
+        self.nbytes += len(chunk)
+        self.callback('fetch', self.done, self.total, self.nbytes)
+
+    def finish(self):
+        self.phase('done')
@@ -0,0 +1,46 @@
+import os
+from collections import namedtuple
+
+# A single rendered file: either decoded text under ``label`` or a skip note.
+FileRecord = namedtuple('FileRecord', ['path', 'text', 'note', 'label'], defaults=(None, None, 'Content'))
+
+
+def format_record(record):
+    """
+    Format a FileRecord as the ``File: ... / Content: ...`` chunk used in the output.
+    """
+    if record.text is None:
+        return f"File: {record.path}\nContent: {record.note}\n\n"
+    return f"File: {record.path}\n{record.label}:\n{record.text}\n\n"
+
+
+def parse_record(chunk):
+    """
+    Rebuild the FileRecord of a chunk produced by ``format_record``.
+    """
+    header, _, rest = chunk.partition('\n')
+    path = header[len('File: '):]
+    line, _, body = rest.partition('\n')
+    if line.startswith('Content: '):
+        return FileRecord(path, note=line[len('Content: '):])
+    return FileRecord(path, body[:-2], label=line[:-1])
+
+
+def write_chunks(chunks, output_filename):
+    """
+    Write output chunks to ``output_filename`` as they are produced.
+
+    The file is written under a temporary name and moved into place once
+    complete, so a failed run never leaves a truncated dump behind.
+    """
+    partial_filename = output_filename + '.part'
+    try:
+        with open(partial_filename, 'w', encoding='utf-8') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(partial_filename, output_filename)
+    except BaseException:
+        if os.path.exists(partial_filename):
+            os.remove(partial_filename)
+        raise
+    return output_filename
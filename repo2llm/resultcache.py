@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from .blobcache import default_cache_dir
+
+
+def make_key(source, repo, revision, options=None):
+    """
+    Build a result-cache key from the source ('github', 'gitlab', 'local'),
+    the repository, its resolved revision and the render options.
+    """
+    return (source, repo, revision, tuple(sorted((options or {}).items())))
+
+
+class ResultCache:
+    """
+    Memoize whole renderings by (source, repo, revision, options).
+
+    Results live in memory up to ``max_memory_bytes``; least recently used
+    results are then spilled to ``spill_dir`` when ``max_disk_bytes`` is
+    non-zero, or dropped otherwise. Revisions are commit SHAs or content
+    fingerprints, so a cached result is valid for as long as it is kept.
+    Each result may carry the offsets of its file records, so it can be
+    paged by record again without parsing the text.
+    """
+
+    def __init__(self, max_memory_bytes=256 * 1024 * 1024, max_disk_bytes=0, spill_dir=None):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.spill_dir = spill_dir or os.path.join(default_cache_dir(), 'results')
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if self.max_disk_bytes:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, self._digest(key))
+
+    def get(self, key):
+        """
+        Return the cached rendering for ``key``, or None on a miss.
+        """
+        return self.lookup(key)[0]
+
+    def lookup(self, key):
+        """
+        Return the cached rendering for ``key`` and the offsets of its file
+        records, or (None, None) on a miss.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+        content, offsets = self._read_spilled(key)
+        with self.lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if content is not None:
+            self.put(key, content, offsets)
+        return content, offsets
+
+    def put(self, key, content, offsets=None):
+        """
+        Cache ``content`` for ``key``, with the character ``offsets`` of its
+        file records when known.
+        """
+        spill = []
+        size = len(content)
+        with self.lock:
+            if key in self.entries:
+                self.memory_bytes -= len(self.entries.pop(key)[0])
+            if size <= self.max_memory_bytes:
+                self.entries[key] = (content, offsets)
+                self.memory_bytes += size
+            else:
+                spill.append((key, (content, offsets)))
+            while self.memory_bytes > self.max_memory_bytes and self.entries:
+                old_key, old_entry = self.entries.popitem(last=False)
+                self.memory_bytes -= len(old_entry[0])
+                spill.append((old_key, old_entry))
+        for old_key, (old_content, old_offsets) in spill:
+            self._spill(old_key, old_content, old_offsets)
+
+    def _spill(self, key, content, offsets):
+        if not self.max_disk_bytes:
+            return
+        data = content.encode('utf-8')
+        if len(data) > self.max_disk_bytes:
+            return
+        header = json.dumps(key).encode('utf-8') + b'\n' + json.dumps(offsets).encode('utf-8') + b'\n'
+        fd, tmp_path = tempfile.mkstemp(dir=self.spill_dir, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                f.write(data)
+            os.replace(tmp_path, self._spill_path(key))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self._trim_disk()
+
+    def _read_spilled(self, key):
+        if not self.max_disk_bytes:
+            return None, None
+        path = self._spill_path(key)
+        try:
+            with open(path, 'rb') as f:
+                header = f.readline()
+                if json.loads(header) != json.loads(json.dumps(key)):
+                    return None, None
+                offsets = json.loads(f.readline())
+                content = f.read().decode('utf-8')
+            os.utime(path)
+            return content, offsets
+        except (OSError, ValueError):
+            return None, None
+
+    def _spilled_files(self):
+        files = []
+        for name in os.listdir(self.spill_dir):
+            if name.startswith('.tmp-'):
+                continue
+            path = os.path.join(self.spill_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return sorted(files)
+
+    def _trim_disk(self):
+        files = self._spilled_files()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def invalidate(self, source=None, repo=None):
+        """
+        Drop cached results, optionally only those of one source and/or repository.
+
+        Returns:
+            int: number of results removed from memory and disk
+        """
+        def matches(key):
+            return (source is None or key[0] == source) and (repo is None or key[1] == repo)
+
+        removed = 0
+        with self.lock:
+            for key in [key for key in self.entries if matches(key)]:
+                self.memory_bytes -= len(self.entries.pop(key)[0])
+                removed += 1
+        if self.max_disk_bytes:
+            for _, _, path in self._spilled_files():
+                try:
+                    with open(path, 'rb') as f:
+                        key = json.loads(f.readline())
+                    if matches(key):
+                        os.remove(path)
+                        removed += 1
+                except (OSError, ValueError):
+                    continue
+        return removed
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self.entries),
+                'memory_bytes': self.memory_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'max_disk_bytes': self.max_disk_bytes,
+            }
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Cancelled(Exception):
+    """Raised inside a job once every caller waiting for it has gone away."""
+
+
+class CancelToken:
+    """
+    Cooperative cancellation flag shared between a job and the callers awaiting it,
+    which also carries the job's progress events to every caller listening.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.listeners = []
+
+    def notify(self, kind, *values):
+        """Pass an event such as ('progress', phase, done, total, nbytes) to every listener."""
+        for listener in list(self.listeners):
+            listener(kind, *values)
+
+    def child(self):
+        """A token cancelled together with this one, whose events reach no listener."""
+        token = CancelToken()
+        token.event = self.event
+        return token
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def wait(self, seconds):
+        """
+        Sleep for up to ``seconds``, waking as soon as the job is cancelled.
+
+        Returns:
+            bool: True if the job was cancelled
+        """
+        return self.event.wait(seconds)
+
+    def check(self):
+        """
+        Raises:
+            Cancelled: if the job was cancelled
+        """
+        if self.event.is_set():
+            raise Cancelled()
+
+
+def cancellable(chunks, token):
+    """
+    Pass ``chunks`` through until ``token`` is cancelled, then close the source.
+
+    Closing an ``iter_repo`` generator runs its cleanup, which cancels the
+    downloads and reads it has queued, so the work stops at the next chunk
+    instead of running to the end in the background.
+
+    Raises:
+        Cancelled: at the first chunk after cancellation
+    """
+    try:
+        for chunk in chunks:
+            token.check()
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+class _Flight:
+    def __init__(self, future, token):
+        self.future = future
+        self.token = token
+        self.waiters = 0
+
+
+class JobRunner:
+    """
+    Run blocking repository jobs on a dedicated, size-bounded thread pool.
+
+    Concurrent calls with the same key share one job (single flight). A job
+    is cancelled through its CancelToken when the last caller waiting for it
+    times out or is cancelled, for instance because the client disconnected.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, max_workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='repo2llm')
+        self.flights = {}
+        self.started = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    async def run(self, key, func, *args, timeout=None, listener=None):
+        """
+        Run ``func(*args, token)`` in the pool, or join the job already running under ``key``.
+        ``listener`` receives the job's events (see CancelToken.notify) while this caller waits;
+        it is called from the job's thread.
+
+        Raises:
+            asyncio.TimeoutError: when ``timeout`` seconds pass first; the job
+                is cancelled if no other caller still waits for it
+        """
+        flight = self.flights.get(key)
+        if flight is None:
+            token = CancelToken()
+            future = asyncio.get_running_loop().run_in_executor(self.executor, func, *args, token)
+            flight = self.flights[key] = _Flight(future, token)
+            future.add_done_callback(lambda _: self._land(key, flight))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        if listener is not None:
+            flight.token.listeners.append(listener)
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.future), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if flight.waiters == 1 and not flight.future.done():
+                flight.token.cancel()
+                self.cancelled += 1
+                self._land(key, flight)
+            raise
+        finally:
+            flight.waiters -= 1
+            if listener is not None:
+                flight.token.listeners.remove(listener)
+
+    def _land(self, key, flight):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+        if flight.future.done() and not flight.future.cancelled():
+            # Nobody may be left to read the outcome of a cancelled job
+            flight.future.exception()
+
+    def stats(self):
+        return {
+            'running': len(self.flights),
+            'started': self.started,
+            'coalesced': self.coalesced,
+            'cancelled': self.cancelled,
+        }
+
+    def shutdown(self):
+        for flight in list(self.flights.values()):
+            flight.token.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+from .fetcher import RateLimiter
+
+
+class HostBudget:
+    """
+    Request budget of one API host, shared by every fetcher and job talking to it.
+
+    At most ``max_concurrency`` requests are in flight at once and, with
+    ``rate``, requests start at most that many per second. The shared
+    ``limiter`` follows the host's rate-limit headers, so once one job sees
+    the budget run low every job waits for the reset. A slot is held until
+    the response headers arrive: a body streamed afterwards never keeps
+    other requests waiting. Used as a context manager around one request.
+    """
+
+    def __init__(self, max_concurrency=None, rate=None, limiter=None):
+        self.max_concurrency = max_concurrency or None
+        self.rate = rate or None
+        self.slots = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency else None
+        self.limiter = limiter or RateLimiter()
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+        self.requests = 0
+        self.in_flight = 0
+        self.peak = 0
+        self.waited = 0.0
+
+    def acquire(self):
+        start = time.monotonic()
+        if self.slots is not None:
+            self.slots.acquire()
+        delay = 0.0
+        with self.lock:
+            now = time.monotonic()
+            if self.rate is not None:
+                # Requests are spaced evenly rather than sent in bursts
+                start_at = max(self.next_start, now)
+                self.next_start = start_at + 1.0 / self.rate
+                delay = start_at - now
+            self.requests += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        if delay > 0:
+            time.sleep(delay)
+        with self.lock:
+            self.waited += time.monotonic() - start
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+        if self.slots is not None:
+            self.slots.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'in_flight': self.in_flight,
+                'peak': self.peak,
+                'waited_seconds': round(self.waited, 3),
+                'max_concurrency': self.max_concurrency,
+                'rate': self.rate,
+                'remaining': self.limiter.remaining,
+            }
+
+
+class FetchScheduler:
+    """
+    One HostBudget per API host, so processors and batch jobs running at
+    the same time share each host's concurrency and rate-limit budget
+    instead of each assuming the whole of it.
+    """
+
+    def __init__(self, max_concurrency=16, rate=None):
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def host(self, url):
+        """Return the budget of the host serving ``url``."""
+        key = urlsplit(url).netloc.lower() or url
+        with self.lock:
+            budget = self.hosts.get(key)
+            if budget is None:
+                budget = self.hosts[key] = HostBudget(self.max_concurrency, self.rate)
+            return budget
+
+    def stats(self):
+        with self.lock:
+            hosts = dict(self.hosts)
+        return {key: budget.stats() for key, budget in hosts.items()}
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_default_scheduler():
+    """
+    Return the process-wide scheduler, allowing ``REPO2LLM_HOST_CONCURRENCY``
+    (default 16) requests in flight per host and at most ``REPO2LLM_HOST_RPS``
+    requests per second per host (default 0, unlimited).
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = FetchScheduler(
+                max_concurrency=int(os.getenv('REPO2LLM_HOST_CONCURRENCY', '16')),
+                rate=float(os.getenv('REPO2LLM_HOST_RPS', '0')),
+            )
+        return _default_scheduler
@@ -0,0 +1,214 @@
+import bisect
+import codecs
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class Session:
+    """
+    One rendering held server-side so it can be served a page at a time.
+
+    Chunks are written to a SpooledTemporaryFile, which stays in memory up
+    to ``spool_bytes`` and moves to disk past that. The byte offset of every
+    ``File:`` record is kept so pages end on record boundaries and callers
+    can jump to the n-th file.
+    """
+
+    def __init__(self, key, spool_bytes):
+        self.id = secrets.token_hex(8)
+        self.key = key
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_bytes, mode='w+b')
+        self.size = 0
+        self.file_offsets = []
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+    def write(self, chunk):
+        if is_record(chunk):
+            self.file_offsets.append(self.size)
+        data = chunk.encode('utf-8', 'surrogateescape')
+        self.file.write(data)
+        self.size += len(data)
+
+    def _read(self, start, length):
+        with self.lock:
+            self.file.seek(start)
+            return self.file.read(length)
+
+    def read_all(self):
+        return self._read(0, self.size).decode('utf-8', 'surrogateescape')
+
+    def file_offset(self, index):
+        """Byte offset of the ``index``-th file record, clamped to the end of the content."""
+        if index < len(self.file_offsets):
+            return self.file_offsets[index]
+        return self.size
+
+    def files_before(self, offset):
+        """Number of file records that start before ``offset``."""
+        return bisect.bisect_left(self.file_offsets, offset)
+
+    def page(self, start, page_bytes):
+        """
+        Read the page starting at byte ``start``.
+
+        A page ends at the last file record boundary that fits, else at the
+        last line break, else at the last complete UTF-8 character.
+
+        Returns:
+            tuple: (text, end) where ``end`` is the offset of the next page
+        """
+        start = min(max(start, 0), self.size)
+        end = min(start + page_bytes, self.size)
+        on_record = False
+        if end < self.size:
+            boundary = bisect.bisect_right(self.file_offsets, end) - 1
+            if boundary >= 0 and self.file_offsets[boundary] > start:
+                end = self.file_offsets[boundary]
+                on_record = True
+        data = self._read(start, end - start)
+        if end == self.size or on_record:
+            return data.decode('utf-8', 'surrogateescape'), end
+        newline = data.rfind(b'\n')
+        if newline >= 0:
+            data = data[:newline + 1]
+            return data.decode('utf-8', 'surrogateescape'), start + len(data)
+        # No line break in the page: stop before a UTF-8 sequence cut by the page size
+        text = codecs.getincrementaldecoder('utf-8')('surrogateescape').decode(data, final=False)
+        return text, start + len(text.encode('utf-8', 'surrogateescape'))
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class SessionStore:
+    """
+    Bounded set of live sessions, expired after ``ttl`` seconds without use
+    and evicted least recently used first beyond ``max_sessions``.
+    """
+
+    def __init__(self, max_sessions=16, ttl=1800, spool_bytes=4 * 1024 * 1024):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.spool_bytes = spool_bytes
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()
+
+    def create(self, key, chunks):
+        """
+        Render ``chunks`` into a new session and register it.
+
+        Returns:
+            Session: the new session
+        """
+        session = Session(key, self.spool_bytes)
+        try:
+            for chunk in chunks:
+                session.write(chunk)
+        except BaseException:
+            session.close()
+            raise
+        evicted = []
+        with self.lock:
+            self.sessions[session.id] = session
+            evicted.extend(self._expire())
+            while len(self.sessions) > self.max_sessions:
+                evicted.append(self.sessions.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return session
+
+    def _expire(self):
+        deadline = time.monotonic() - self.ttl
+        expired = [sid for sid, session in self.sessions.items() if session.last_used < deadline]
+        return [self.sessions.pop(sid) for sid in expired]
+
+    def get(self, session_id):
+        """Return the live session ``session_id``, or None if it expired or never existed."""
+        with self.lock:
+            expired = self._expire()
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.last_used = time.monotonic()
+                self.sessions.move_to_end(session_id)
+        for old in expired:
+            old.close()
+        return session
+
+    def find(self, key):
+        """Return a live session rendered for ``key``, if any."""
+        with self.lock:
+            for session in reversed(self.sessions.values()):
+                if session.key == key:
+                    break
+            else:
+                return None
+        return self.get(session.id)
+
+    def discard(self, session_id):
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'sessions': len(self.sessions),
+                'bytes': sum(session.size for session in self.sessions.values()),
+                'max_sessions': self.max_sessions,
+                'ttl': self.ttl,
+            }
+
+
+def is_record(chunk):
+    """Whether ``chunk`` is a file record; renderers yield every record as one chunk."""
+    return chunk.startswith('File: ')
+
+
+def track_records(chunks, offsets):
+    """
+    Yield ``chunks`` unchanged, appending to ``offsets`` the character offset
+    of every file record in their concatenation.
+    """
+    position = 0
+    for chunk in chunks:
+        if is_record(chunk):
+            offsets.append(position)
+        position += len(chunk)
+        yield chunk
+
+
+def split_records(content, offsets):
+    """
+    Split a finished rendering back into chunks at the record ``offsets`` kept
+    by track_records, so a session built from a cached string can still page
+    by record. Without offsets the rendering is a single chunk.
+    """
+    start = 0
+    for offset in offsets or ():
+        if offset > start:
+            yield content[start:offset]
+            start = offset
+    yield content[start:]
+
+
+def make_cursor(session_id, offset):
+    return f"{session_id}:{offset}"
+
+
+def parse_cursor(cursor):
+    """
+    Split a cursor into (session_id, offset).
+
+    Raises:
+        ValueError: if ``cursor`` is malformed
+    """
+    session_id, _, offset = cursor.strip().partition(':')
+    if not session_id or not offset.isdigit():
+        raise ValueError(f"Malformed cursor '{cursor}'")
+    return session_id, int(offset)
@@ -0,0 +1,228 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Phases of one rendering, in the order they first run
+PHASES = ('resolve', 'enumerate', 'fetch', 'decode', 'render')
+
+_enabled = False
+_log_path = None
+
+
+def enable(log_path=None):
+    """
+    Start collecting statistics for every rendering in this process.
+
+    Args:
+        log_path (str, optional): append one JSON line per finished rendering
+            to this file, or to standard error when it is '-'
+    """
+    global _enabled, _log_path
+    _enabled = True
+    _log_path = log_path or None
+
+
+def disable():
+    global _enabled, _log_path
+    _enabled = False
+    _log_path = None
+
+
+class NullStats:
+    """Stand-in used while collection is disabled; every call does nothing."""
+
+    def add(self, name, count=1):
+        pass
+
+    def phase(self, name):
+        return _NULL_PHASE
+
+    def timed(self, name, iterable):
+        return iterable
+
+    def record(self, record):
+        pass
+
+    def finish(self, error=None):
+        pass
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+NULL_STATS = NullStats()
+
+
+class RunStats:
+    """
+    Counters and per-phase wall time of one rendering.
+
+    Counters may be bumped from worker threads. Phase times are measured on
+    the thread driving the rendering; ``fetch`` is the time spent waiting
+    for downloads or reads to arrive, not the sum over workers.
+    """
+
+    def __init__(self, source, repo):
+        self.source = source
+        self.repo = repo
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.counters = Counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.lock = threading.Lock()
+        self.seconds = None
+        self.error = None
+
+    def add(self, name, count=1):
+        with self.lock:
+            self.counters[name] += count
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def timed(self, name, iterable):
+        """
+        Yield from ``iterable``, charging the time spent waiting for each item
+        to phase ``name``, minus the time of other phases measured meanwhile.
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            nested = self._other_phases(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._charge(name, start, nested)
+                return
+            self._charge(name, start, nested)
+            yield item
+
+    def _other_phases(self, name):
+        return sum(seconds for phase, seconds in self.phases.items() if phase != name)
+
+    def _charge(self, name, start, nested):
+        elapsed = time.perf_counter() - start - (self._other_phases(name) - nested)
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def record(self, record):
+        """Count one rendered FileRecord by outcome."""
+        if record.text is not None:
+            self.add('files_rendered')
+            self.add('bytes_rendered', len(record.text))
+            if record.label.startswith('Content (excerpt'):
+                self.add('files_excerpted')
+        elif record.note.startswith('Skipped binary'):
+            self.add('files_binary')
+        elif record.note.startswith('Identical to'):
+            self.add('files_deduplicated')
+        elif 'error' in record.note:
+            self.add('files_failed')
+        else:
+            self.add('files_skipped')
+
+    def finish(self, error=None):
+        if self.seconds is not None:
+            return
+        self.seconds = time.perf_counter() - self.start
+        self.error = None if error is None else str(error)
+        registry.add(self)
+        if _log_path is not None:
+            line = json.dumps(self.as_dict())
+            if _log_path == '-':
+                print(line, file=sys.stderr, flush=True)
+            else:
+                with open(_log_path, 'a', encoding='utf-8') as log:
+                    log.write(line + '\n')
+
+    def as_dict(self):
+        with self.lock:
+            counters = dict(self.counters)
+        result = {
+            'source': self.source,
+            'repo': self.repo,
+            'started': round(self.started, 3),
+            'seconds': None if self.seconds is None else round(self.seconds, 4),
+            'phases': {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            'counters': counters,
+        }
+        if self.error is not None:
+            result['error'] = self.error
+        return result
+
+
+class StatsRegistry:
+    """Process-wide totals plus the most recent renderings."""
+
+    def __init__(self, keep=50):
+        self.lock = threading.Lock()
+        self.recent = deque(maxlen=keep)
+        self.runs = Counter()
+        self.totals = Counter()
+        self.phase_totals = Counter()
+
+    def add(self, run):
+        with self.lock:
+            self.recent.append(run)
+            self.runs[run.source] += 1
+            self.totals.update(run.counters)
+            self.phase_totals.update(run.phases)
+
+    def as_dict(self, recent=10):
+        with self.lock:
+            runs = list(self.recent)[-recent:] if recent else []
+            return {
+                'enabled': _enabled,
+                'runs': dict(self.runs),
+                'totals': dict(self.totals),
+                'phases': {name: round(seconds, 4) for name, seconds in self.phase_totals.items()},
+                'recent': [run.as_dict() for run in runs],
+            }
+
+    def reset(self):
+        with self.lock:
+            self.recent.clear()
+            self.runs.clear()
+            self.totals.clear()
+            self.phase_totals.clear()
+
+
+registry = StatsRegistry()
+
+
+def start_run(source, repo):
+    """Return a RunStats for a new rendering, or NULL_STATS while collection is disabled."""
+    if not _enabled:
+        return NULL_STATS
+    return RunStats(source, repo)
+
+
+def tracked(run, chunks):
+    """Yield ``chunks``, finishing ``run`` once they are exhausted, fail or are closed early."""
+    try:
+        yield from chunks
+    except GeneratorExit:
+        run.finish('closed before the end')
+        raise
+    except BaseException as e:
+        run.finish(e)
+        raise
+    run.finish()
+
+
+if os.getenv('REPO2LLM_STATS', '') not in ('', '0'):
+    enable(os.getenv('REPO2LLM_STATS_LOG'))
@@ -0,0 +1,29 @@
+import posixpath
+from collections import defaultdict, namedtuple
+
+# One entry of a repository tree listing. ``type`` is 'tree', 'blob' or 'commit'
+# (submodule); ``size`` is None when the source does not report it.
+TreeEntry = namedtuple('TreeEntry', ['path', 'type', 'size', 'sha'])
+
+
+def walk_order(entries):
+    """
+    Order flat tree entries the way the iterative directory traversal visits them.
+
+    Entries of a directory keep their listing order; subdirectories are
+    visited last-in first-out, exactly like the ``dirs_to_visit`` stack the
+    processors used when they listed one directory per API call.
+    """
+    children = defaultdict(list)
+    for entry in entries:
+        children[posixpath.dirname(entry.path)].append(entry)
+
+    ordered = []
+    dirs_to_visit = [""]
+    while dirs_to_visit:
+        path = dirs_to_visit.pop()
+        for entry in children.get(path, ()):
+            ordered.append(entry)
+            if entry.type == 'tree':
+                dirs_to_visit.append(entry.path)
+    return ordered
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from fake_forge import FakeForge
+
+
+def git(repo_path, *args):
+    """Run a git command in ``repo_path`` and return its output."""
+    result = subprocess.run(['git', '-C', repo_path, *args], check=True, capture_output=True)
+    return result.stdout.decode().strip()
+
+
+def write(repo_path, files):
+    for path, content in files.items():
+        full_path = os.path.join(repo_path, *path.split('/'))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(content if isinstance(content, bytes) else content.encode())
+
+
+def commit(repo_path, files, message):
+    """Write ``files`` and commit everything, returning the new commit SHA."""
+    write(repo_path, files)
+    git(repo_path, 'add', '-A')
+    git(repo_path, 'commit', '-q', '-m', message)
+    return git(repo_path, 'rev-parse', 'HEAD')
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep indexes, caches and mirrors of every test in its own directory."""
+    path = tmp_path / 'cache'
+    monkeypatch.setenv('REPO2LLM_CACHE_DIR', str(path))
+    return path
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """An empty repository on branch 'main'."""
+    repo_path = str(tmp_path / 'repo')
+    os.makedirs(repo_path)
+    git(repo_path, 'init', '-q', '-b', 'main')
+    git(repo_path, 'config', 'user.email', 'dev@example.com')
+    git(repo_path, 'config', 'user.name', 'dev')
+    git(repo_path, 'config', 'commit.gpgsign', 'false')
+    return repo_path
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """
+    Start a FakeForge for ``{ref: {path: bytes}}`` and point the GitHub and
+    GitLab processors at it; every forge started is stopped after the test.
+    """
+    forges = []
+
+    def start(refs, **options):
+        forge = FakeForge(refs, **options)
+        forge.start()
+        forges.append(forge)
+        monkeypatch.setenv('GITHUB_TOKEN', 'test')
+        monkeypatch.setenv('GITLAB_TOKEN', 'test')
+        monkeypatch.setenv('GITHUB_API_URL', forge.github_url)
+        monkeypatch.setenv('GITLAB_URL', forge.gitlab_url)
+        return forge
+
+    yield start
+    for forge in forges:
+        forge.stop()
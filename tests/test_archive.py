@@ -0,0 +1,50 @@
+import re
+
+import pytest
+
+from repo2llm.blobcache import BlobCache
+from repo2llm.githubrepo2txt import GithubRepo2Txt
+from repo2llm.gitlibrepo2txt import GitlabRepo2Txt
+
+from fake_forge import GITHUB_REPO, GITLAB_PROJECT, Gitlink
+
+FILES = {
+    'README.md': b'# demo\n',
+    'a/z.py': b'z = 1\n',
+    'b/y.py': b'y = 2\n',
+    'logo.png': b'\x89PNG\r\n',
+    'vendor/lib': Gitlink('1' * 40),
+}
+
+
+def records(kind, forge, tmp_path, mode):
+    if kind == 'github':
+        processor = GithubRepo2Txt(blob_cache=BlobCache(str(tmp_path / mode)))
+        url = f"https://github.com/{GITHUB_REPO}"
+    else:
+        processor = GitlabRepo2Txt(blob_cache=BlobCache(str(tmp_path / mode)))
+        url = f"{forge.gitlab_url}/{GITLAB_PROJECT}"
+    content = processor.process_repo(url, 'master', mode)[1]
+    return re.findall(r'^File: (.*)\n(Content.*)$', content, re.M)
+
+
+@pytest.mark.parametrize('kind', ['github', 'gitlab'])
+def test_archive_renders_the_same_records_as_api(kind, serve, tmp_path):
+    forge = serve({'master': FILES})
+    api = records(kind, forge, tmp_path, 'api')
+    archive = records(kind, forge, tmp_path, 'archive')
+    assert ('/vendor/lib', 'Content: Skipped submodule') in archive
+    assert ('/logo.png', 'Content: Skipped binary file') in archive
+    assert sorted(archive) == sorted(api)
+
+
+@pytest.mark.parametrize('kind', ['github', 'gitlab'])
+def test_archive_keeps_archive_order(kind, serve, tmp_path):
+    forge = serve({'master': FILES})
+    api = [path for path, _ in records(kind, forge, tmp_path, 'api')]
+    archive = [path for path, _ in records(kind, forge, tmp_path, 'archive')]
+    # The listing visits subdirectories last in, first out; the archive
+    # streams files as stored, and submodules come last
+    assert api.index('/b/y.py') < api.index('/a/z.py')
+    assert archive.index('/a/z.py') < archive.index('/b/y.py')
+    assert archive[-1] == '/vendor/lib'
@@ -0,0 +1,38 @@
+import pytest
+
+from repo2llm.binaryfilter import is_binary_content, is_binary_name
+
+
+@pytest.mark.parametrize('path', [
+    'logo.png', 'dist/release.TAR.GZ', 'archive.tar.gz', 'backup.gz', 'src/.DS_Store',
+    'web/package-lock.json', 'bin/App.EXE',
+])
+def test_binary_names(path):
+    assert is_binary_name(path)
+
+
+@pytest.mark.parametrize('path', [
+    'main.py', 'README', 'notes.tar.md', 'gz', 'src/package.json', 'docs/v1.2.txt', '.gitignore',
+])
+def test_text_names(path):
+    assert not is_binary_name(path)
+
+
+def test_nul_byte_is_binary():
+    assert is_binary_content(b'text\0more')
+
+
+def test_text_content():
+    assert not is_binary_content(b'')
+    assert not is_binary_content('print("héllo")\n'.encode('utf-8'))
+    # Latin-1 text is not valid UTF-8 but has no control bytes
+    assert not is_binary_content('café déjà vu\n'.encode('latin-1'))
+
+
+def test_utf8_cut_at_prefix_boundary():
+    head = ('a' * 100 + 'é').encode('utf-8')[:-1]
+    assert not is_binary_content(head)
+
+
+def test_control_bytes_are_binary():
+    assert is_binary_content(bytes(range(1, 32)) * 4 + b'\xff')
@@ -0,0 +1,52 @@
+from repo2llm.blobcache import BlobCache
+from repo2llm.budget import Budget
+from repo2llm.githubrepo2txt import GithubRepo2Txt
+from repo2llm.localrepo2txt import LocalRepo2Txt
+
+from conftest import write
+from fake_forge import GITHUB_REPO
+
+
+def test_clip_cuts_at_line_break():
+    budget = Budget(max_bytes=400)
+    text = budget.clip(''.join(f"line {i}\n" for i in range(100)), 'README')
+    assert text.startswith('line 0\n') and text.endswith('shown to stay within 400 bytes]\n')
+    assert '\n... [README cut short: ' in text
+    assert budget.used <= budget.limit
+
+
+def test_clip_lines_keeps_what_fits():
+    budget = Budget(max_bytes=300)
+    lines = budget.clip_lines(f"./dir/file{i}.py\n" for i in range(100))
+    assert lines[0] == './dir/file0.py\n'
+    assert lines[-1].startswith(f"... [structure cut short: {len(lines) - 1} of 100 lines")
+    assert budget.used <= budget.limit
+
+
+def test_inactive_budget_keeps_everything():
+    budget = Budget()
+    assert budget.clip('x\n' * 1000, 'README') == 'x\n' * 1000
+    assert len(budget.clip_lines(['a\n'] * 1000)) == 1000
+    assert budget.footer() == ''
+
+
+def test_overrun_is_reported():
+    budget = Budget(max_bytes=100)
+    budget.reserve(500)
+    assert budget.footer().startswith('Output exceeds 100 bytes by about')
+
+
+def test_local_structure_stays_within_budget(tmp_path):
+    repo_path = str(tmp_path / 'repo')
+    write(repo_path, {f"pkg{i % 20}/module{i}.py": f"value = {i}\n" for i in range(2000)})
+    _, content = LocalRepo2Txt(use_index=False).process_repo(repo_path, max_bytes=6000)
+    assert len(content.encode('utf-8')) <= 6000
+    assert 'structure cut short' in content
+
+
+def test_remote_readme_stays_within_budget(serve, tmp_path):
+    serve({'master': {'README.md': b'readme line\n' * 5000, 'src/app.py': b'print(1)\n'}})
+    processor = GithubRepo2Txt(blob_cache=BlobCache(str(tmp_path / 'blobs')))
+    _, content = processor.process_repo(f"https://github.com/{GITHUB_REPO}", 'master', 'api', max_bytes=4000)
+    assert len(content.encode('utf-8')) <= 4000
+    assert 'README cut short' in content
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from repo2llm.fetcher import BlobFetcher, RateLimiter, make_session
+from repo2llm.localrepo2txt import LocalRepo2Txt
+from repo2llm.runner import CancelToken, Cancelled
+
+from conftest import commit
+
+
+@pytest.fixture
+def cancelled():
+    token = CancelToken()
+    token.cancel()
+    return token
+
+
+def test_scan_stops_when_cancelled(git_repo, cancelled):
+    commit(git_repo, {'README.md': '# demo\n', 'src/app.py': 'print(1)\n'}, 'first')
+    with pytest.raises(Cancelled):
+        LocalRepo2Txt(use_index=False, cancel=cancelled).scan(git_repo)
+
+
+def test_ref_stops_when_cancelled(git_repo, cancelled):
+    commit(git_repo, {'README.md': '# demo\n'}, 'first')
+    with pytest.raises(Cancelled):
+        list(LocalRepo2Txt(use_index=False, cancel=cancelled).iter_repo(git_repo, ref='main'))
+
+
+def test_render_without_cancel(git_repo):
+    commit(git_repo, {'README.md': '# demo\n'}, 'first')
+    token = CancelToken()
+    _, content = LocalRepo2Txt(use_index=False, cancel=token).process_repo(git_repo, ref='main')
+    assert '# demo' in content
+
+
+def test_rate_limit_wait_ends_on_cancel():
+    limiter = RateLimiter()
+    limiter.pause(300)
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(Cancelled):
+        limiter.wait(token)
+    assert time.monotonic() - start < 5
+
+
+def test_fetch_stops_while_rate_limited(cancelled):
+    limiter = RateLimiter()
+    limiter.pause(300)
+    fetcher = BlobFetcher(make_session(), limiter=limiter, cancel=cancelled)
+    start = time.monotonic()
+    with pytest.raises(Cancelled):
+        fetcher.fetch('http://127.0.0.1:9/never-sent')
+    assert time.monotonic() - start < 5
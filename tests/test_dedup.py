@@ -0,0 +1,66 @@
+from collections import namedtuple
+
+from repo2llm.dedup import DUPLICATE_NOTE, Deduplicator, duplicate_of, find_copies
+from repo2llm.render import FileRecord, format_record
+from repo2llm.stats import RunStats
+
+Entry = namedtuple('Entry', ['path', 'key'])
+
+BODY = 'def main():\n    return 42\n' * 20
+
+
+def test_find_copies():
+    entries = [Entry('a', 'x'), Entry('b', None), Entry('c', 'x'), Entry('d', 'y'), Entry('e', 'x')]
+    assert find_copies(entries, lambda entry: entry.key) == {'c': 'a', 'e': 'a'}
+
+
+def test_duplicate_of():
+    assert duplicate_of(DUPLICATE_NOTE.format(path='src/a.py')) == 'src/a.py'
+    assert duplicate_of('Skipped: binary file') is None
+    assert duplicate_of(None) is None
+
+
+def test_later_copy_becomes_reference():
+    stats = RunStats('local', 'repo')
+    dedup = Deduplicator(stats=stats)
+    first = FileRecord('a.py', BODY)
+    copy = FileRecord('vendored/a.py', BODY)
+    assert dedup.apply(first) is first
+    reference = dedup.apply(copy)
+    assert reference == FileRecord('vendored/a.py', note='Identical to a.py')
+    saved = len(format_record(copy)) - len(format_record(reference))
+    assert dedup.files == 1
+    assert dedup.saved == saved == stats.counters['bytes_deduplicated']
+    assert dedup.footer() == f"Deduplicated 1 file(s) identical to a file rendered earlier, saving {saved} bytes\n\n"
+
+
+def test_reference_only_when_shorter():
+    dedup = Deduplicator()
+    first = FileRecord('a', 'x')
+    copy = FileRecord('deeply/nested/directory/b', 'x')
+    assert dedup.apply(first) is first
+    assert dedup.apply(copy) is copy
+    assert dedup.files == 0 and dedup.saved == 0
+    assert dedup.footer() == ''
+
+
+def test_keys_identify_bodies():
+    dedup = Deduplicator(keys={'a.py': 'sha1', 'b.py': 'sha1', 'c.py': 'sha2'})
+    dedup.apply(FileRecord('a.py', BODY))
+    assert dedup.apply(FileRecord('b.py', BODY + 'ignored')).note == 'Identical to a.py'
+    assert dedup.apply(FileRecord('c.py', BODY)).text == BODY
+
+
+def test_label_separates_bodies():
+    dedup = Deduplicator()
+    dedup.apply(FileRecord('a.txt', BODY))
+    excerpt = FileRecord('b.txt', BODY, label='Content (excerpt)')
+    assert dedup.apply(excerpt) is excerpt
+
+
+def test_notes_are_not_deduplicated():
+    dedup = Deduplicator()
+    note = FileRecord('big.bin', note='Skipped: binary file')
+    assert dedup.apply(note) is note
+    assert dedup.apply(note) is note
+    assert dedup.files == 0
@@ -0,0 +1,74 @@
+import os
+
+from repo2llm.delta import MAX_LISTED, TreeDiff, diff_trees, diff_worktree
+from repo2llm.gitobjects import list_tree
+from repo2llm.treewalk import TreeEntry
+
+from conftest import commit, write
+
+
+def tree(files):
+    return [TreeEntry(path, 'blob', 1, sha) for path, sha in files.items()]
+
+
+def test_diff_trees_by_path_and_sha():
+    base = tree({'keep.py': 'a', 'edit.py': 'b', 'gone.py': 'c', 'old.py': 'd'})
+    head = tree({'keep.py': 'a', 'edit.py': 'B', 'new.py': 'e', 'moved/old.py': 'd'})
+    head.append(TreeEntry('moved', 'tree', None, 'f'))
+    diff = diff_trees(base, head)
+    assert diff.added == ['new.py']
+    assert diff.modified == ['edit.py']
+    assert diff.deleted == ['gone.py']
+    assert diff.renamed == [('old.py', 'moved/old.py')]
+    assert diff.changed == {'new.py', 'edit.py'}
+
+
+def test_diff_trees_pairs_each_deleted_blob_once():
+    base = tree({'a.txt': 'x', 'b.txt': 'x'})
+    head = tree({'c.txt': 'x', 'd.txt': 'x', 'e.txt': 'x'})
+    diff = diff_trees(base, head)
+    assert diff.renamed == [('a.txt', 'c.txt'), ('b.txt', 'd.txt')]
+    assert diff.added == ['e.txt']
+    assert diff.deleted == []
+
+
+def test_summary_caps_listing():
+    diff = TreeDiff(added=['n'], deleted=[f"f{i:03}" for i in range(MAX_LISTED + 5)])
+    summary = diff.summary('v1', 'v2', display=lambda path: f"/{path}")
+    lines = summary.splitlines()
+    assert lines[0] == f"Changes from v1 to v2: 1 added, 0 modified, 0 renamed, {MAX_LISTED + 5} deleted"
+    assert lines[1] == 'Deleted: /f000'
+    assert lines[-2:] == ['... and 5 more', '']
+    assert summary.endswith('\n\n')
+
+
+def test_diff_worktree(git_repo):
+    base = commit(git_repo, {'keep.py': 'same\n', 'edit.py': 'v1\n', 'gone.py': 'bye\n', 'old.py': 'moved\n'},
+                  'base')
+    write(git_repo, {'edit.py': 'v2\n', 'new.py': 'hello\n', 'sub/old.py': 'moved\n'})
+    os.remove(os.path.join(git_repo, 'gone.py'))
+    os.remove(os.path.join(git_repo, 'old.py'))
+    files = ['edit.py', 'keep.py', 'new.py', 'sub/old.py']
+    diff = diff_worktree(git_repo, base, list_tree(git_repo, base), files)
+    assert diff.added == ['new.py']
+    assert diff.modified == ['edit.py']
+    assert diff.deleted == ['gone.py']
+    assert diff.renamed == [('old.py', 'sub/old.py')]
+
+
+def test_diff_worktree_counts_committed_changes(git_repo):
+    base = commit(git_repo, {'a.py': '1\n'}, 'base')
+    commit(git_repo, {'a.py': '2\n', 'b.py': 'b\n'}, 'next')
+    diff = diff_worktree(git_repo, base, list_tree(git_repo, base), ['a.py', 'b.py'])
+    assert diff.added == ['b.py']
+    assert diff.modified == ['a.py']
+    assert diff.deleted == [] and diff.renamed == []
+
+
+def test_diff_worktree_ignores_unscanned_files(git_repo):
+    base = commit(git_repo, {'a.py': '1\n', 'skip.log': 'x\n'}, 'base')
+    write(git_repo, {'skip.log': 'changed\n'})
+    base_entries = [entry for entry in list_tree(git_repo, base) if entry.path != 'skip.log']
+    diff = diff_worktree(git_repo, base, base_entries, ['a.py'])
+    assert diff.changed == set()
+    assert diff.deleted == []
@@ -0,0 +1,84 @@
+import pytest
+
+from repo2llm.dump import INDEX_SUFFIX, DumpReader, save_chunks, write_indexed
+
+CHUNKS = [
+    'Repository structure:\n/src\n\n',
+    'File: /src/app.py\nContent:\nprint(1)\n\n',
+    'File: /src/pkg/util.py\nContent:\n' + 'x = 1\n' * 200 + '\n\n',
+    'File: /src2/other.py\nContent:\nother\n\n',
+    'File: /vendor/util.py\nContent: Identical to /src/pkg/util.py\n\n',
+    'File: /logo.png\nContent: Skipped: binary file\n\n',
+    'Deduplicated 1 file(s)\n\n',
+]
+
+
+@pytest.fixture(params=[False, True], ids=['plain', 'compressed'])
+def dump(request, tmp_path):
+    path = write_indexed(CHUNKS, str(tmp_path / 'repo_contents.txt'), compress=request.param)
+    with DumpReader(path) as reader:
+        yield reader
+
+
+def test_plain_dump_is_text_dump(tmp_path):
+    path = write_indexed(CHUNKS, str(tmp_path / 'repo_contents.txt'))
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == ''.join(CHUNKS)
+
+
+def test_get(dump):
+    assert dump.files == 5
+    assert dump.get('src/app.py') == CHUNKS[1]
+    assert dump.get('./src/app.py') == dump.get('/src/app.py') == CHUNKS[1]
+    assert dump.get('logo.png') == CHUNKS[5]
+    assert dump.get('src/missing.py') is None
+    assert dump.read_all() == ''.join(CHUNKS)
+
+
+def test_get_resolves_duplicates(dump):
+    assert dump.get('vendor/util.py') == CHUNKS[2].replace('/src/pkg/util.py', '/vendor/util.py')
+    info = dump.info('vendor/util.py')
+    assert info['same_as'] == 'src/pkg/util.py'
+    assert info['note'] is None
+
+
+def test_prefix_lookup_stays_inside_directory(dump):
+    assert dump.paths('src') == ['src/app.py', 'src/pkg/util.py']
+    assert dump.paths('src/') == dump.paths('/src')
+    assert list(dump.iter_prefix('src/pkg')) == [CHUNKS[2]]
+    assert dump.paths('sr') == []
+    assert dump.paths() == ['src/app.py', 'src/pkg/util.py', 'src2/other.py', 'vendor/util.py', 'logo.png']
+
+
+def test_compressed_records_are_smaller(tmp_path):
+    path = write_indexed(CHUNKS, str(tmp_path / 'repo_contents.dump'), compress=True)
+    with DumpReader(path) as reader:
+        info = reader.info('src/pkg/util.py')
+        assert info['compressed'] and info['length'] < info['size']
+        assert not reader.info('src/app.py')['compressed']
+
+
+def test_reader_rejects_changed_or_missing_dump(tmp_path):
+    path = write_indexed(CHUNKS, str(tmp_path / 'repo_contents.txt'))
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('more\n')
+    with pytest.raises(ValueError, match='changed since it was indexed'):
+        DumpReader(path)
+    with pytest.raises(ValueError, match='No index found'):
+        DumpReader(str(tmp_path / 'other.txt'))
+
+
+def test_reader_opens_by_index_path(tmp_path):
+    path = write_indexed(CHUNKS, str(tmp_path / 'repo_contents.txt'))
+    with DumpReader(path + INDEX_SUFFIX) as reader:
+        assert reader.path == path
+
+
+def test_save_chunks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert save_chunks(CHUNKS, 'repo') == 'repo_contents.txt'
+    assert not (tmp_path / ('repo_contents.txt' + INDEX_SUFFIX)).exists()
+    assert save_chunks(CHUNKS, 'repo', 'indexed', compress=True) == 'repo_contents.dump'
+    assert (tmp_path / ('repo_contents.dump' + INDEX_SUFFIX)).exists()
+    with pytest.raises(ValueError, match='Unknown output format'):
+        save_chunks(CHUNKS, 'repo', 'zip')
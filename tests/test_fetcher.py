@@ -0,0 +1,137 @@
+import time
+
+import pytest
+
+from repo2llm.blobcache import BlobCache
+from repo2llm.fetcher import BlobFetcher, FetchError, RateLimiter, TooLargeError, make_session
+from repo2llm.stats import RunStats
+
+from fake_forge import GITHUB_REPO, git_blob_sha
+
+RAW = {'Accept': 'application/vnd.github.raw'}
+BODY = b''.join(b'line %d\n' % i for i in range(5000))
+FILES = {f"src/f{i}.txt": b'file %d\n' % i for i in range(12)}
+
+
+def blob_url(forge, data):
+    return f"{forge.github_url}/repos/{GITHUB_REPO}/git/blobs/{git_blob_sha(data)}"
+
+
+def fetcher(**options):
+    options.setdefault('backoff_base', 0.01)
+    blob_fetcher = BlobFetcher(make_session(RAW), **options)
+    blob_fetcher.stats = RunStats('github', GITHUB_REPO)
+    return blob_fetcher
+
+
+def test_transient_failures_are_retried(serve):
+    forge = serve({'master': FILES}, failure_rate=0.4, seed=1)
+    blob_fetcher = fetcher(max_retries=20)
+    datas = list(FILES.values())
+    for data in datas:
+        assert blob_fetcher.fetch(blob_url(forge, data)) == data
+    assert blob_fetcher.stats.counters['retries'] > 0
+    assert forge.stats()['requests'] == len(datas) + blob_fetcher.stats.counters['retries']
+
+
+def test_retries_run_out(serve):
+    forge = serve({'master': FILES}, failure_rate=1.0)
+    blob_fetcher = fetcher(max_retries=2)
+    with pytest.raises(FetchError) as raised:
+        blob_fetcher.fetch(blob_url(forge, FILES['src/f0.txt']))
+    assert raised.value.status == 502
+    assert forge.stats()['requests'] == 3
+
+
+def test_permanent_errors_are_not_retried(serve):
+    forge = serve({'master': FILES})
+    with pytest.raises(FetchError) as raised:
+        fetcher().fetch(f"{forge.github_url}/repos/{GITHUB_REPO}/git/blobs/{'0' * 40}")
+    assert raised.value.status == 404
+    assert forge.stats()['requests'] == 1
+
+
+def test_revalidation_reuses_body_on_304(serve):
+    forge = serve({'master': FILES})
+    blob_fetcher = fetcher()
+    url = f"{forge.github_url}/repos/{GITHUB_REPO}/commits/master"
+    headers = {'Accept': 'application/vnd.github.sha'}
+    first = blob_fetcher.fetch_revalidated(url, headers=headers)
+    bytes_sent = forge.stats()['bytes_sent']
+    assert blob_fetcher.fetch_revalidated(url, headers=headers) == first
+    assert forge.stats()['bytes_sent'] == bytes_sent
+    assert forge.stats()['requests'] == 2
+
+
+def test_excerpt_reads_only_ranges(serve):
+    forge = serve({'master': {'big.txt': BODY}})
+    head, tail, size = fetcher().fetch_excerpt(blob_url(forge, BODY), 100, 50)
+    assert (head, tail, size) == (BODY[:100], BODY[-50:], len(BODY))
+    assert forge.stats()['bytes_sent'] == 150
+
+
+def test_excerpt_of_small_body_has_no_tail(serve):
+    data = b'tiny\n'
+    forge = serve({'master': {'tiny.txt': data}})
+    assert fetcher().fetch_excerpt(blob_url(forge, data), 100, 50) == (data, b'', len(data))
+    assert forge.stats()['requests'] == 1
+
+
+def test_max_size_is_checked_before_reading(serve):
+    forge = serve({'master': {'big.txt': BODY}})
+    blob_fetcher = fetcher()
+    with pytest.raises(TooLargeError) as raised:
+        blob_fetcher.fetch(blob_url(forge, BODY), max_size=1000)
+    assert raised.value.size == len(BODY)
+    assert blob_fetcher.fetch(blob_url(forge, BODY), max_size=len(BODY)) == BODY
+
+
+def test_reject_abandons_download(serve):
+    forge = serve({'master': {'big.txt': BODY}})
+    blob_fetcher = fetcher()
+    assert blob_fetcher.fetch(blob_url(forge, BODY), reject=lambda head: head.startswith(b'line 0')) is None
+    assert blob_fetcher.stats.counters['bytes_fetched'] == 0
+
+
+def test_cache_serves_keyed_bodies(serve, tmp_path):
+    data = FILES['src/f1.txt']
+    forge = serve({'master': FILES})
+    blob_fetcher = fetcher(cache=BlobCache(str(tmp_path / 'blobs')))
+    url = blob_url(forge, data)
+    assert blob_fetcher.fetch(url, key=git_blob_sha(data)) == data
+    assert blob_fetcher.fetch(url, key=git_blob_sha(data)) == data
+    assert forge.stats()['requests'] == 1
+    assert blob_fetcher.stats.counters['cache_hits'] == 1
+
+
+def test_rate_limit_pauses_until_reset(serve):
+    forge = serve({'master': FILES}, rate_limit=3, rate_window=1.0)
+    # Never wait ahead of the limit, so the 403 response is what pauses the fetcher
+    blob_fetcher = fetcher(limiter=RateLimiter(low_watermark=-1))
+    start = time.monotonic()
+    for data in list(FILES.values())[:4]:
+        assert blob_fetcher.fetch(blob_url(forge, data)) == data
+    assert forge.stats()['rate_limited'] >= 1
+    assert blob_fetcher.stats.counters['rate_limited'] == forge.stats()['rate_limited']
+    assert time.monotonic() - start < 10
+
+
+def test_low_watermark_waits_before_limit(serve):
+    forge = serve({'master': FILES}, rate_limit=3, rate_window=1.0)
+    blob_fetcher = fetcher(limiter=RateLimiter(low_watermark=1))
+    for data in list(FILES.values())[:4]:
+        assert blob_fetcher.fetch(blob_url(forge, data)) == data
+    assert forge.stats()['rate_limited'] == 0
+
+
+def test_fetch_all_keeps_input_order(serve):
+    forge = serve({'master': FILES}, latency=0.01, failure_rate=0.2, seed=3)
+    paths = sorted(FILES) + ['missing', 'skipped']
+    urls = {path: blob_url(forge, data) for path, data in FILES.items()}
+    urls['missing'] = f"{forge.github_url}/repos/{GITHUB_REPO}/git/blobs/{'0' * 40}"
+    results = list(fetcher(max_workers=4, max_retries=20).fetch_all(paths, urls.get))
+    assert [item for item, _, _ in results] == paths
+    for path, data, error in results[:len(FILES)]:
+        assert (data, error) == (FILES[path], None)
+    assert results[-2][1] is None and results[-2][2].status == 404
+    assert results[-1][1:] == (None, None)
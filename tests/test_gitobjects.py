@@ -0,0 +1,102 @@
+import pytest
+
+from repo2llm.gitobjects import CatFile, GitError, list_tree, resolve_commit
+from repo2llm.localrepo2txt import LocalRepo2Txt
+
+from conftest import commit, git, write
+
+FIRST = {
+    'README.md': '# demo\n',
+    'src/app.py': 'print(1)\n',
+    'src/pkg/util.py': 'x = 1\n',
+    'logo.png': b'\x89PNG\r\n\x1a\n\0\0',
+}
+
+
+@pytest.fixture
+def two_commits(git_repo):
+    first = commit(git_repo, FIRST, 'first')
+    git(git_repo, 'tag', 'v1')
+    git(git_repo, 'rm', '-q', 'src/pkg/util.py')
+    second = commit(git_repo, {'src/app.py': 'print(2)\n', 'src/new.py': 'y = 2\n'}, 'second')
+    # Uncommitted changes never show up in a ref rendering
+    write(git_repo, {'src/app.py': 'print(3)\n', 'untracked.py': 'z = 3\n'})
+    return git_repo, first, second
+
+
+def test_resolve_commit(two_commits):
+    repo_path, first, second = two_commits
+    assert resolve_commit(repo_path, 'v1') == first
+    assert resolve_commit(repo_path, 'main') == second
+    assert resolve_commit(repo_path, 'HEAD~1') == first
+
+
+def test_resolve_unknown_ref(two_commits):
+    repo_path, _, _ = two_commits
+    with pytest.raises(GitError, match="Unknown ref 'nope'"):
+        resolve_commit(repo_path, 'nope')
+
+
+def test_list_tree(two_commits):
+    repo_path, first, second = two_commits
+    entries = {entry.path: entry for entry in list_tree(repo_path, first)}
+    assert entries['src'].type == 'tree'
+    assert entries['src/app.py'].type == 'blob'
+    assert entries['src/app.py'].size == len('print(1)\n')
+    assert 'src/new.py' not in entries
+    paths = [entry.path for entry in list_tree(repo_path, second)]
+    assert 'src/new.py' in paths and 'src/pkg/util.py' not in paths
+
+
+def test_cat_file_reads_blobs_in_order(two_commits):
+    repo_path, first, _ = two_commits
+    entries = {entry.path: entry for entry in list_tree(repo_path, first)}
+    shas = [entries['src/pkg/util.py'].sha, 'f' * 40, entries['src/app.py'].sha]
+    results = list(CatFile(repo_path).read(shas))
+    assert results[0][2] == b'x = 1\n' and results[2][2] == b'print(1)\n'
+    # A missing object has no size and does not stop the batch
+    assert results[1][1] is None
+
+
+def test_cat_file_excerpt(git_repo):
+    body = ''.join(f"line {i}\n" for i in range(1000)).encode()
+    sha = commit(git_repo, {'big.txt': body}, 'big')
+    blob, = [entry.sha for entry in list_tree(git_repo, sha) if entry.path == 'big.txt']
+    (_, size, head, tail), = CatFile(git_repo).read([blob], max_bytes=100, head_bytes=64, tail_bytes=32)
+    assert size == len(body)
+    assert head == body[:64] and tail == body[-32:]
+
+
+def test_render_ref(two_commits):
+    repo_path, _, _ = two_commits
+    processor = LocalRepo2Txt(use_index=False)
+    _, old = processor.process_repo(repo_path, ref='v1')
+    assert 'print(1)' in old and 'x = 1' in old
+    assert 'src/new.py' not in old
+    assert 'Skipped binary file' in old
+    _, new = processor.process_repo(repo_path, ref='HEAD')
+    assert 'print(2)' in new and 'y = 2' in new
+    assert 'print(3)' not in new and 'untracked.py' not in new
+    assert 'src/pkg/util.py' not in new
+
+
+def test_render_ref_matches_checkout(two_commits):
+    repo_path, _, _ = two_commits
+    git(repo_path, 'stash', '-u', '-q')
+    processor = LocalRepo2Txt(use_index=False, dedup=False)
+    _, from_ref = processor.process_repo(repo_path, ref='main')
+    _, from_worktree = processor.process_repo(repo_path)
+    files = lambda content: sorted(part for part in content.split('File: ')[1:])
+    assert files(from_ref) == files(from_worktree)
+
+
+def test_render_ref_with_filters(two_commits):
+    repo_path, _, _ = two_commits
+    _, content = LocalRepo2Txt(use_index=False).process_repo(repo_path, include=['src/**'], ref='v1')
+    assert 'util.py' in content and 'README' not in content
+
+
+def test_render_unknown_ref(two_commits):
+    repo_path, _, _ = two_commits
+    with pytest.raises(GitError, match="Unknown ref 'nope'"):
+        LocalRepo2Txt(use_index=False).process_repo(repo_path, ref='nope')
@@ -0,0 +1,90 @@
+from repo2llm.ignore import PathFilter
+from repo2llm.treewalk import TreeEntry
+
+from conftest import write
+
+
+def chain(path_filter, repo, *dirs):
+    rules = ()
+    for rel_dir in ('',) + dirs:
+        rules = path_filter.load_gitignore(str(repo / rel_dir), rel_dir, rules)
+    return rules
+
+
+def test_negation_keeps_file(tmp_path):
+    write(tmp_path, {'.gitignore': '*.log\n!keep.log\n'})
+    path_filter = PathFilter()
+    rules = chain(path_filter, tmp_path)
+    assert path_filter.is_excluded('debug.log', False, rules)
+    assert not path_filter.is_excluded('keep.log', False, rules)
+    assert not path_filter.is_excluded('app.py', False, rules)
+
+
+def test_nested_gitignore_overrides_parent(tmp_path):
+    write(tmp_path, {
+        '.gitignore': '*.log\nbuild/\n',
+        'sub/.gitignore': '!trace.log\n',
+    })
+    path_filter = PathFilter()
+    rules = chain(path_filter, tmp_path, 'sub/')
+    assert len(rules) == 2
+    assert not path_filter.is_excluded('sub/trace.log', False, rules)
+    assert path_filter.is_excluded('sub/other.log', False, rules)
+    assert path_filter.is_excluded('sub/build', True, rules)
+    assert not path_filter.is_excluded('sub/build', False, rules)
+
+
+def test_nested_rules_are_relative_to_their_directory(tmp_path):
+    write(tmp_path, {'sub/.gitignore': '/local.txt\n'})
+    path_filter = PathFilter()
+    rules = chain(path_filter, tmp_path, 'sub/')
+    assert path_filter.is_excluded('sub/local.txt', False, rules)
+    assert not path_filter.is_excluded('sub/deeper/local.txt', False, rules)
+    assert not path_filter.is_excluded('local.txt', False, chain(path_filter, tmp_path))
+
+
+def test_gitignore_without_rules_adds_no_link(tmp_path):
+    write(tmp_path, {'.gitignore': '# nothing here\n\n'})
+    path_filter = PathFilter()
+    assert chain(path_filter, tmp_path) == ()
+    assert chain(path_filter, tmp_path / 'missing') == ()
+
+
+def test_use_gitignore_off(tmp_path):
+    write(tmp_path, {'.gitignore': '*.log\n'})
+    path_filter = PathFilter(use_gitignore=False)
+    rules = chain(path_filter, tmp_path)
+    assert rules == ()
+    assert not path_filter.is_excluded('debug.log', False, rules)
+
+
+def test_exclude_wins_over_gitignore_negation(tmp_path):
+    write(tmp_path, {'.gitignore': '!keep.log\n'})
+    path_filter = PathFilter(exclude=['*.log'])
+    assert path_filter.is_excluded('keep.log', False, chain(path_filter, tmp_path))
+
+
+def test_filter_entries_prunes_excluded_directories():
+    entries = [
+        TreeEntry('docs', 'tree', None, 'a'),
+        TreeEntry('docs/guide.md', 'blob', 5, 'b'),
+        TreeEntry('docs/img', 'tree', None, 'c'),
+        TreeEntry('docs/img/logo.png', 'blob', 5, 'd'),
+        TreeEntry('src', 'tree', None, 'e'),
+        TreeEntry('src/app.py', 'blob', 5, 'f'),
+    ]
+    assert PathFilter().filter_entries(entries) is entries
+    kept = PathFilter(exclude=['docs/']).filter_entries(entries)
+    assert [entry.path for entry in kept] == ['src', 'src/app.py']
+
+
+def test_filter_entries_include_drops_empty_directories():
+    entries = [
+        TreeEntry('docs', 'tree', None, 'a'),
+        TreeEntry('docs/guide.md', 'blob', 5, 'b'),
+        TreeEntry('src', 'tree', None, 'e'),
+        TreeEntry('src/pkg', 'tree', None, 'g'),
+        TreeEntry('src/pkg/app.py', 'blob', 5, 'f'),
+    ]
+    kept = PathFilter(include=['*.py']).filter_entries(entries)
+    assert [entry.path for entry in kept] == ['src', 'src/pkg', 'src/pkg/app.py']
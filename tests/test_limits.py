@@ -0,0 +1,76 @@
+import pytest
+
+from repo2llm.limits import EXCERPT_OVERHEAD, ReadLimits
+
+
+def test_admit_stops_at_repository_cap():
+    limits = ReadLimits(max_repo_bytes=100)
+    assert limits.admit('a', 60)
+    assert limits.admit('b', 40)
+    assert not limits.admit('c', 1)
+    assert limits.exhausted
+    assert limits.used == 100
+    assert limits.skipped == {'c'}
+
+
+def test_admit_skips_everything_after_first_miss():
+    limits = ReadLimits(max_repo_bytes=100)
+    assert limits.admit('big', 60)
+    assert not limits.admit('bigger', 50)
+    # Would fit, but files are charged in rendering order
+    assert not limits.admit('small', 10)
+    assert limits.skipped == {'bigger', 'small'}
+
+
+def test_admit_is_idempotent_per_key():
+    limits = ReadLimits(max_repo_bytes=100)
+    assert limits.admit('README.md', 80)
+    assert limits.admit('README.md', 80)
+    assert limits.used == 80
+    assert limits.admit('app.py', 20)
+
+
+def test_admit_charges_excerpt_size_of_oversized_files():
+    limits = ReadLimits(max_file_bytes=1000, max_repo_bytes=500, head_bytes=100, tail_bytes=50)
+    assert limits.is_oversized(10 ** 9)
+    assert limits.read_size(10 ** 9) == 150
+    assert limits.rendered_size(10 ** 9) == 150 + EXCERPT_OVERHEAD
+    assert limits.admit('huge.bin', 10 ** 9)
+    assert limits.used == 150
+
+
+def test_zero_disables_limits():
+    limits = ReadLimits(max_file_bytes=0, max_repo_bytes=0)
+    assert not limits.is_oversized(10 ** 12)
+    assert limits.admit('a', 10 ** 12)
+    assert not limits.exhausted
+
+
+def test_excerpt_never_exceeds_file_cap():
+    limits = ReadLimits(max_file_bytes=100, head_bytes=80, tail_bytes=80)
+    assert limits.head_bytes + limits.tail_bytes == 100
+
+
+def test_excerpt_splits_on_line_breaks():
+    limits = ReadLimits(max_file_bytes=10)
+    head = b'line 1\nline 2\npart'
+    tail = b'ial\nline 99\nline 100\n'
+    text, label = limits.excerpt(head, tail, 1000)
+    assert text == 'line 1\nline 2\n\n... [969 bytes omitted] ...\nline 99\nline 100\n'
+    assert label == 'Content (excerpt: first 14 and last 17 of 1000 bytes, file exceeds 10 bytes)'
+
+
+def test_excerpt_drops_split_utf8_sequences():
+    limits = ReadLimits(max_file_bytes=10)
+    snowman = '☃'.encode('utf-8')
+    head = b'abc' + snowman[:2]
+    tail = snowman[1:] + b'xyz'
+    text, label = limits.excerpt(head, tail, 100)
+    assert text == 'abc\n... [94 bytes omitted] ...\nxyz'
+    assert 'first 3 and last 3 of 100 bytes' in label
+
+
+def test_excerpt_rejects_non_utf8():
+    limits = ReadLimits(max_file_bytes=10)
+    with pytest.raises(UnicodeDecodeError):
+        limits.excerpt(b'ok\n', b'\n\xff\xfe', 100)
@@ -0,0 +1,60 @@
+import os
+import time
+
+import pytest
+
+from repo2llm import stats
+from repo2llm.localindex import LocalIndex
+from repo2llm.localrepo2txt import LocalRepo2Txt
+
+from conftest import write
+
+FILES = {'README.md': '# demo\n', 'docs/guide.md': 'guide\n', 'src/app.py': 'print(1)\n', 'src/util.py': 'x = 1\n'}
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo_path = str(tmp_path / 'repo')
+    write(repo_path, FILES)
+    # Past the racy window, so every file is indexed on the first run
+    old = time.time() - 60
+    for path in FILES:
+        os.utime(os.path.join(repo_path, *path.split('/')), (old, old))
+    return repo_path
+
+
+@pytest.fixture
+def collect_stats():
+    stats.enable()
+    yield
+    stats.disable()
+
+
+def cache_hits(repo_path, **options):
+    processor = LocalRepo2Txt()
+    processor.process_repo(repo_path, **options)
+    return processor.stats.counters['cache_hits']
+
+
+def test_repeat_run_reads_from_index(repo, collect_stats):
+    assert cache_hits(repo) == 0
+    assert cache_hits(repo) == len(FILES)
+
+
+def test_filtered_run_keeps_index(repo, collect_stats):
+    cache_hits(repo)
+    assert cache_hits(repo, include=['*.md']) == 2
+    assert cache_hits(repo, exclude=['src/']) == 2
+    assert cache_hits(repo) == len(FILES)
+
+
+def test_full_run_prunes_deleted_files(repo):
+    LocalRepo2Txt().process_repo(repo)
+    os.remove(os.path.join(repo, 'src', 'util.py'))
+    LocalRepo2Txt().process_repo(repo)
+    index = LocalIndex(repo)
+    try:
+        assert sorted(os.path.relpath(path, repo) for path in index.signatures) == \
+            sorted(os.path.join(*path.split('/')) for path in FILES if path != 'src/util.py')
+    finally:
+        index.close()
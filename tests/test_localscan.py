@@ -0,0 +1,32 @@
+import os
+
+from repo2llm.localrepo2txt import LocalRepo2Txt
+
+from conftest import write
+
+
+def scan(repo_path, **options):
+    manifest = LocalRepo2Txt(use_index=False).scan(repo_path, **options)
+    return {os.path.relpath(entry.path, repo_path).replace(os.sep, '/'): entry for entry in manifest}
+
+
+def test_virtualenv_under_any_name_is_skipped(tmp_path):
+    repo_path = str(tmp_path / 'repo')
+    write(repo_path, {'app.py': 'print(1)\n', 'env3/pyvenv.cfg': 'home = /usr\n',
+                      'env3/lib/site.py': 'x = 1\n', 'src/env.py': 'y = 2\n'})
+    assert sorted(scan(repo_path)) == ['app.py', 'src', 'src/env.py']
+
+
+def test_gitignore_in_subdirectory(tmp_path):
+    repo_path = str(tmp_path / 'repo')
+    write(repo_path, {'.gitignore': '*.log\n', 'a.log': '', 'keep.py': '',
+                      'sub/.gitignore': '!b.log\nbuild/\n', 'sub/b.log': '', 'sub/build/out.py': ''})
+    assert sorted(scan(repo_path)) == ['.gitignore', 'keep.py', 'sub', 'sub/.gitignore', 'sub/b.log']
+
+
+def test_only_readable_files_are_stated(tmp_path):
+    repo_path = str(tmp_path / 'repo')
+    write(repo_path, {'app.py': 'print(1)\n', 'logo.png': b'\x89PNG' * 10})
+    entries = scan(repo_path)
+    assert entries['app.py'].size == 9 and entries['app.py'].mtime_ns
+    assert entries['logo.png'].size == 0
@@ -0,0 +1,161 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+from repo2llm import mirrors
+from repo2llm.gitobjects import GitError
+from repo2llm.mirrors import MirrorStore
+
+from conftest import commit, git
+
+
+@pytest.fixture
+def remote(git_repo, tmp_path):
+    """A bare file:// remote of ``git_repo`` that serves filtered fetches."""
+    commit(git_repo, {'README.md': '# demo\n', 'src/app.py': 'print(1)\n', 'big.bin': b'x' * 4096}, 'first')
+    bare = str(tmp_path / 'remote.git')
+    git(str(tmp_path), 'clone', '-q', '--bare', git_repo, bare)
+    git(bare, 'config', 'uploadpack.allowfilter', 'true')
+    return git_repo, bare, f"file://{bare}"
+
+
+def push(work, bare, files, message):
+    sha = commit(work, files, message)
+    git(work, 'push', '-q', bare, 'main')
+    return sha
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MirrorStore(str(tmp_path / 'mirrors'), blob_limit=1024)
+
+
+def read(mirror, path):
+    entry, = [entry for entry in mirror.list_tree() if entry.path == path]
+    return mirror.read_blob(entry.sha)
+
+
+def test_first_clone(remote, store):
+    work, _, url = remote
+    with store.open(url, 'main') as mirror:
+        assert mirror.commit_sha == git(work, 'rev-parse', 'HEAD')
+        assert read(mirror, 'src/app.py') == b'print(1)\n'
+        sizes = {entry.path: entry.size for entry in mirror.list_tree()}
+    # Blobs over the limit are left out of the clone until read
+    assert sizes['src/app.py'] == len('print(1)\n') and sizes['big.bin'] is None
+    assert store.stats()['fetches'] == 1 and store.stats()['mirrors'] == 1
+
+
+def test_incremental_fetch(remote, store):
+    work, bare, url = remote
+    with store.open(url, 'main') as mirror:
+        first = mirror.commit_sha
+    second = push(work, bare, {'src/app.py': 'print(2)\n', 'src/new.py': 'y = 2\n'}, 'second')
+    with store.open(url, 'main') as mirror:
+        assert mirror.commit_sha == second
+        assert read(mirror, 'src/app.py') == b'print(2)\n'
+        assert read(mirror, 'src/new.py') == b'y = 2\n'
+    # A commit the mirror already holds needs no fetch
+    with store.open(url, second) as mirror:
+        assert mirror.commit_sha == second
+    assert store.stats()['fetches'] == 2 and store.stats()['reused'] == 1
+    assert first != second
+
+
+def test_unknown_ref_keeps_mirror(remote, store):
+    _, _, url = remote
+    with store.open(url, 'main'):
+        pass
+    with pytest.raises(GitError):
+        store.open(url, 'nope')
+    with store.open(url, store.resolve(url, 'main')):
+        pass
+    assert store.stats()['reused'] == 1
+
+
+def test_concurrent_opens(remote, store):
+    work, _, url = remote
+    results, errors = [], []
+
+    def open_mirror():
+        try:
+            with store.open(url, 'main') as mirror:
+                results.append((mirror.commit_sha, read(mirror, 'README.md')))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=open_mirror) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert set(results) == {(git(work, 'rev-parse', 'HEAD'), b'# demo\n')}
+    assert store.stats()['mirrors'] == 1 and not store.readers
+
+
+@pytest.mark.skipif(mirrors.fcntl is None, reason="mirrors are only locked across processes with flock")
+def test_fetch_waits_for_readers(remote, store):
+    work, bare, url = remote
+    mirror = store.open(url, 'main')
+    second = push(work, bare, {'src/app.py': 'print(2)\n'}, 'second')
+    opened = []
+    thread = threading.Thread(target=lambda: opened.append(store.open(url, 'main')))
+    thread.start()
+    # The update needs the exclusive lock, held back by the open reader
+    thread.join(0.5)
+    assert thread.is_alive()
+    assert read(mirror, 'src/app.py') == b'print(1)\n'
+    mirror.close()
+    thread.join(10)
+    assert not thread.is_alive()
+    with opened[0] as updated:
+        assert updated.commit_sha == second
+
+
+def test_eviction_skips_open_mirrors(remote, tmp_path):
+    _, _, url = remote
+    store = MirrorStore(str(tmp_path / 'mirrors'), max_bytes=1, blob_limit=1024)
+    other = str(tmp_path / 'other.git')
+    shutil.copytree(url[len('file://'):], other)
+    with store.open(url, 'main') as mirror:
+        # Over the cap, but in use by this reader
+        with store.open(f"file://{other}", 'main'):
+            assert os.path.isdir(mirror.path)
+    store.open(f"file://{other}", 'main').close()
+    assert store.stats()['mirrors'] == 1 and store.evictions == 1
+
+
+def test_recovers_from_partial_clone(remote, store):
+    _, _, url = remote
+    # Left behind by a clone that was interrupted before it was moved into place
+    partial = store._path(store._key(url)) + '.part'
+    os.makedirs(os.path.join(partial, 'objects'))
+    with store.open(url, 'main') as mirror:
+        assert read(mirror, 'README.md') == b'# demo\n'
+    assert not os.path.exists(partial)
+
+
+def test_recovers_from_corrupt_mirror(remote, store):
+    _, _, url = remote
+    with store.open(url, 'main') as mirror:
+        path = mirror.path
+    shutil.rmtree(path)
+    os.makedirs(path)
+    with open(os.path.join(path, 'HEAD'), 'w') as f:
+        f.write('garbage\n')
+    with store.open(url, 'main') as mirror:
+        assert read(mirror, 'src/app.py') == b'print(1)\n'
+
+
+def test_recovers_from_lost_objects(remote, store):
+    work, bare, url = remote
+    with store.open(url, 'main') as mirror:
+        path = mirror.path
+    shutil.rmtree(os.path.join(path, 'objects'))
+    os.makedirs(os.path.join(path, 'objects', 'pack'))
+    push(work, bare, {'src/app.py': 'print(2)\n'}, 'second')
+    with store.open(url, 'main') as mirror:
+        assert read(mirror, 'src/app.py') == b'print(2)\n'
@@ -0,0 +1,42 @@
+import re
+
+import pytest
+
+from repo2llm.blobcache import BlobCache
+from repo2llm.githubrepo2txt import GithubRepo2Txt
+from repo2llm.gitlibrepo2txt import GitlabRepo2Txt
+
+from fake_forge import GITHUB_REPO, GITLAB_PROJECT
+
+README = b'# demo\n' + b'line of the readme\n' * 200000 + b'the end\n'
+
+
+def render(kind, forge, tmp_path, mode='api', **options):
+    if kind == 'github':
+        processor = GithubRepo2Txt(blob_cache=BlobCache(str(tmp_path / 'blobs')))
+        url = f"https://github.com/{GITHUB_REPO}"
+    else:
+        processor = GitlabRepo2Txt(blob_cache=BlobCache(str(tmp_path / 'blobs')))
+        url = f"{forge.gitlab_url}/{GITLAB_PROJECT}"
+    return processor.process_repo(url, 'master', mode, **options)[1]
+
+
+@pytest.mark.parametrize('kind', ['github', 'gitlab'])
+def test_oversized_readme_is_excerpted(kind, serve, tmp_path):
+    forge = serve({'master': {'README.md': README, 'src/app.py': b'print(1)\n'}})
+    content = render(kind, forge, tmp_path, max_file_bytes=64 * 1024)
+    readme = re.search(r'README:\n(.*)\n\n(?:repo|Repository) structure', content, re.S).group(1)
+    assert readme.startswith('# demo\n')
+    assert 'bytes omitted' in readme and readme.endswith('the end\n')
+    assert len(readme) < 64 * 1024
+    if kind == 'github':
+        # Sizes are listed, so only the Range requests of the excerpts are sent
+        assert forge.stats()['bytes_sent'] < len(README) // 4
+
+
+@pytest.mark.parametrize('kind', ['github', 'gitlab'])
+def test_readme_counts_against_repo_limit(kind, serve, tmp_path):
+    forge = serve({'master': {'README.md': b'# demo\n' * 100, 'src/app.py': b'print(1)\n'}})
+    content = render(kind, forge, tmp_path, max_repo_bytes=100)
+    assert 'README:\nSkipped: repository read limit of 100 bytes reached' in content
+    assert 'print(1)' not in content
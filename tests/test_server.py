@@ -0,0 +1,44 @@
+import importlib.util
+import os
+
+import pytest
+
+from repo2llm import stats
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def server():
+    spec = importlib.util.spec_from_file_location('repo2llm_server', os.path.join(ROOT, 'mcp-repo2llm-server.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    yield module
+    # Loading the server turns on statistics for the whole process
+    stats.disable()
+
+
+def records(count, size):
+    return lambda: iter(['Intro\n\n'] + [f"File: f{i}.py\nContent:\n{'x' * size}\n\n" for i in range(count)])
+
+
+def test_large_paged_rendering_is_not_cached(server, monkeypatch):
+    monkeypatch.setattr(server.sessions, 'spool_bytes', 64 * 1024)
+    page = server.render_cached('local', 'big', 'rev', {}, records(100, 4000), page_bytes=8192)
+    assert 'More content remains' in page
+    assert server.result_cache.get(('local', 'big', 'rev', ())) is None
+    # The live session still serves a repeat call without rendering again
+    assert server.render_cached('local', 'big', 'rev', {}, None, page_bytes=8192) == page
+
+
+def test_small_paged_rendering_is_cached(server):
+    page = server.render_cached('local', 'small', 'rev', {}, records(10, 1000), page_bytes=8192)
+    assert 'More content remains' in page
+    content, offsets = server.result_cache.lookup(('local', 'small', 'rev', ()))
+    assert len(offsets) == 10 and content.startswith('Intro\n\nFile: f0.py')
+
+
+def test_rendering_within_one_page_is_returned_whole(server):
+    content = server.render_cached('local', 'one', 'rev', {}, records(3, 100), page_bytes=8192)
+    assert content.startswith('Intro') and '[Page' not in content
+    assert server.sessions.stats()['sessions'] == 0
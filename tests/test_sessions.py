@@ -0,0 +1,37 @@
+from repo2llm.resultcache import ResultCache
+from repo2llm.sessions import SessionStore, split_records, track_records
+
+CHUNKS = [
+    'Use the files below:\n\n',
+    'File: notes.md\nContent:\nintro\n\nFile: not-a-record.txt\n\n',
+    'File: app.py\nContent:\nprint(1)\n\n',
+]
+
+
+def test_track_records():
+    offsets = []
+    content = ''.join(track_records(CHUNKS, offsets))
+    assert offsets == [len(CHUNKS[0]), len(CHUNKS[0]) + len(CHUNKS[1])]
+    assert list(split_records(content, offsets)) == CHUNKS
+
+
+def test_split_without_offsets():
+    content = ''.join(CHUNKS)
+    assert list(split_records(content, None)) == [content]
+
+
+def test_cached_session_pages_by_record():
+    offsets = []
+    content = ''.join(track_records(CHUNKS, offsets))
+    store = SessionStore()
+    rendered = store.create('a', CHUNKS)
+    cached = store.create('b', split_records(content, offsets))
+    assert cached.file_offsets == rendered.file_offsets
+    assert len(cached.file_offsets) == 2
+
+
+def test_spilled_result_keeps_offsets(tmp_path):
+    cache = ResultCache(max_memory_bytes=10, max_disk_bytes=1 << 20, spill_dir=str(tmp_path))
+    cache.put(('local', 'repo', 'rev', ()), 'x' * 50, [0, 20])
+    assert cache.lookup(('local', 'repo', 'rev', ())) == ('x' * 50, [0, 20])
+    assert cache.get(('local', 'repo', 'missing', ())) is None